@@ -10,6 +10,9 @@ class CompanyAdmin(admin.ModelAdmin):
     search_fields = ("inn", "title")
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_directory()
+
     @admin.display(description="Владелец")
     def get_owner(self, obj):
         owner = obj.get_owner()
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+from core.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("companies", "0002_alter_company_options_joinrequest"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="joinrequest",
+            index=models.Index(fields=["company", "-created_at"], name="join_request_company_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="joinrequest",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["company", "-created_at"],
+                name="join_request_pending_idx",
+            ),
+        ),
+    ]
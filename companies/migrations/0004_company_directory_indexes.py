@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+from core.db_operations import AddIndexConcurrently, AddUpperPatternIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("companies", "0003_join_request_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="company",
+            index=models.Index(fields=["-created_at"], name="company_created_idx"),
+        ),
+        # Поиск по ИНН (startswith) использует индекс companies_company_inn_*_like, созданный Django для unique
+        AddUpperPatternIndex(model_name="company", field_name="title", name="company_title_upper_idx"),
+    ]
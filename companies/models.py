@@ -1,5 +1,33 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CompanyQuerySet(models.QuerySet):
+    def with_directory(self):
+        """
+        Данные каталога компаний без запросов на каждую строку: employees_total — число сотрудников
+        (подзапрос по индексу users_user.company_id), owners — владельцы одним prefetch-запросом.
+        """
+        from users.models import User
+
+        employees = (
+            User.objects.filter(company=OuterRef("pk"))
+            .order_by()
+            .values("company")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return self.annotate(
+            employees_total=Coalesce(Subquery(employees, output_field=IntegerField()), 0),
+        ).prefetch_related(
+            Prefetch(
+                "employees",
+                queryset=User.objects.filter(is_company_owner=True).only("id", "username", "email", "company"),
+                to_attr="owners",
+            ),
+        )
 
 
 class Company(models.Model):
@@ -14,16 +42,34 @@ class Company(models.Model):
         verbose_name_plural = "Компании"
         db_table = "companies_company"
         ordering = ("-created_at",)
+        indexes = [
+            # Каталог компаний: страница в порядке ordering без сортировки всей таблицы
+            models.Index(fields=["-created_at"], name="company_created_idx"),
+        ]
+
+    objects = CompanyQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title} (ИНН {self.inn})"
 
     def get_owner(self):
-        """Возвращает владельца компании (User с is_company_owner=True)."""
+        """Возвращает владельца компании (User с is_company_owner=True; из with_directory() или запросом)."""
+        if "owners" in self.__dict__:
+            return self.owners[0] if self.owners else None
         return self.employees.filter(is_company_owner=True).first()
 
+    @property
+    def employees_count(self):
+        """Число сотрудников (из аннотации with_directory() или отдельным запросом)."""
+        if "employees_total" in self.__dict__:
+            return self.employees_total
+        return self.employees.count()
+
     def delete(self, *args, **kwargs):
         """При удалении компании сбрасываем is_company_owner и company у всех сотрудников."""
+        from users.authentication import revoke_claims
+
+        revoke_claims(self.employees.values_list("id", flat=True))
         self.employees.update(is_company_owner=False, company=None)
         return super().delete(*args, **kwargs)
 
@@ -69,6 +115,15 @@ class JoinRequest(models.Model):
                 name="unique_pending_join_request",
             ),
         ]
+        indexes = [
+            # Список заявок компании (ordering -created_at) и очередь ожидающих заявок
+            models.Index(fields=["company", "-created_at"], name="join_request_company_idx"),
+            models.Index(
+                fields=["company", "-created_at"],
+                condition=models.Q(status="pending"),
+                name="join_request_pending_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} → {self.company} ({self.get_status_display()})"
@@ -16,7 +16,7 @@ class CompanyOwnerSerializer(serializers.ModelSerializer):
 class CompanySerializer(serializers.ModelSerializer):
     """Чтение компании. Показывает владельца и кол-во сотрудников."""
     owner = serializers.SerializerMethodField()
-    employees_count = serializers.SerializerMethodField()
+    employees_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Company
@@ -29,12 +29,9 @@ class CompanySerializer(serializers.ModelSerializer):
             return CompanyOwnerSerializer(owner).data
         return None
 
-    def get_employees_count(self, obj):
-        return obj.employees.count()
-
 
 class CompanyCreateUpdateSerializer(serializers.ModelSerializer):
-    """Создание компании: текущий пользователь становится владельцем."""
+    """Создание компании (текущий пользователь становится владельцем) и изменение её данных владельцем."""
     class Meta:
         model = Company
         fields = ("id", "inn", "title", "created_at", "updated_at")
@@ -42,7 +39,8 @@ class CompanyCreateUpdateSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         user = self.context["request"].user
-        if user.is_company_owner and user.company_id is not None:
+        # Владелец не может создать вторую компанию, но может менять свою
+        if self.instance is None and user.is_company_owner and user.company_id is not None:
             raise serializers.ValidationError("Вы уже являетесь владельцем компании.")
         return attrs
 
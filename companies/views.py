@@ -1,3 +1,4 @@
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
@@ -10,19 +11,40 @@ from .serializers import CompanySerializer, CompanyCreateUpdateSerializer, JoinR
 from .permissions import IsCompanyOwnerOrReadOnly
 
 
+SEARCH_PARAMETER = openapi.Parameter(
+    "search", openapi.IN_QUERY,
+    description="Поиск по началу названия (без учёта регистра); строка из цифр ищется и по началу ИНН",
+    type=openapi.TYPE_STRING,
+)
+
+
 class CompanyListCreateView(generics.ListCreateAPIView):
     """
-    GET: список компаний (все авторизованные).
+    GET: список компаний (все авторизованные). Владелец и число сотрудников — за постоянное
+         число запросов на страницу (Company.objects.with_directory()). ?search= — по префиксу.
     POST: создание компании (текущий пользователь становится владельцем).
     """
     permission_classes = (IsCompanyOwnerOrReadOnly,)
-    queryset = Company.objects.all()
+
+    def get_queryset(self):
+        qs = Company.objects.with_directory()
+        search = self.request.query_params.get("search", "").strip()
+        if search:
+            condition = Q(title__istartswith=search)
+            if search.isdigit():
+                condition |= Q(inn__startswith=search)
+            qs = qs.filter(condition)
+        return qs
 
     def get_serializer_class(self):
         if self.request.method == "POST":
             return CompanyCreateUpdateSerializer
         return CompanySerializer
 
+    @swagger_auto_schema(manual_parameters=[SEARCH_PARAMETER], responses={200: CompanySerializer(many=True)})
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -44,7 +66,7 @@ class CompanyDetailView(generics.RetrieveUpdateDestroyAPIView):
     PUT/PATCH/DELETE: только владелец компании.
     """
     permission_classes = (IsCompanyOwnerOrReadOnly,)
-    queryset = Company.objects.all()
+    queryset = Company.objects.with_directory()
 
     def get_serializer_class(self):
         if self.request.method in ("PUT", "PATCH"):
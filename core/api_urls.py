@@ -3,6 +3,8 @@ API v1 URL routing. Imported after apps are ready to avoid circular imports.
 """
 from django.urls import path, include
 
+from .views import SystemStatsView
+
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("companies/", include("companies.urls")),
@@ -10,4 +12,5 @@ urlpatterns = [
     path("suppliers/", include("suppliers.urls")),
     path("products/", include("products.urls")),
     path("sales/", include("sales.urls")),
+    path("system/stats/", SystemStatsView.as_view(), name="system-stats"),
 ]
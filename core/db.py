@@ -0,0 +1,80 @@
+"""
+Транзакции с повтором при взаимоблокировке / ошибке сериализации.
+
+Повтор имеет смысл только для внешней транзакции: если функция вызвана внутри уже открытого
+atomic-блока, она выполняется как обычный atomic, а ошибка уходит во внешний блок.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE PostgreSQL: deadlock_detected, serialization_failure
+RETRYABLE_PGCODES = {"40P01", "40001"}
+
+_stats_lock = threading.Lock()
+_stats = {"retries": 0, "recovered": 0, "exhausted": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    metrics.inc("db_transaction_retries_total", (("event", name),))
+
+
+def get_retry_stats():
+    """Счётчики повторов транзакций текущего процесса."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def is_retryable(exc):
+    cause = exc.__cause__
+    if getattr(cause, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    # SQLite: конкурирующая запись при занятой базе
+    return "database is locked" in str(exc)
+
+
+def atomic_with_retry(func):
+    """
+    Декоратор: выполняет func в transaction.atomic и повторяет её при взаимоблокировке
+    или ошибке сериализации (до DB_TRANSACTION_RETRIES попыток, экспоненциальная задержка с джиттером).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connection.in_atomic_block:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+
+        attempts = settings.DB_TRANSACTION_RETRIES
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic():
+                    result = func(*args, **kwargs)
+            except OperationalError as exc:
+                if not is_retryable(exc):
+                    raise
+                if attempt == attempts:
+                    _count("exhausted")
+                    logger.warning("%s: повторы исчерпаны (%s)", func.__qualname__, exc)
+                    raise
+                _count("retries")
+                delay = min(
+                    settings.DB_TRANSACTION_RETRY_BACKOFF * 2 ** (attempt - 1),
+                    settings.DB_TRANSACTION_RETRY_BACKOFF_MAX,
+                )
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            if attempt > 1:
+                _count("recovered")
+            return result
+    return wrapper
@@ -0,0 +1,101 @@
+"""
+Операции миграций, зависящие от СУБД.
+
+AddIndexConcurrently — как django.contrib.postgres.operations.AddIndexConcurrently
+(CREATE INDEX CONCURRENTLY: таблица не блокируется на запись, пока строится индекс), но на
+SQLite и других СУБД создаёт индекс обычным образом и не требует psycopg при импорте.
+AddUpperPatternIndex — индекс под поиск istartswith на PostgreSQL (на других СУБД пропускается).
+Миграция с такими операциями должна быть объявлена с atomic = False.
+"""
+from django.db import NotSupportedError, migrations
+
+
+def _concurrently(schema_editor, operation):
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f"{operation.__class__.__name__} нельзя выполнять в транзакции "
+            "(нужно atomic = False в миграции)."
+        )
+    return True
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex, на PostgreSQL выполняемый через CREATE INDEX CONCURRENTLY."""
+    atomic = False
+
+    def describe(self):
+        return "Concurrently create index %s on field(s) %s of model %s" % (
+            self.index.name,
+            ", ".join(self.index.fields),
+            self.model_name,
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class AddUpperPatternIndex(migrations.operations.base.Operation):
+    """
+    Индекс для lookup istartswith на PostgreSQL: (UPPER(column::text) text_pattern_ops) — именно такое
+    выражение Django строит для istartswith, поэтому поиск по префиксу без учёта регистра идёт по индексу.
+    Индекс живёт только в базе (как и индексы *_like, которые Django сам создаёт для CharField);
+    на других СУБД операция ничего не делает.
+    """
+    reversible = True
+    atomic = False
+
+    def __init__(self, model_name, field_name, name):
+        self.model_name = model_name
+        self.field_name = field_name
+        self.name = name
+
+    def deconstruct(self):
+        return (
+            self.__class__.__qualname__,
+            [],
+            {"model_name": self.model_name, "field_name": self.field_name, "name": self.name},
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if not _concurrently(schema_editor, self):
+            return
+        qn = schema_editor.quote_name
+        column = model._meta.get_field(self.field_name).column
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(self.name)} "
+            f"ON {qn(model._meta.db_table)} (UPPER({qn(column)}::text) text_pattern_ops)"
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if not _concurrently(schema_editor, self):
+            return
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.name)}")
+
+    def describe(self):
+        return f"Create pattern index {self.name} on UPPER({self.field_name}) of model {self.model_name}"
+
+    @property
+    def migration_name_fragment(self):
+        return self.name.lower()
@@ -0,0 +1,146 @@
+"""
+Потоковая выгрузка (CSV / NDJSON) больших наборов строк.
+
+Строки читаются через QuerySet.iterator(chunk_size=...) из values_list() и сразу пишутся в ответ,
+поэтому память не зависит от объёма выгрузки.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _PassthroughRenderer(BaseRenderer):
+    """
+    Нужен только для согласования формата (?format=csv|ndjson):
+    сами данные отдаёт StreamingHttpResponse, а ошибки рендерятся как JSON.
+    """
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(_PassthroughRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(_PassthroughRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+EXPORT_RENDERERS = (JSONRenderer, CSVRenderer, NDJSONRenderer)
+EXPORT_FORMATS = ("csv", "ndjson")
+
+
+def parse_day(value, name):
+    """YYYY-MM-DD или ISO datetime → локальная дата; иначе ValidationError."""
+    try:
+        day = parse_date(value)
+        dt = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = dt = None
+    if day is None:
+        if dt is None:
+            raise ValidationError({name: "Неверный формат даты. Ожидается YYYY-MM-DD."})
+        day = timezone.localdate(dt) if timezone.is_aware(dt) else dt.date()
+    return day
+
+
+def filter_day_range(qs, field, date_from=None, date_to=None):
+    """Фильтр поля DateTimeField по датам date_from/date_to (включительно, по локальным дням)."""
+    tz = timezone.get_current_timezone()
+    if date_from:
+        start = datetime.combine(date_from, time.min)
+        qs = qs.filter(**{f"{field}__gte": timezone.make_aware(start, tz)})
+    if date_to:
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        qs = qs.filter(**{f"{field}__lt": timezone.make_aware(end, tz)})
+    return qs
+
+
+def filter_by_days(qs, field, request):
+    """Фильтр по ?date_from / ?date_to запроса — см. filter_day_range."""
+    date_from = request.query_params.get("date_from")
+    date_to = request.query_params.get("date_to")
+    return filter_day_range(
+        qs, field,
+        parse_day(date_from, "date_from") if date_from else None,
+        parse_day(date_to, "date_to") if date_to else None,
+    )
+
+
+def get_export_format(request):
+    fmt = request.query_params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError({"format": "Допустимые значения: csv, ndjson."})
+    return fmt
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+def _plain_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_plain_value(v) for v in row])
+
+
+def _ndjson_lines(columns, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, map(_plain_value, row)))) + "\n"
+
+
+def stream_export(queryset, columns, fmt, filename):
+    """
+    StreamingHttpResponse из queryset.values_list(*fields) (или готового итератора кортежей).
+    columns — названия колонок в том же порядке, что и поля values_list.
+    """
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE) if hasattr(queryset, "iterator") else queryset
+    if fmt == "ndjson":
+        response = StreamingHttpResponse(
+            _ndjson_lines(columns, rows), content_type="application/x-ndjson; charset=utf-8",
+        )
+    else:
+        response = StreamingHttpResponse(
+            _csv_lines(columns, rows), content_type="text/csv; charset=utf-8",
+        )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def stream_serialized(queryset, serializer_class, filename):
+    """
+    NDJSON-поток объектов: одна строка — serializer_class(obj).data.
+    queryset читается пачками (prefetch_related выполняется на каждую пачку).
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def lines():
+        for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield encoder.encode(serializer_class(obj).data) + "\n"
+
+    response = StreamingHttpResponse(lines(), content_type="application/x-ndjson; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.ndjson"'
+    return response
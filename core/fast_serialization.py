@@ -0,0 +1,85 @@
+"""
+Быстрый путь сериализации списков: страница читается через values() и превращается в JSON-структуру
+напрямую, без дерева полей ModelSerializer на каждую строку.
+
+Формат значений совпадает с полями DRF: DateTimeField — ISO 8601 в текущей зоне («Z» для UTC),
+DecimalField — строка с decimal_places знаками. Совпадение с сериализаторами проверяет
+команда bench_list_serialization.
+"""
+from decimal import Decimal
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework.response import Response
+
+FAST_QUERY_PARAM = "fast"
+FAST_PARAMETER = openapi.Parameter(
+    FAST_QUERY_PARAM, openapi.IN_QUERY,
+    description="0 — строить ответ через сериализатор DRF (для сравнения; формат тот же)",
+    type=openapi.TYPE_STRING, enum=["0", "1"],
+)
+
+
+def datetime_repr(value):
+    """Как rest_framework.fields.DateTimeField.to_representation (формат ISO 8601)."""
+    if not value:
+        return None
+    value = timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def decimal_repr(decimal_places):
+    """Форматтер как у rest_framework.fields.DecimalField (coerce_to_string)."""
+    exponent = Decimal(1).scaleb(-decimal_places)
+
+    def represent(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return format(value.quantize(exponent), "f")
+
+    return represent
+
+
+class FastListMixin:
+    """
+    GET-список ListAPIView через values(). fast_fields — (ключ ответа, поле values(), форматтер или None)
+    в порядке полей сериализатора; поле None — место под вложенный список, который заполняет
+    fast_extend(rows) одним запросом на страницу.
+
+    Пагинация работает как обычно (по словарям values()). Если get_queryset() вернул не QuerySet
+    или передан ?fast=0, ответ строится прежним сериализатором.
+    """
+    fast_fields: tuple = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not isinstance(queryset, QuerySet) or request.query_params.get(FAST_QUERY_PARAM) == "0":
+            return super().list(request, *args, **kwargs)
+
+        queryset = queryset.select_related(None).prefetch_related(None).values(
+            *dict.fromkeys(field for _, field, _ in self.fast_fields if field),
+        )
+        page = self.paginate_queryset(queryset)
+        data = self.fast_rows(page if page is not None else list(queryset))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def fast_rows(self, values):
+        rows = [
+            {
+                key: None if field is None else formatter(value[field]) if formatter else value[field]
+                for key, field, formatter in self.fast_fields
+            }
+            for value in values
+        ]
+        self.fast_extend(rows)
+        return rows
+
+    def fast_extend(self, rows):
+        """Заполняет вложенные поля строк (по умолчанию вложенных полей нет)."""
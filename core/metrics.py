@@ -0,0 +1,311 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware записывает для каждого маршрута (имя URL из resolver_match) время ответа,
+число и время SQL-запросов и размер ответа; /metrics отдаёт их текстом для Prometheus.
+Сюда же пишут счётчики кэша аналитики, single-flight и повторов транзакций.
+
+Если задан METRICS_DIR, каждый процесс пишет значения в свой файл METRICS_DIR/metrics-<pid>.db
+через mmap, а /metrics суммирует файлы всех воркеров gunicorn (каталог очищается при старте,
+см. docker/entrypoint.sh). Без METRICS_DIR значения живут в памяти процесса.
+"""
+import bisect
+import functools
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# имя: (тип, описание, границы гистограммы)
+METRICS = {
+    "http_requests_total": (
+        "counter", "HTTP-запросы по маршруту, методу и статусу", None),
+    "http_request_duration_seconds": (
+        "histogram", "Время ответа, секунды", DURATION_BUCKETS),
+    "http_request_db_queries": (
+        "histogram", "SQL-запросов на HTTP-запрос", QUERY_BUCKETS),
+    "http_request_db_duration_seconds": (
+        "histogram", "Суммарное время SQL-запросов на HTTP-запрос, секунды", DURATION_BUCKETS),
+    "http_response_size_bytes": (
+        "histogram", "Размер тела ответа (кроме потоковых), байты", SIZE_BUCKETS),
+    "analytics_cache_requests_total": (
+        "counter", "Обращения к кэшу аналитики: hits / misses", None),
+    "analytics_singleflight_calls_total": (
+        "counter", "Вызовы single-flight аналитики: executed / shared", None),
+    "db_transaction_retries_total": (
+        "counter", "Повторы транзакций при взаимоблокировке: retries / recovered / exhausted", None),
+}
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# ─── Хранилище ───
+
+
+class _MemoryStore:
+    """Значения метрик в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] += amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+_HEADER = struct.Struct("<Q")  # занятая часть файла, байты
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+
+
+def _align(pos):
+    return (pos + 7) & ~7
+
+
+def _entries(buf, used):
+    """Записи файла метрик: (ключ, значение, смещение значения)."""
+    pos = _HEADER.size
+    while pos < used:
+        (length,) = _KEY_LENGTH.unpack_from(buf, pos)
+        key = bytes(buf[pos + _KEY_LENGTH.size:pos + _KEY_LENGTH.size + length]).decode()
+        value_pos = _align(pos + _KEY_LENGTH.size + length)
+        (value,) = _VALUE.unpack_from(buf, value_pos)
+        yield key, value, value_pos
+        pos = value_pos + _VALUE.size
+
+
+class _FileStore:
+    """
+    Значения метрик одного процесса в файле через mmap: [занято][длина ключа][ключ][значение]...
+    Пишет только процесс-владелец; заголовок обновляется после записи, поэтому читатель
+    из другого процесса не видит недописанных ключей.
+    """
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            size = self.INITIAL_SIZE
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        # pid мог достаться от завершившегося воркера — продолжаем его счётчики
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        self._positions = {key: pos for key, _, pos in _entries(self._mmap, self._used)}
+
+    def inc(self, key, amount):
+        with self._lock:
+            pos = self._positions.get(key)
+            if pos is None:
+                pos = self._add(key)
+            (value,) = _VALUE.unpack_from(self._mmap, pos)
+            _VALUE.pack_into(self._mmap, pos, value + amount)
+
+    def _add(self, key):
+        encoded = key.encode()
+        value_pos = _align(self._used + _KEY_LENGTH.size + len(encoded))
+        end = value_pos + _VALUE.size
+        if end > len(self._mmap):
+            size = len(self._mmap)
+            while size < end:
+                size *= 2
+            self._mmap.close()
+            os.ftruncate(self._fd, size)
+            self._mmap = mmap.mmap(self._fd, size)
+        _KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        _VALUE.pack_into(self._mmap, value_pos, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._mmap, 0, end)
+        self._positions[key] = value_pos
+        return value_pos
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _entries(self._mmap, self._used)]
+
+    @staticmethod
+    def read(path):
+        with open(path, "rb") as fh:
+            data = fh.read()
+        if len(data) < _HEADER.size:
+            return []
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        return [(key, value) for key, value, _ in _entries(data, used)]
+
+
+_store_lock = threading.Lock()
+_store = None
+_store_pid = None
+
+
+def _get_store():
+    """Хранилище текущего процесса; после fork (gunicorn --preload) создаётся заново."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        with _store_lock:
+            if _store_pid != pid:
+                metrics_dir = settings.METRICS_DIR
+                if metrics_dir:
+                    os.makedirs(metrics_dir, exist_ok=True)
+                    _store = _FileStore(os.path.join(metrics_dir, f"metrics-{pid}.db"))
+                else:
+                    _store = _MemoryStore()
+                _store_pid = pid
+    return _store
+
+
+def _collect():
+    """Значения всех процессов: {ключ: сумма}."""
+    totals = defaultdict(float)
+    if settings.METRICS_DIR:
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, "metrics-*.db")):
+            for key, value in _FileStore.read(path):
+                totals[key] += value
+    else:
+        for key, value in _get_store().items():
+            totals[key] += value
+    return totals
+
+
+# ─── Запись ───
+
+
+@functools.lru_cache(maxsize=4096)
+def _key(name, suffix, labels):
+    return json.dumps([name, suffix, labels], ensure_ascii=False)
+
+
+def inc(name, labels=(), amount=1):
+    """Увеличивает счётчик name; labels — кортеж пар (метка, значение)."""
+    if settings.METRICS_ENABLED:
+        _get_store().inc(_key(name, "", tuple(labels)), amount)
+
+
+def observe(name, value, labels=()):
+    """Добавляет наблюдение в гистограмму name."""
+    if not settings.METRICS_ENABLED:
+        return
+    buckets = METRICS[name][2]
+    index = bisect.bisect_left(buckets, value)
+    le = _format_value(buckets[index]) if index < len(buckets) else "+Inf"
+    labels = tuple(labels)
+    store = _get_store()
+    store.inc(_key(name, "_bucket", labels + (("le", le),)), 1)
+    store.inc(_key(name, "_sum", labels), value)
+
+
+# ─── Экспорт ───
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    samples = defaultdict(dict)  # имя -> {(суффикс, метки): значение}
+    for key, value in _collect().items():
+        name, suffix, labels = json.loads(key)
+        samples[name][suffix, tuple(map(tuple, labels))] = value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        values = samples.get(name, {})
+        if kind == "counter":
+            for (_, labels), value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            continue
+
+        series = defaultdict(dict)  # метки без le -> {le: число наблюдений}
+        sums = {}
+        for (suffix, labels), value in values.items():
+            if suffix == "_sum":
+                sums[labels] = value
+            else:
+                series[labels[:-1]][labels[-1][1]] = value
+        for labels in sorted(series):
+            counts = series[labels]
+            cumulative = 0
+            for le in [_format_value(bound) for bound in buckets] + ["+Inf"]:
+                cumulative += counts.get(le, 0)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sums.get(labels, 0))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+# ─── Middleware ───
+
+
+class MetricsMiddleware:
+    """
+    Время ответа, SQL-запросы и размер ответа по маршрутам. Для потоковых ответов (экспорт)
+    учитывается только подготовка: тело формируется уже после выхода из middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        db = {"queries": 0, "seconds": 0.0}
+
+        def count_queries(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db["queries"] += 1
+                db["seconds"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else UNMATCHED_ROUTE
+        if route == "metrics":
+            return response
+        labels = (("route", route), ("method", request.method))
+        inc("http_requests_total", labels + (("status", str(response.status_code)),))
+        observe("http_request_duration_seconds", elapsed, labels)
+        observe("http_request_db_queries", db["queries"], labels)
+        observe("http_request_db_duration_seconds", db["seconds"], labels)
+        if not response.streaming:
+            observe("http_response_size_bytes", len(response.content), labels)
+        return response
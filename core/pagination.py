@@ -0,0 +1,114 @@
+"""
+Пагинация списков: постраничная по умолчанию, keyset — по запросу.
+
+Обычная страница (?page=N) стоит COUNT(*) по всей истории компании и OFFSET, который растёт
+с номером страницы. С параметром ?cursor (первая страница — пустой ?cursor=) список отдаётся
+по ключу сортировки: WHERE (sale_date, id) < (последняя запись страницы) ORDER BY ... LIMIT,
+без COUNT и OFFSET. При составном индексе по ключу любая страница стоит как первая.
+"""
+import base64
+import json
+from types import SimpleNamespace
+
+from django.db.models import Q
+from drf_yasg import openapi
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+CURSOR_PARAMETER = openapi.Parameter(
+    "cursor", openapi.IN_QUERY,
+    description=(
+        "Keyset-пагинация: пустое значение — первая страница, далее — значение из поля next. "
+        "Ответ: {next, results} без count."
+    ),
+    type=openapi.TYPE_STRING,
+)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    PageNumberPagination, переключаемая на keyset-пагинацию параметром ?cursor.
+    keyset — поля сортировки (с «-» для убывания); последнее поле должно быть уникальным (id).
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    keyset: tuple = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = self.cursor_query_param in request.query_params
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.keyset]
+        position = self._decode(request.query_params[self.cursor_query_param], fields)
+
+        queryset = queryset.order_by(*self.keyset)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+        rows = list(queryset[:page_size + 1])
+
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            if isinstance(last, dict):  # страница из values() (core.fast_serialization)
+                last = SimpleNamespace(**last)
+            self.next_position = [field.value_to_string(last) for field in fields]
+        return rows
+
+    def _after(self, position):
+        """Записи строго после position в порядке keyset: (a, b) < (x, y) для убывания и т.д."""
+        first, value = self.keyset[0].lstrip("-"), position[0]
+        # Граница по первому полю — чтобы планировщик взял диапазон индекса, а не OR целиком
+        bound = Q(**{f"{first}__{'lte' if self.keyset[0].startswith('-') else 'gte'}": value})
+        condition, equal = Q(), {}
+        for name, value in zip(self.keyset, position):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return bound & condition
+
+    def _encode(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _decode(self, token, fields):
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound("Неверный курсор.")
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class SaleKeysetPagination(KeysetPagination):
+    keyset = ("-sale_date", "-id")
+
+
+class ProductKeysetPagination(KeysetPagination):
+    keyset = ("title", "id")
+
+
+class SupplyKeysetPagination(KeysetPagination):
+    keyset = ("-delivery_date", "-id")
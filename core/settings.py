@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -80,6 +81,44 @@ if os.environ.get("DATABASE_URL"):
     import dj_database_url
     DATABASES["default"] = dj_database_url.config(conn_max_age=600)
 
+# Кэш: locmem по умолчанию. Для кэша аналитики, общего для всех воркеров gunicorn,
+# задайте ANALYTICS_CACHE_DIR — будет использован файловый бэкенд.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "analytics": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "analytics",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+if os.environ.get("ANALYTICS_CACHE_DIR"):
+    CACHES["analytics"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ["ANALYTICS_CACHE_DIR"],
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    }
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get("ANALYTICS_CACHE_TIMEOUT", 3600))
+# Одинаковые параллельные запросы аналитики ждут одного вычисления (в процессе;
+# между воркерами — через файловые блокировки в ANALYTICS_SINGLEFLIGHT_DIR)
+ANALYTICS_SINGLEFLIGHT = os.environ.get("ANALYTICS_SINGLEFLIGHT", "True").lower() in ("true", "1", "yes")
+ANALYTICS_SINGLEFLIGHT_DIR = os.environ.get("ANALYTICS_SINGLEFLIGHT_DIR")
+
+# Повтор транзакций, меняющих остатки, при взаимоблокировке / ошибке сериализации (core.db)
+DB_TRANSACTION_RETRIES = int(os.environ.get("DB_TRANSACTION_RETRIES", 3))
+DB_TRANSACTION_RETRY_BACKOFF = 0.05  # секунды, удваивается с каждой попыткой
+DB_TRANSACTION_RETRY_BACKOFF_MAX = 1.0
+
+# Метрики запросов для Prometheus (core.metrics, /metrics). METRICS_DIR — каталог файлов
+# воркеров gunicorn; без него метрики считаются в памяти каждого процесса. Без METRICS_TOKEN /metrics закрыт.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True").lower() in ("true", "1", "yes")
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Продажи старше стольких дней переносятся в архивные таблицы командой archive_sales (sales.archive)
+SALES_ARCHIVE_DAYS = int(os.environ.get("SALES_ARCHIVE_DAYS", 90))
+
 AUTH_USER_MODEL = "users.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -106,7 +145,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CompanyClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -121,6 +160,8 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
 }
+# Как часто процесс перечитывает отзывы claims (users.authentication), секунды
+JWT_CLAIMS_REVOCATION_TTL = float(os.environ.get("JWT_CLAIMS_REVOCATION_TTL", 5))
 
 # CORS (для разработки)
 CORS_ALLOW_ALL_ORIGINS = DEBUG
@@ -8,6 +8,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .views import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="CRM API",
@@ -25,6 +27,7 @@ urlpatterns = [
     path("", RedirectView.as_view(url="/swagger/", permanent=False)),
     path("admin/", admin.site.urls),
     path("api/v1/", include("core.api_urls")),
+    path("metrics", metrics_view, name="metrics"),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
         schema_view.without_ui(cache_timeout=0),
@@ -0,0 +1,43 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from . import metrics
+from .db import get_retry_stats
+
+
+class SystemStatsView(APIView):
+    """Служебные счётчики текущего процесса (только для staff)."""
+    permission_classes = (IsAdminUser,)
+
+    @swagger_auto_schema(
+        responses={200: openapi.Response(
+            description="Счётчики",
+            examples={"application/json": {
+                "transaction_retries": {"retries": 3, "recovered": 2, "exhausted": 0},
+            }},
+        )},
+    )
+    def get(self, request):
+        return Response({
+            "transaction_retries": get_retry_stats(),
+        })
+
+
+def metrics_view(request):
+    """
+    Метрики всех воркеров в формате Prometheus. Нужен заголовок Authorization: Bearer <METRICS_TOKEN>;
+    без METRICS_TOKEN эндпоинт закрыт (403) — трафик и задержки маршрутов не отдаются кому угодно.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return HttpResponse("METRICS_TOKEN не задан.", status=403, content_type="text/plain; charset=utf-8")
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -4,5 +4,11 @@ set -e
 echo "Applying migrations..."
 python manage.py migrate --noinput
 
+if [ -n "$METRICS_DIR" ]; then
+    echo "Resetting metrics in $METRICS_DIR..."
+    rm -rf "$METRICS_DIR"
+    mkdir -p "$METRICS_DIR"
+fi
+
 echo "Starting application..."
 exec "$@"
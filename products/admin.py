@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Supply, SupplyProduct
+from .models import Product, StockMovement, StockSnapshot, Supply, SupplyProduct
 
 
 class SupplyProductInline(admin.TabularInline):
@@ -10,13 +10,23 @@ class SupplyProductInline(admin.TabularInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "purchase_price", "sale_price", "quantity", "storage", "created_at")
+    list_display = (
+        "id", "title", "purchase_price", "sale_price", "quantity", "available_quantity",
+        "storage", "created_at",
+    )
     list_display_links = ("id", "title")
-    list_filter = ("storage__company",)
+    list_filter = ("company",)
     search_fields = ("title",)
     raw_id_fields = ("storage",)
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_stock()
+
+    @admin.display(description="Текущий остаток", ordering="available_quantity")
+    def available_quantity(self, obj):
+        return obj.available_quantity
+
 
 @admin.register(Supply)
 class SupplyAdmin(admin.ModelAdmin):
@@ -33,3 +43,31 @@ class SupplyProductAdmin(admin.ModelAdmin):
     list_display = ("id", "supply", "product", "quantity")
     list_display_links = ("id",)
     raw_id_fields = ("supply", "product")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """Журнал движений только для просмотра: остатки меняются через поставки, продажи и корректировки."""
+    list_display = ("id", "product", "kind", "delta", "applied", "supply", "sale_id", "effective_at", "created_at")
+    list_display_links = ("id",)
+    list_filter = ("kind", "applied")
+    search_fields = ("product__title", "comment")
+    raw_id_fields = ("product", "supply")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "day", "product", "quantity")
+    list_display_links = ("id",)
+    list_filter = ("day",)
+    raw_id_fields = ("product",)
+    readonly_fields = ("day", "product", "quantity")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products.models import Product
+from products.stock import InsufficientStock, decrement_stock
+from sales.seed import delete_seeded_company, seed_company
+from storages.models import Storage
+
+
+def _sell_with_lock(product_id, qty):
+    """Прежняя схема: чтение с блокировкой строки и save() остатка."""
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(id=product_id)
+        if product.quantity < qty:
+            raise InsufficientStock([product_id])
+        product.quantity -= qty
+        product.save(update_fields=["quantity"])
+
+
+def _sell_conditional(product_id, qty):
+    """Новая схема: условный UPDATE ... WHERE quantity >= n."""
+    with transaction.atomic():
+        decrement_stock({product_id: qty})
+
+
+STRATEGIES = {
+    "lock": _sell_with_lock,
+    "conditional": _sell_conditional,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк конкуренции за остаток: несколько продавцов одновременно списывают "
+        "один «горячий» товар. Сравнивает select_for_update + save и условный UPDATE. "
+        "Создаёт отдельную синтетическую компанию (sales.seed) и удаляет её после замера — "
+        "данные существующих компаний не затрагиваются. Потоки пишут через свои соединения, "
+        "поэтому данные коммитятся, а не откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=8, help="Количество параллельных продавцов")
+        parser.add_argument("--sales", type=int, default=50, help="Продаж на одного продавца")
+        parser.add_argument("--stock", type=int, default=None,
+                            help="Начальный остаток (по умолчанию хватает на все продажи)")
+        parser.add_argument("--strategy", choices=sorted(STRATEGIES), action="append",
+                            help="Стратегия (по умолчанию — все)")
+
+    def handle(self, *args, **options):
+        sellers, per_seller = options["sellers"], options["sales"]
+        stock = options["stock"] if options["stock"] is not None else sellers * per_seller
+
+        with transaction.atomic():
+            owner = seed_company(sales=0, products=0)
+        storage = Storage.objects.get(company_id=owner.company_id)
+        try:
+            for name in options["strategy"] or sorted(STRATEGIES):
+                product = Product.objects.create(
+                    title=f"bench-{name}", storage=storage, quantity=stock,
+                )
+                result = self._run(STRATEGIES[name], product.id, sellers, per_seller)
+                product.refresh_from_db()
+                sold = result["ok"]
+                self.stdout.write(
+                    f"{name:>11}: {sold} продаж за {result['elapsed']:.2f} с "
+                    f"({sold / result['elapsed']:.0f}/с), нехватка: {result['short']}, "
+                    f"ошибки: {result['errors']}, остаток {product.quantity} "
+                    f"(ожидается {stock - sold})"
+                )
+        finally:
+            delete_seeded_company(owner)
+
+    def _run(self, sell, product_id, sellers, per_seller):
+        barrier = threading.Barrier(sellers)
+        lock = threading.Lock()
+        totals = {"ok": 0, "short": 0, "errors": 0}
+
+        def seller():
+            barrier.wait()
+            try:
+                for _ in range(per_seller):
+                    try:
+                        sell(product_id, 1)
+                        key = "ok"
+                    except InsufficientStock:
+                        key = "short"
+                    except Exception:
+                        key = "errors"
+                    with lock:
+                        totals[key] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=seller) for _ in range(sellers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        totals["elapsed"] = time.perf_counter() - started
+        return totals
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.stock import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Сворачивает несвёрнутые движения журнала остатков (StockMovement, applied=False) "
+        "в Product.quantity. С --interval работает в цикле (для запуска как фонового процесса)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000, help="Движений за одну транзакцию")
+        parser.add_argument("--interval", type=float, default=None,
+                            help="Пауза между проходами, сек (по умолчанию — один проход)")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+        while True:
+            total = 0
+            while True:
+                folded = compact(batch_size)
+                total += folded
+                if folded < batch_size:
+                    break
+            if total or interval is None:
+                self.stdout.write(self.style.SUCCESS(f"Свёрнуто движений: {total}."))
+            if interval is None:
+                return
+            time.sleep(interval)
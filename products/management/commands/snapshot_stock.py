@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.export import parse_day
+from products.models import StockSnapshot
+from products.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Дневные снимки остатков товаров (для запросов остатка на дату). "
+        "По умолчанию снимает все пропущенные дни после последнего снимка по вчерашний включительно."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--day", default=None, help="Снять (пересчитать) только этот день, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        if options["day"]:
+            try:
+                days = [parse_day(options["day"], "day")]
+            except ValidationError:
+                raise CommandError("Неверный формат --day. Ожидается YYYY-MM-DD.")
+        else:
+            yesterday = timezone.localdate() - timedelta(days=1)
+            last = StockSnapshot.objects.order_by("-day").values_list("day", flat=True).first()
+            first = last + timedelta(days=1) if last else yesterday
+            days = [first + timedelta(days=i) for i in range((yesterday - first).days + 1)]
+
+        for day in days:
+            count = take_snapshot(day)
+            self.stdout.write(f"{day}: {count} товаров")
+        self.stdout.write(self.style.SUCCESS(f"Снято дней: {len(days)}."))
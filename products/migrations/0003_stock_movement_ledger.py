@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def opening_balances(apps, schema_editor):
+    """Начальный остаток каждого товара — уже учтённая корректировка (история журнала с нуля)."""
+    Product = apps.get_model("products", "Product")
+    StockMovement = apps.get_model("products", "StockMovement")
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=pid,
+                kind="adjustment",
+                delta=quantity,
+                applied=True,
+                comment="Начальный остаток",
+            )
+            for pid, quantity in Product.objects.filter(quantity__gt=0).values_list("id", "quantity")
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_options_alter_supply_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Продажа'), ('supply', 'Поставка'), ('sale_reversal', 'Отмена продажи'), ('adjustment', 'Корректировка')], max_length=16, verbose_name='Тип')),
+                ('delta', models.IntegerField(verbose_name='Изменение')),
+                ('applied', models.BooleanField(default=False, verbose_name='Учтено в остатке')),
+                ('sale_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID продажи')),
+                ('comment', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='products.product', verbose_name='Товар')),
+                ('supply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='products.supply', verbose_name='Поставка')),
+            ],
+            options={
+                'verbose_name': 'Движение товара',
+                'verbose_name_plural': 'Движения товаров',
+                'db_table': 'products_stock_movement',
+                'ordering': ('-id',),
+                'indexes': [models.Index(condition=models.Q(('applied', False)), fields=['product'], name='stock_movement_pending_idx'), models.Index(fields=['product', 'created_at'], name='stock_movement_product_idx')],
+            },
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
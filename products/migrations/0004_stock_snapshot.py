@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stock_movement_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('quantity', models.IntegerField(verbose_name='Остаток на конец дня')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='products.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Снимок остатка',
+                'verbose_name_plural': 'Снимки остатков',
+                'db_table': 'products_stock_snapshot',
+                'constraints': [models.UniqueConstraint(fields=('day', 'product'), name='stock_snapshot_day_product_uniq')],
+            },
+        ),
+    ]
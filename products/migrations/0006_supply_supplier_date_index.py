@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supply',
+            index=models.Index(fields=['supplier', '-delivery_date', '-id'], name='supply_supplier_date_idx'),
+        ),
+    ]
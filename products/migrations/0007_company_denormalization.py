@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_company(apps, schema_editor):
+    Storage = apps.get_model("storages", "Storage")
+    Supplier = apps.get_model("suppliers", "Supplier")
+    Product = apps.get_model("products", "Product")
+    Supply = apps.get_model("products", "Supply")
+    SupplyProduct = apps.get_model("products", "SupplyProduct")
+
+    Product.objects.update(company_id=Subquery(
+        Storage.objects.filter(pk=OuterRef("storage_id")).values("company_id")[:1]
+    ))
+    Supply.objects.update(company_id=Subquery(
+        Supplier.objects.filter(pk=OuterRef("supplier_id")).values("company_id")[:1]
+    ))
+    SupplyProduct.objects.update(company_id=Subquery(
+        Supply.objects.filter(pk=OuterRef("supply_id")).values("company_id")[:1]
+    ))
+
+
+def company_field(null):
+    return models.ForeignKey(
+        db_index=False,
+        editable=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name="+",
+        to="companies.company",
+        verbose_name="Компания",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0002_alter_company_options_joinrequest"),
+        ("products", "0006_supply_supplier_date_index"),
+        ("storages", "0001_initial"),
+        ("suppliers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(model_name="product", name="company", field=company_field(null=True)),
+        migrations.AddField(model_name="supply", name="company", field=company_field(null=True)),
+        migrations.AddField(model_name="supplyproduct", name="company", field=company_field(null=True)),
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+    ]
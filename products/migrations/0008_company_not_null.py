@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def company_field(null):
+    return models.ForeignKey(
+        db_index=False,
+        editable=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name="+",
+        to="companies.company",
+        verbose_name="Компания",
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    NOT NULL и индексы по company — отдельной миграцией (отдельной транзакцией) после заполнения
+    в 0007: на PostgreSQL ALTER TABLE в одной транзакции с UPDATE таблицы с отложенным FK падает
+    с «cannot ALTER TABLE because it has pending trigger events».
+    """
+
+    dependencies = [
+        ("products", "0007_company_denormalization"),
+    ]
+
+    operations = [
+        migrations.AlterField(model_name="product", name="company", field=company_field(null=False)),
+        migrations.AlterField(model_name="supply", name="company", field=company_field(null=False)),
+        migrations.AlterField(model_name="supplyproduct", name="company", field=company_field(null=False)),
+        migrations.RemoveIndex(model_name="product", name="product_storage_title_id_idx"),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["company", "title", "id"], name="product_company_title_id_idx"),
+        ),
+        migrations.RemoveIndex(model_name="supply", name="supply_date_id_idx"),
+        migrations.AddIndex(
+            model_name="supply",
+            index=models.Index(fields=["company", "-delivery_date", "-id"], name="supply_company_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="supplyproduct",
+            index=models.Index(fields=["company", "product"], name="supply_product_company_idx"),
+        ),
+    ]
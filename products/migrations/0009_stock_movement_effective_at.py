@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+
+def backfill_effective_at(apps, schema_editor):
+    StockMovement = apps.get_model("products", "StockMovement")
+    Supply = apps.get_model("products", "Supply")
+    StockSnapshot = apps.get_model("products", "StockSnapshot")
+
+    StockMovement.objects.update(effective_at=F("created_at"))
+    StockMovement.objects.filter(supply__isnull=False).update(effective_at=Subquery(
+        Supply.objects.filter(pk=OuterRef("supply_id")).values("delivery_date")[:1]
+    ))
+    for model in (apps.get_model("sales", "Sale"), apps.get_model("sales", "ArchivedSale")):
+        sale_date = model.objects.filter(pk=OuterRef("sale_id")).values("sale_date")[:1]
+        StockMovement.objects.filter(sale_id__in=model.objects.values("pk")).update(
+            effective_at=Subquery(sale_date),
+        )
+    # Отмена удалённой продажи — на дату самой продажи (её движения kind=sale)
+    StockMovement.objects.filter(kind="sale_reversal", sale_id__isnull=False).update(effective_at=Subquery(
+        StockMovement.objects.filter(
+            kind="sale", sale_id=OuterRef("sale_id"), product_id=OuterRef("product_id"),
+        ).order_by("id").values("effective_at")[:1]
+    ))
+    StockMovement.objects.filter(effective_at__isnull=True).update(effective_at=F("created_at"))
+    # Снимки считались по created_at — снимаются заново командой snapshot_stock
+    StockSnapshot.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_company_not_null"),
+        ("sales", "0009_productsale_company_not_null"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stockmovement",
+            name="effective_at",
+            field=models.DateTimeField(default=timezone.now, null=True, verbose_name="Дата операции"),
+        ),
+        migrations.AddField(
+            model_name="stocksnapshot",
+            name="last_movement_id",
+            field=models.BigIntegerField(default=0, verbose_name="Последнее учтённое движение"),
+        ),
+        migrations.RunPython(backfill_effective_at, migrations.RunPython.noop),
+    ]
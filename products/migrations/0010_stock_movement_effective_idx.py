@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+from core.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("products", "0009_stock_movement_effective_at"),
+    ]
+
+    operations = [
+        # NOT NULL — отдельно от заполнения в 0009 (см. 0008)
+        migrations.AlterField(
+            model_name="stockmovement",
+            name="effective_at",
+            field=models.DateTimeField(default=timezone.now, verbose_name="Дата операции"),
+        ),
+        AddIndexConcurrently(
+            model_name="stockmovement",
+            index=models.Index(fields=["product", "effective_at"], name="stock_movement_effective_idx"),
+        ),
+        migrations.RemoveIndex(model_name="stockmovement", name="stock_movement_product_idx"),
+    ]
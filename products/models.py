@@ -1,11 +1,37 @@
 from django.db import models
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+from companies.models import Company
 from storages.models import Storage
 from suppliers.models import Supplier
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_stock(self):
+        """Аннотирует available_quantity: контрольная точка quantity + ещё не свёрнутые движения."""
+        return self.annotate(
+            available_quantity=F("quantity") + Coalesce(Subquery(pending_delta()), 0),
+        )
+
+
+def pending_delta():
+    """Подзапрос: сумма несвёрнутых движений товара (OuterRef("pk") — товар)."""
+    return (
+        StockMovement.objects.filter(product=OuterRef("pk"), applied=False)
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("delta"))
+        .values("total")
+    )
+
+
 class Product(models.Model):
-    """Товар, привязанный к складу. Quantity пополняется только через поставки."""
+    """
+    Товар, привязанный к складу. Quantity пополняется только через поставки.
+    quantity — контрольная точка остатка; текущий остаток = quantity + несвёрнутые StockMovement.
+    """
     title = models.CharField("Название", max_length=255)
     purchase_price = models.DecimalField("Цена закупки", max_digits=12, decimal_places=2, default=0)
     sale_price = models.DecimalField("Цена продажи", max_digits=12, decimal_places=2, default=0)
@@ -16,6 +42,15 @@ class Product(models.Model):
         related_name="products",
         verbose_name="Склад",
     )
+    # Копия storage.company_id: фильтр по компании и проверка прав без JOIN (см. products.tenancy)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        db_index=False,
+        verbose_name="Компания",
+    )
     created_at = models.DateTimeField("Дата создания", auto_now_add=True)
     updated_at = models.DateTimeField("Дата обновления", auto_now=True)
 
@@ -24,10 +59,24 @@ class Product(models.Model):
         verbose_name_plural = "Товары"
         db_table = "products_product"
         ordering = ("title",)
+        indexes = [
+            # keyset-пагинация списка товаров (core.pagination.ProductKeysetPagination)
+            models.Index(fields=["company", "title", "id"], name="product_company_title_id_idx"),
+        ]
+
+    objects = ProductQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title} (остаток: {self.quantity})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "storage" in update_fields:
+            self.company_id = self.storage.company_id
+            if update_fields is not None and "company" not in update_fields:
+                kwargs["update_fields"] = [*update_fields, "company"]
+        return super().save(*args, **kwargs)
+
 
 class Supply(models.Model):
     """Поставка товаров от поставщика. Связь с товарами через SupplyProduct."""
@@ -37,6 +86,15 @@ class Supply(models.Model):
         related_name="supplies",
         verbose_name="Поставщик",
     )
+    # Копия supplier.company_id (см. products.tenancy)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        db_index=False,
+        verbose_name="Компания",
+    )
     delivery_date = models.DateTimeField("Дата поставки", auto_now_add=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -51,10 +109,24 @@ class Supply(models.Model):
         verbose_name_plural = "Поставки"
         db_table = "products_supply"
         ordering = ("-delivery_date",)
+        indexes = [
+            # keyset-пагинация списка поставок (core.pagination.SupplyKeysetPagination)
+            models.Index(fields=["company", "-delivery_date", "-id"], name="supply_company_date_idx"),
+            # список поставок с фильтром по поставщику в той же сортировке
+            models.Index(fields=["supplier", "-delivery_date", "-id"], name="supply_supplier_date_idx"),
+        ]
 
     def __str__(self):
         return f"Поставка #{self.pk} от {self.supplier.title}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "supplier" in update_fields:
+            self.company_id = self.supplier.company_id
+            if update_fields is not None and "company" not in update_fields:
+                kwargs["update_fields"] = [*update_fields, "company"]
+        return super().save(*args, **kwargs)
+
 
 class SupplyProduct(models.Model):
     """Промежуточная таблица: товар в поставке с количеством."""
@@ -70,6 +142,15 @@ class SupplyProduct(models.Model):
         related_name="supply_items",
         verbose_name="Товар",
     )
+    # Копия supply.company_id (см. products.tenancy)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        db_index=False,
+        verbose_name="Компания",
+    )
     quantity = models.PositiveIntegerField("Количество")
 
     class Meta:
@@ -82,6 +163,99 @@ class SupplyProduct(models.Model):
                 name="unique_supply_product",
             ),
         ]
+        indexes = [
+            models.Index(fields=["company", "product"], name="supply_product_company_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.title} x{self.quantity}"
+
+    def save(self, *args, **kwargs):
+        if self.company_id is None:
+            self.company_id = self.supply.company_id
+        return super().save(*args, **kwargs)
+
+
+class StockMovement(models.Model):
+    """
+    Движение остатка товара (журнал только на добавление).
+    applied=False — движение ещё не свёрнуто в Product.quantity (см. compact_stock_ledger).
+    Продажи списываются с контрольной точки сразу и пишутся с applied=True.
+    """
+
+    class Kind(models.TextChoices):
+        SALE = "sale", "Продажа"
+        SUPPLY = "supply", "Поставка"
+        SALE_REVERSAL = "sale_reversal", "Отмена продажи"
+        ADJUSTMENT = "adjustment", "Корректировка"
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="movements",
+        verbose_name="Товар",
+    )
+    kind = models.CharField("Тип", max_length=16, choices=Kind.choices)
+    delta = models.IntegerField("Изменение")
+    applied = models.BooleanField("Учтено в остатке", default=False)
+    supply = models.ForeignKey(
+        Supply,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movements",
+        verbose_name="Поставка",
+    )
+    # Без FK: продажа может быть удалена, а запись о движении должна остаться
+    sale_id = models.BigIntegerField("ID продажи", null=True, blank=True)
+    comment = models.CharField("Комментарий", max_length=255, blank=True)
+    # Дата операции: sale_date продажи (и её отмены), delivery_date поставки; по ней считаются
+    # остатки на дату. created_at — момент записи, он отличается для продаж задним числом
+    effective_at = models.DateTimeField("Дата операции", default=timezone.now)
+    created_at = models.DateTimeField("Дата", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Движение товара"
+        verbose_name_plural = "Движения товаров"
+        db_table = "products_stock_movement"
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=["product"],
+                condition=Q(applied=False),
+                name="stock_movement_pending_idx",
+            ),
+            models.Index(fields=["product", "effective_at"], name="stock_movement_effective_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product_id} {self.delta:+d}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Дневная контрольная точка остатка: остаток товара на конец дня day (локальное время).
+    Снимаются для всех товаров сразу командой snapshot_stock; см. products.snapshots.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+        verbose_name="Товар",
+    )
+    day = models.DateField("День")
+    quantity = models.IntegerField("Остаток на конец дня")
+    # Снимок учитывает движения с id <= last_movement_id; более поздние записи задним числом
+    # (effective_at в этот день или раньше) добавляются при чтении
+    last_movement_id = models.BigIntegerField("Последнее учтённое движение", default=0)
+
+    class Meta:
+        verbose_name = "Снимок остатка"
+        verbose_name_plural = "Снимки остатков"
+        db_table = "products_stock_snapshot"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="stock_snapshot_day_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} на {self.day}: {self.quantity}"
@@ -7,9 +7,5 @@ class IsCompanyMember(permissions.BasePermission):
         return request.user and request.user.is_authenticated and request.user.company_id
 
     def has_object_permission(self, request, view, obj):
-        cid = request.user.company_id
-        if hasattr(obj, "storage"):
-            return cid == obj.storage.company_id
-        if hasattr(obj, "supplier"):
-            return cid == obj.supplier.company_id
-        return False
+        # Товары и поставки хранят копию company_id — без обращения к складу / поставщику
+        return request.user.company_id == getattr(obj, "company_id", None)
@@ -1,14 +1,16 @@
-from django.db import transaction
 from rest_framework import serializers
+from core.db import atomic_with_retry
 from .models import Product, Supply, SupplyProduct
+from .stock import increment_stock
 
 
 # ─── Product ───
 
 
 class ProductSerializer(serializers.ModelSerializer):
-    """Товар (чтение)."""
+    """Товар (чтение). Queryset — только через Product.objects.with_stock(): остаток берётся из аннотации."""
     storage_address = serializers.CharField(source="storage.address", read_only=True)
+    quantity = serializers.IntegerField(source="available_quantity", read_only=True)
 
     class Meta:
         model = Product
@@ -51,7 +53,7 @@ class SupplyCreateSerializer(serializers.Serializer):
     """
     Создание поставки.
     Принимает: supplier_id + products [{id, quantity}, ...].
-    Увеличивает quantity товаров.
+    Увеличивает остаток товаров (движения в журнале, см. products.stock).
     """
     supplier_id = serializers.IntegerField()
     products = SupplyProductItemSerializer(many=True)
@@ -79,38 +81,38 @@ class SupplyCreateSerializer(serializers.Serializer):
             merged[item["id"]] = merged.get(item["id"], 0) + item["quantity"]
 
         product_ids = list(merged.keys())
-        products = Product.objects.filter(id__in=product_ids).select_related("storage")
+        products = Product.objects.filter(id__in=product_ids)
         found_ids = {p.id for p in products}
         missing = set(product_ids) - found_ids
         if missing:
             raise serializers.ValidationError(f"Товары не найдены: {missing}")
         for p in products:
-            if p.storage.company_id != user.company_id:
+            if p.company_id != user.company_id:
                 raise serializers.ValidationError(f"Товар «{p.title}» не принадлежит вашей компании.")
 
         return [{"id": pid, "quantity": qty} for pid, qty in merged.items()]
 
-    @transaction.atomic
+    @atomic_with_retry
     def create(self, validated_data):
         user = self.context["request"].user
         supply = Supply.objects.create(
             supplier_id=validated_data["supplier_id"],
+            company_id=user.company_id,
             created_by=user,
         )
-        product_ids = [item["id"] for item in validated_data["products"]]
-        products_map = {p.id: p for p in Product.objects.filter(id__in=product_ids).select_for_update()}
-
-        supply_products = []
-        for item in validated_data["products"]:
-            product = products_map[item["id"]]
-            product.quantity += item["quantity"]
-            product.save(update_fields=["quantity"])
-            supply_products.append(SupplyProduct(
+        increment_stock(
+            {item["id"]: item["quantity"] for item in validated_data["products"]},
+            effective_at=supply.delivery_date, supply=supply,
+        )
+        SupplyProduct.objects.bulk_create([
+            SupplyProduct(
                 supply=supply,
-                product=product,
+                product_id=item["id"],
+                company_id=supply.company_id,
                 quantity=item["quantity"],
-            ))
-        SupplyProduct.objects.bulk_create(supply_products)
+            )
+            for item in validated_data["products"]
+        ])
         return supply
 
 
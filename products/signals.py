@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from storages.models import Storage
+from suppliers.models import Supplier
+from .models import Product, Supply, SupplyProduct
+from .tenancy import sync_company
+
+
+@receiver(post_save, sender=Storage)
+def storage_saved(sender, instance, created=False, **kwargs):
+    """Склад перенесён в другую компанию — переносим копию company_id у его товаров."""
+    if not created:
+        sync_company(Product, "storage", [instance.pk])
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, created=False, **kwargs):
+    """Поставщик перенесён в другую компанию — переносим копию у поставок и их строк."""
+    if not created and sync_company(Supply, "supplier", [instance.pk]):
+        sync_company(SupplyProduct, "supply", instance.supplies.values("id"))
@@ -0,0 +1,184 @@
+"""
+Изменение остатков товаров.
+
+Остаток хранится как контрольная точка Product.quantity плюс журнал StockMovement.
+Поступления (поставки, отмены продаж, корректировки) только дописываются в журнал с applied=False
+и строку товара не трогают; compact() периодически сворачивает их в контрольную точку.
+
+Списание условное и остаётся одним UPDATE по строке товара, чтобы не допустить продажи в минус:
+строка обновляется, только если quantity + несвёрнутые движения >= n,
+а нехватка определяется по числу обновлённых строк.
+
+Все пути, меняющие контрольную точку нескольких товаров, блокируют строки в порядке id
+(lock_products), поэтому параллельные транзакции с пересекающимися наборами не взаимоблокируются.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, pending_delta
+
+
+class InsufficientStock(Exception):
+    """Остатка не хватило хотя бы по одному товару; product_ids — такие товары."""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(set(product_ids))
+        super().__init__(f"Недостаточно остатка товаров: {self.product_ids}")
+
+
+def _quantity_case(quantities, sign):
+    return Case(
+        *[When(id=pid, then=F("quantity") + sign * qty) for pid, qty in quantities.items()],
+        default=F("quantity"),
+    )
+
+
+def lock_products(product_ids):
+    """
+    Блокирует строки товаров в порядке возрастания id (SELECT ... ORDER BY id FOR UPDATE).
+    Для одного товара не нужна: единственный UPDATE и так берёт одну блокировку.
+    """
+    product_ids = sorted(set(product_ids))
+    if len(product_ids) > 1:
+        lock_rows(product_ids)
+
+
+def lock_rows(product_ids, company_id=None):
+    """
+    Блокирует строки товаров в порядке возрастания id, в том числе одну.
+    Нужна, если остаток читается до изменения: чтение после блокировки видит согласованные
+    quantity и журнал. company_id — блокировать только товары этой компании.
+    Возвращает id заблокированных (найденных) товаров.
+    """
+    qs = Product.objects.filter(id__in=product_ids)
+    if company_id is not None:
+        qs = qs.filter(company_id=company_id)
+    return list(qs.order_by("id").select_for_update().values_list("id", flat=True))
+
+
+class _Shortfall(Exception):
+    pass
+
+
+def decrement_stock(quantities, sale_id=None, effective_at=None):
+    """
+    Списывает {product_id: quantity} одним UPDATE и пишет движения продажи (applied=True)
+    с датой операции effective_at (sale_date продажи; по умолчанию — сейчас).
+    Если хотя бы по одному товару остатка не хватает — не списывает ничего и бросает InsufficientStock.
+    """
+    if not quantities:
+        return
+    # Блокируем строки до UPDATE даже для одного товара: свёртка меняет quantity и журнал
+    # одной транзакцией, и условие списания должно увидеть их согласованными (READ COMMITTED)
+    lock_rows(quantities)
+    pending = Coalesce(pending_delta(), 0)
+    condition = Q()
+    for pid, qty in quantities.items():
+        condition |= Q(id=pid, quantity__gte=Value(qty) - pending)
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(condition).update(
+                quantity=_quantity_case(quantities, -1),
+            )
+            if updated != len(quantities):
+                raise _Shortfall
+    except _Shortfall:
+        # Частичное списание откачено точкой сохранения — видим исходные остатки
+        current = dict(
+            Product.objects.with_stock()
+            .filter(id__in=quantities)
+            .values_list("id", "available_quantity")
+        )
+        raise InsufficientStock(
+            pid for pid, qty in quantities.items() if current.get(pid, 0) < qty
+        )
+    record_movements(
+        StockMovement.Kind.SALE, quantities, sign=-1, applied=True, effective_at=effective_at, sale_id=sale_id,
+    )
+
+
+def record_movements(kind, quantities, sign=1, applied=False, effective_at=None, **refs):
+    """
+    Дописывает в журнал движения {product_id: quantity} одним INSERT.
+    По умолчанию applied=False: остаток изменится сразу (см. ProductQuerySet.with_stock),
+    а контрольная точка — при следующей свёртке. effective_at — дата операции (по умолчанию — сейчас).
+    """
+    effective_at = effective_at or timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=pid, kind=kind, delta=sign * qty, applied=applied, effective_at=effective_at, **refs,
+            )
+            for pid, qty in quantities.items()
+            if qty
+        ]
+    )
+
+
+def increment_stock(quantities, kind=StockMovement.Kind.SUPPLY, effective_at=None, **refs):
+    """
+    Пополняет / возвращает {product_id: quantity} без блокировки строк товаров.
+    Блокировка не нужна: движение только увеличивает остаток, и списание, не увидевшее ещё
+    не закоммиченное поступление, может лишь отказать по меньшему остатку, но не уйти в минус.
+    compact() свернёт движение, когда оно станет видно (applied=False до свёртки).
+    """
+    record_movements(kind, quantities, effective_at=effective_at, **refs)
+
+
+def move_sale(sale_id, quantities, old_date, new_date):
+    """
+    Переносит движения продажи на другую дату: отмена на старую дату и продажа на новую.
+    Остаток не меняется (обе записи applied=True и взаимно гасятся), меняются остатки на даты между ними.
+    """
+    record_movements(
+        StockMovement.Kind.SALE_REVERSAL, quantities, applied=True, effective_at=old_date, sale_id=sale_id,
+    )
+    record_movements(
+        StockMovement.Kind.SALE, quantities, sign=-1, applied=True, effective_at=new_date, sale_id=sale_id,
+    )
+
+
+def record_adjustment(product_id, delta, comment=""):
+    """
+    Ручная корректировка остатка (инвентаризация, списание брака) на delta единиц.
+    Уменьшение блокирует строку товара, как и списание: иначе параллельная продажа проверила бы
+    остаток без этой корректировки, и вместе они увели бы остаток в минус.
+    """
+    with transaction.atomic():
+        if delta < 0:
+            lock_rows([product_id])
+        return StockMovement.objects.create(
+            product_id=product_id,
+            kind=StockMovement.Kind.ADJUSTMENT,
+            delta=delta,
+            comment=comment,
+        )
+
+
+def compact(batch_size=10000):
+    """
+    Сворачивает до batch_size самых старых несвёрнутых движений в Product.quantity
+    (одним UPDATE по товарам) и помечает их applied=True. Возвращает число свёрнутых движений.
+    """
+    with transaction.atomic():
+        rows = list(
+            StockMovement.objects.filter(applied=False)
+            .order_by("id")
+            .select_for_update(skip_locked=True, of=("self",))
+            .values_list("id", "product_id", "delta")[:batch_size]
+        )
+        if not rows:
+            return 0
+        totals = defaultdict(int)
+        for _, pid, delta in rows:
+            totals[pid] += delta
+        totals = {pid: delta for pid, delta in totals.items() if delta}
+        if totals:
+            lock_products(totals)
+            Product.objects.filter(id__in=totals).update(quantity=_quantity_case(totals, 1))
+        StockMovement.objects.filter(id__in=[row[0] for row in rows]).update(applied=True)
+    return len(rows)
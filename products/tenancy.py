@@ -0,0 +1,33 @@
+"""
+Денормализованный company_id.
+
+Product, Supply, SupplyProduct и ProductSale хранят копию company_id «родителя», чтобы фильтр
+по компании и проверка прав были запросом к одной таблице по индексу, начинающемуся с company.
+Копия задаётся при создании (save() / явно в bulk_create) и переносится сигналами при смене
+компании у склада / поставщика. check_company_ids проверяет и чинит расхождения.
+"""
+from django.db.models import F, OuterRef, Subquery
+
+
+def mismatched(model, parent):
+    """Строки model, у которых company_id расходится с company_id родителя по FK parent."""
+    return model.objects.exclude(company_id=F(f"{parent}__company_id"))
+
+
+def sync_company(model, parent, parent_ids=None):
+    """
+    Проставляет строкам model company_id родителя (одним UPDATE) — только расходящимся.
+    parent_ids ограничивает обновление строками этих родителей. Возвращает число строк.
+    """
+    parent_model = model._meta.get_field(parent).related_model
+    qs = mismatched(model, parent)
+    if parent_ids is not None:
+        qs = qs.filter(**{f"{parent}_id__in": parent_ids})
+    ids = list(qs.values_list("id", flat=True))
+    if not ids:
+        return 0
+    return model.objects.filter(id__in=ids).update(
+        company_id=Subquery(
+            parent_model.objects.filter(pk=OuterRef(f"{parent}_id")).values("company_id")[:1]
+        ),
+    )
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from companies.models import Company
+from products import stock
+from products.models import Product, StockMovement
+from products.stock import InsufficientStock, decrement_stock, increment_stock, record_adjustment
+from storages.models import Storage
+
+
+class LedgerLockingTests(TestCase):
+    """Какие записи журнала остатков берут блокировку строки товара."""
+
+    def setUp(self):
+        company = Company.objects.create(inn="7700000000", title="Тест")
+        storage = Storage.objects.create(address="Склад", company=company)
+        self.product = Product.objects.create(title="Товар", purchase_price=1, sale_price=2, storage=storage)
+        increment_stock({self.product.id: 100})
+
+    def available(self):
+        return Product.objects.with_stock().get(id=self.product.id).available_quantity
+
+    def test_increment_does_not_lock(self):
+        # Поступление только увеличивает остаток — списанию достаточно условного UPDATE
+        with mock.patch.object(stock, "lock_rows", wraps=stock.lock_rows) as lock:
+            increment_stock({self.product.id: 5})
+        lock.assert_not_called()
+        self.assertEqual(self.available(), 105)
+
+    def test_negative_adjustment_locks_product(self):
+        with mock.patch.object(stock, "lock_rows", wraps=stock.lock_rows) as lock:
+            record_adjustment(self.product.id, -95, comment="брак")
+        lock.assert_called_once_with([self.product.id])
+        self.assertEqual(self.available(), 5)
+
+    def test_positive_adjustment_does_not_lock(self):
+        with mock.patch.object(stock, "lock_rows", wraps=stock.lock_rows) as lock:
+            record_adjustment(self.product.id, 3)
+        lock.assert_not_called()
+
+    def test_decrement_sees_negative_adjustment(self):
+        record_adjustment(self.product.id, -95)
+        with self.assertRaises(InsufficientStock):
+            decrement_stock({self.product.id: 6})
+        decrement_stock({self.product.id: 5})
+        self.assertEqual(self.available(), 0)
+        self.assertEqual(
+            StockMovement.objects.filter(product=self.product, kind=StockMovement.Kind.SALE).count(), 1,
+        )
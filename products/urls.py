@@ -2,13 +2,17 @@ from django.urls import path
 from .views import (
     ProductListCreateView,
     ProductDetailView,
+    ProductStockAsOfView,
     SupplyListCreateView,
     SupplyDetailView,
+    SupplyExportView,
 )
 
 urlpatterns = [
     path("", ProductListCreateView.as_view(), name="product-list-create"),
     path("<int:pk>/", ProductDetailView.as_view(), name="product-detail"),
+    path("stock/as-of/", ProductStockAsOfView.as_view(), name="product-stock-as-of"),
     path("supplies/", SupplyListCreateView.as_view(), name="supply-list-create"),
     path("supplies/<int:pk>/", SupplyDetailView.as_view(), name="supply-detail"),
+    path("supplies/export/", SupplyExportView.as_view(), name="supply-export"),
 ]
@@ -1,9 +1,27 @@
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import Product, Supply
+from core.export import (
+    EXPORT_RENDERERS,
+    NDJSONRenderer,
+    filter_by_days,
+    get_export_format,
+    stream_export,
+    stream_serialized,
+)
+from core.fast_serialization import FAST_PARAMETER, FastListMixin, datetime_repr, decimal_repr
+from core.pagination import CURSOR_PARAMETER, ProductKeysetPagination, SupplyKeysetPagination
+from .models import Product, Supply, SupplyProduct
 from .serializers import (
     ProductSerializer,
     ProductCreateUpdateSerializer,
@@ -11,6 +29,7 @@ from .serializers import (
     SupplyCreateSerializer,
 )
 from .permissions import IsCompanyMember
+from .snapshots import day_start, stock_as_of
 
 
 def _get_company_id(request):
@@ -20,20 +39,44 @@ def _get_company_id(request):
     return None
 
 
+def _int_param(request, name):
+    """Необязательный целочисленный ?name= (ID); иначе ValidationError."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValidationError({name: "Ожидается целое число (ID)."})
+    return int(value)
+
+
 # ─── Товары ───
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(FastListMixin, generics.ListCreateAPIView):
     """
-    GET: список товаров компании.
+    GET: список товаров компании (?cursor= — keyset-пагинация по (title, id) вместо ?page=).
+         Ответ строится из values() без сериализатора (core.fast_serialization); ?fast=0 — через ProductSerializer.
     POST: создать товар (quantity=0, пополнение только через поставки).
     """
     permission_classes = (IsCompanyMember,)
+    pagination_class = ProductKeysetPagination
+    # Поля ProductSerializer в том же порядке
+    fast_fields = (
+        ("id", "id", None),
+        ("title", "title", None),
+        ("purchase_price", "purchase_price", decimal_repr(2)),
+        ("sale_price", "sale_price", decimal_repr(2)),
+        ("quantity", "available_quantity", None),
+        ("storage", "storage", None),
+        ("storage_address", "storage__address", None),
+        ("created_at", "created_at", datetime_repr),
+        ("updated_at", "updated_at", datetime_repr),
+    )
 
     def get_queryset(self):
         cid = _get_company_id(self.request)
         if cid:
-            return Product.objects.filter(storage__company_id=cid).select_related("storage")
+            return Product.objects.with_stock().filter(company_id=cid).select_related("storage")
         return Product.objects.none()
 
     def get_serializer_class(self):
@@ -41,6 +84,12 @@ class ProductListCreateView(generics.ListCreateAPIView):
             return ProductCreateUpdateSerializer
         return ProductSerializer
 
+    @swagger_auto_schema(
+        manual_parameters=[CURSOR_PARAMETER, FAST_PARAMETER], responses={200: ProductSerializer(many=True)},
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     """GET/PUT/PATCH/DELETE товара."""
@@ -49,7 +98,7 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         cid = _get_company_id(self.request)
         if cid:
-            return Product.objects.filter(storage__company_id=cid).select_related("storage")
+            return Product.objects.with_stock().filter(company_id=cid).select_related("storage")
         return Product.objects.none()
 
     def get_serializer_class(self):
@@ -58,30 +107,169 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         return ProductSerializer
 
 
+def _parse_moment(value):
+    """
+    ?at= → граница «до» (не включительно): YYYY-MM-DD — конец этого дня,
+    ISO datetime — сам момент (без зоны — в локальном времени).
+    """
+    try:
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        return day_start(day + timedelta(days=1))
+    if moment is None:
+        raise ValidationError({"at": "Неверный формат. Ожидается YYYY-MM-DD или ISO datetime."})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.get_current_timezone())
+    return moment
+
+
+class ProductStockAsOfView(APIView):
+    """
+    GET: остатки товаров компании на момент времени (?at=, опционально ?storage=).
+    Считается от ближайшего дневного снимка + движения после него (см. products.snapshots).
+    """
+    permission_classes = (IsCompanyMember,)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "at", openapi.IN_QUERY, required=True,
+                description="Дата (остаток на конец дня, YYYY-MM-DD) или момент (ISO datetime)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "storage", openapi.IN_QUERY,
+                description="ID склада", type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "at": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                    "snapshot_day": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+                    "products": openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "product_id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                "product_title": openapi.Schema(type=openapi.TYPE_STRING),
+                                "storage": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                "quantity": openapi.Schema(type=openapi.TYPE_INTEGER),
+                            },
+                        ),
+                    ),
+                },
+            ),
+            400: "Ошибка валидации",
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        at = request.query_params.get("at")
+        if not at:
+            raise ValidationError({"at": "Обязательный параметр."})
+        until = _parse_moment(at)
+
+        products = Product.objects.filter(company_id=_get_company_id(request))
+        storage = _int_param(request, "storage")
+        if storage:
+            products = products.filter(storage_id=storage)
+        # Товары, созданные после until, в ответ не попадают
+        products = products.filter(created_at__lt=until).order_by("id")
+
+        quantities, snapshot_day = stock_as_of(products, until)
+        rows = products.values_list("id", "title", "storage_id")
+        return Response({
+            "at": timezone.localtime(until).isoformat(),
+            "snapshot_day": snapshot_day,
+            "products": [
+                {"product_id": pid, "product_title": title, "storage": sid, "quantity": quantities[pid]}
+                for pid, title, sid in rows
+            ],
+        })
+
+
 # ─── Поставки ───
 
 
+SUPPLY_FILTER_PARAMETERS = [
+    openapi.Parameter("supplier", openapi.IN_QUERY, description="ID поставщика", type=openapi.TYPE_INTEGER),
+    openapi.Parameter("product", openapi.IN_QUERY, description="ID товара в поставке", type=openapi.TYPE_INTEGER),
+    openapi.Parameter(
+        "date_from", openapi.IN_QUERY,
+        description="Начало периода (YYYY-MM-DD)",
+        type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+    ),
+    openapi.Parameter(
+        "date_to", openapi.IN_QUERY,
+        description="Конец периода (YYYY-MM-DD)",
+        type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+    ),
+]
+
+
+def _filter_supplies(qs, request, prefix=""):
+    """
+    Фильтры списка / выгрузки поставок: ?supplier=, ?product=, ?date_from=, ?date_to=.
+    prefix — путь до поставки ("supply__" для строк SupplyProduct).
+    """
+    qs = filter_by_days(qs, f"{prefix}delivery_date", request)
+    supplier = _int_param(request, "supplier")
+    if supplier:
+        qs = qs.filter(**{f"{prefix}supplier_id": supplier})
+    product = _int_param(request, "product")
+    if product:
+        if prefix:
+            qs = qs.filter(product_id=product)
+        else:
+            qs = qs.filter(Exists(
+                SupplyProduct.objects.filter(supply_id=OuterRef("pk"), product_id=product)
+            ))
+    return qs
+
+
 class SupplyListCreateView(generics.GenericAPIView):
     """
-    GET: список поставок компании.
+    GET: список поставок компании постранично (?page= или ?cursor= — keyset по (delivery_date, id)).
+         Фильтры: ?supplier=, ?product=, ?date_from=, ?date_to= (даты включительно).
+         ?format=ndjson — потоком все подходящие поставки, по одной на строку.
     POST: создать поставку (supplier_id + products [{id, quantity}]).
     """
     permission_classes = (IsCompanyMember,)
     queryset = Supply.objects.none()
+    pagination_class = SupplyKeysetPagination
+    renderer_classes = (*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer)
 
     def get_queryset(self):
         cid = _get_company_id(self.request)
         if cid:
             return Supply.objects.filter(
-                supplier__company_id=cid
+                company_id=cid
             ).select_related("supplier", "created_by").prefetch_related("items__product")
         return Supply.objects.none()
 
-    @swagger_auto_schema(responses={200: SupplySerializer(many=True)})
+    @swagger_auto_schema(
+        manual_parameters=[
+            *SUPPLY_FILTER_PARAMETERS,
+            CURSOR_PARAMETER,
+            openapi.Parameter(
+                "format", openapi.IN_QUERY,
+                description="ndjson — потоковая выдача всех поставок без пагинации",
+                type=openapi.TYPE_STRING, enum=["json", "ndjson"],
+            ),
+        ],
+        responses={200: SupplySerializer(many=True), 400: "Ошибка валидации"},
+    )
     def get(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = SupplySerializer(qs, many=True)
-        return Response(serializer.data)
+        qs = _filter_supplies(self.get_queryset(), request)
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return stream_serialized(qs, SupplySerializer, "supplies")
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(SupplySerializer(page, many=True).data)
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -108,6 +296,7 @@ class SupplyListCreateView(generics.GenericAPIView):
         serializer = SupplyCreateSerializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
         supply = serializer.save()
+        prefetch_related_objects([supply], "supplier", "created_by", "items__product")
         return Response(
             SupplySerializer(supply).data,
             status=status.HTTP_201_CREATED,
@@ -123,6 +312,50 @@ class SupplyDetailView(generics.RetrieveAPIView):
         cid = _get_company_id(self.request)
         if cid:
             return Supply.objects.filter(
-                supplier__company_id=cid
+                company_id=cid
             ).select_related("supplier", "created_by").prefetch_related("items__product")
         return Supply.objects.none()
+
+
+SUPPLY_EXPORT_COLUMNS = (
+    ("supply_id", "supply_id"),
+    ("delivery_date", "supply__delivery_date"),
+    ("supplier_id", "supply__supplier_id"),
+    ("supplier_title", "supply__supplier__title"),
+    ("created_by", "supply__created_by__username"),
+    ("product_id", "product_id"),
+    ("product_title", "product__title"),
+    ("quantity", "quantity"),
+)
+
+
+class SupplyExportView(APIView):
+    """
+    GET: потоковая выгрузка строк поставок компании (одна строка — товар в поставке).
+    ?format=csv|ndjson&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (даты включительно),
+    ?supplier= и ?product= — как в списке поставок.
+    """
+    permission_classes = (IsCompanyMember,)
+    renderer_classes = EXPORT_RENDERERS
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "format", openapi.IN_QUERY,
+                description="Формат выгрузки: csv (по умолчанию) или ndjson",
+                type=openapi.TYPE_STRING, enum=["csv", "ndjson"],
+            ),
+            *SUPPLY_FILTER_PARAMETERS,
+        ],
+        responses={200: "Файл выгрузки (CSV / NDJSON)", 400: "Ошибка валидации"},
+    )
+    def get(self, request, *args, **kwargs):
+        fmt = get_export_format(request)
+        qs = _filter_supplies(
+            SupplyProduct.objects.filter(company_id=_get_company_id(request)),
+            request,
+            prefix="supply__",
+        ).order_by("supply__delivery_date", "supply_id", "id")
+        columns = [name for name, _ in SUPPLY_EXPORT_COLUMNS]
+        fields = [field for _, field in SUPPLY_EXPORT_COLUMNS]
+        return stream_export(qs.values_list(*fields), columns, fmt, "supplies")
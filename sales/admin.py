@@ -1,11 +1,13 @@
 from django.contrib import admin
-from .models import Sale, ProductSale
+from .cancellation import cancel_sales
+from .models import ArchivedProductSale, ArchivedSale, Sale, ProductSale
 
 
 class ProductSaleInline(admin.TabularInline):
     model = ProductSale
     extra = 0
     raw_id_fields = ("product",)
+    readonly_fields = ("unit_sale_price", "unit_purchase_price", "line_revenue", "line_cost")
 
 
 @admin.register(Sale)
@@ -17,3 +19,39 @@ class SaleAdmin(admin.ModelAdmin):
     raw_id_fields = ("company",)
     readonly_fields = ("created_at", "updated_at")
     inlines = (ProductSaleInline,)
+
+    def delete_queryset(self, request, queryset):
+        """Массовое удаление из списка — с возвратом товаров на склад (как и удаление одной продажи)."""
+        cancel_sales(queryset)
+
+
+class ArchivedProductSaleInline(admin.TabularInline):
+    model = ArchivedProductSale
+    extra = 0
+    can_delete = False
+    readonly_fields = (
+        "product_id", "product_title", "quantity",
+        "unit_sale_price", "unit_purchase_price", "line_revenue", "line_cost",
+    )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedSale)
+class ArchivedSaleAdmin(admin.ModelAdmin):
+    """Архив продаж только для просмотра (переносится командой archive_sales)."""
+    list_display = ("id", "buyer_name", "company", "sale_date")
+    list_display_links = ("id", "buyer_name")
+    search_fields = ("buyer_name",)
+    raw_id_fields = ("company",)
+    inlines = (ArchivedProductSaleInline,)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
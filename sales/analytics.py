@@ -1,13 +1,18 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth
 from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import ProductSale
+from core.export import parse_day
+from .analytics_cache import cached_analytics, get_stats
+from .archive import reaches_archive
+from .models import ArchivedProductSale, ProductSale, SaleDailyRollup, ProductSaleDailyRollup
 from .permissions import IsCompanyMember
 
 PERIOD_PARAM = openapi.Parameter(
@@ -31,6 +36,12 @@ LIMIT_PARAM = openapi.Parameter(
     type=openapi.TYPE_INTEGER,
 )
 
+INTERVAL_PARAM = openapi.Parameter(
+    "interval", openapi.IN_QUERY,
+    description="Размер интервала: hour, day (по умолчанию), week, month",
+    type=openapi.TYPE_STRING, enum=["hour", "day", "week", "month"],
+)
+
 PERIOD_DELTAS = {
     "day": timedelta(days=1),
     "week": timedelta(weeks=1),
@@ -39,41 +50,112 @@ PERIOD_DELTAS = {
 
 
 def _get_date_range(request):
-    """Извлекает диапазон дат из query-параметров или пресета period."""
+    """
+    Извлекает диапазон дней (включительно) из query-параметров или пресета period.
+    Пресеты считаются в днях, включая сегодняшний: day — сегодня, week — 7 дней и т.д.
+    """
     date_from = request.query_params.get("date_from")
     date_to = request.query_params.get("date_to")
     if date_from or date_to:
-        return date_from, date_to
+        return (
+            parse_day(date_from, "date_from") if date_from else None,
+            parse_day(date_to, "date_to") if date_to else None,
+        )
 
     period = request.query_params.get("period")
     delta = PERIOD_DELTAS.get(period)
     if delta:
-        now = timezone.now()
-        return (now - delta).isoformat(), now.isoformat()
+        today = timezone.localdate()
+        return today - delta + timedelta(days=1), today
     return None, None
 
 
-def _base_qs(request):
-    """Базовый queryset ProductSale для компании пользователя с фильтрацией по датам."""
-    qs = ProductSale.objects.filter(
-        sale__company_id=request.user.company_id,
-    )
+def _cache_params(request):
+    """Нормализованные параметры для ключа кэша: диапазон уже приведён к дням."""
+    date_from, date_to = _get_date_range(request)
+    params = request.query_params
+    return {
+        "today": timezone.localdate(),
+        "date_from": date_from,
+        "date_to": date_to,
+        "period": params.get("period"),
+        "limit": params.get("limit"),
+        "interval": params.get("interval"),
+    }
+
+
+def _filter_days(qs, request):
     date_from, date_to = _get_date_range(request)
     if date_from:
-        qs = qs.filter(sale__sale_date__gte=date_from)
+        qs = qs.filter(day__gte=date_from)
     if date_to:
-        qs = qs.filter(sale__sale_date__lte=date_to)
+        qs = qs.filter(day__lte=date_to)
     return qs
 
 
-REVENUE_EXPR = ExpressionWrapper(
-    F("quantity") * F("product__sale_price"),
-    output_field=DecimalField(max_digits=14, decimal_places=2),
-)
-COST_EXPR = ExpressionWrapper(
-    F("quantity") * F("product__purchase_price"),
-    output_field=DecimalField(max_digits=14, decimal_places=2),
-)
+def _base_qs(request):
+    """Дневные агрегаты по товарам для компании пользователя с фильтрацией по датам."""
+    return _filter_days(
+        ProductSaleDailyRollup.objects.filter(company_id=request.user.company_id),
+        request,
+    )
+
+
+def _product_totals(request):
+    """
+    Одна группировка агрегатов по товарам: количество, выручка, себестоимость и прибыль.
+    Возвращает список словарей (строк не больше, чем товаров в периоде).
+    """
+    return list(
+        _base_qs(request)
+        .values("product_id", product_title=F("product__title"))
+        .annotate(
+            total_quantity=Sum("quantity"),
+            revenue=Sum("revenue"),
+            cost=Sum("cost"),
+        )
+        .annotate(
+            net_profit=ExpressionWrapper(
+                F("revenue") - F("cost"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by("-total_quantity", "product_id")
+    )
+
+
+def _profit_row(row):
+    return {
+        "product_id": row["product_id"],
+        "product_title": row["product_title"],
+        "revenue": row["revenue"],
+        "cost": row["cost"],
+        "net_profit": row["net_profit"],
+    }
+
+
+def _quantity_row(row):
+    return {
+        "product_id": row["product_id"],
+        "product_title": row["product_title"],
+        "total_quantity": row["total_quantity"],
+    }
+
+
+def _get_limit(request):
+    try:
+        limit = int(request.query_params.get("limit", 10))
+    except ValueError:
+        raise ValidationError({"limit": "Ожидается целое число."})
+    return max(1, min(limit, 100))
+
+
+def _sales_count(request):
+    qs = _filter_days(
+        SaleDailyRollup.objects.filter(company_id=request.user.company_id),
+        request,
+    )
+    return qs.aggregate(total=Sum("sales_count"))["total"] or 0
 
 
 class ProfitAnalyticsView(APIView):
@@ -92,15 +174,16 @@ class ProfitAnalyticsView(APIView):
             }},
         )},
     )
+    @cached_analytics("profit", _cache_params)
     def get(self, request):
         qs = _base_qs(request)
         agg = qs.aggregate(
-            total_revenue=Sum(REVENUE_EXPR),
-            total_cost=Sum(COST_EXPR),
+            total_revenue=Sum("revenue"),
+            total_cost=Sum("cost"),
         )
         revenue = agg["total_revenue"] or 0
         cost = agg["total_cost"] or 0
-        sales_count = qs.values("sale").distinct().count()
+        sales_count = _sales_count(request)
 
         return Response({
             "total_revenue": revenue,
@@ -127,12 +210,13 @@ class ProductsSoldAnalyticsView(APIView):
             }},
         )},
     )
+    @cached_analytics("products-sold", _cache_params)
     def get(self, request):
         qs = _base_qs(request)
         total = qs.aggregate(total=Sum("quantity"))["total"] or 0
         per_product = (
             qs.values(
-                product_id=F("product__id"),
+                "product_id",
                 product_title=F("product__title"),
             )
             .annotate(total_quantity=Sum("quantity"))
@@ -164,30 +248,15 @@ class ProfitByProductAnalyticsView(APIView):
             }},
         )},
     )
+    @cached_analytics("profit-by-product", _cache_params)
     def get(self, request):
-        qs = _base_qs(request)
-        per_product = (
-            qs.values(
-                product_id=F("product__id"),
-                product_title=F("product__title"),
-            )
-            .annotate(
-                revenue=Sum(REVENUE_EXPR),
-                cost=Sum(COST_EXPR),
-            )
-            .annotate(
-                net_profit=ExpressionWrapper(
-                    F("revenue") - F("cost"),
-                    output_field=DecimalField(max_digits=14, decimal_places=2),
-                ),
-            )
-        )
-        most = per_product.order_by("-net_profit").first()
-        least = per_product.order_by("net_profit").first()
+        rows = _product_totals(request)
+        most = max(rows, key=lambda r: r["net_profit"], default=None)
+        least = min(rows, key=lambda r: r["net_profit"], default=None)
 
         return Response({
-            "most_profitable": most,
-            "least_profitable": least,
+            "most_profitable": most and _profit_row(most),
+            "least_profitable": least and _profit_row(least),
         })
 
 
@@ -208,14 +277,15 @@ class TopProductsAnalyticsView(APIView):
             }},
         )},
     )
+    @cached_analytics("top-products", _cache_params)
     def get(self, request):
         qs = _base_qs(request)
-        limit = min(int(request.query_params.get("limit", 10)), 100)
+        limit = _get_limit(request)
         period = request.query_params.get("period")
 
         top = (
             qs.values(
-                product_id=F("product__id"),
+                "product_id",
                 product_title=F("product__title"),
             )
             .annotate(total_quantity=Sum("quantity"))
@@ -225,3 +295,259 @@ class TopProductsAnalyticsView(APIView):
             "period": period or "custom",
             "top": list(top),
         })
+
+
+class DashboardAnalyticsView(APIView):
+    """
+    Сводка для главной страницы одним ответом: итоги, количество продаж,
+    продажи по товарам, самый/наименее прибыльный товар и топ товаров.
+    Считается из одной группировки дневных агрегатов по товарам.
+    """
+    permission_classes = (IsCompanyMember,)
+
+    @swagger_auto_schema(
+        manual_parameters=[DATE_FROM_PARAM, DATE_TO_PARAM, PERIOD_PARAM, LIMIT_PARAM],
+        responses={200: openapi.Response(
+            description="Сводка аналитики",
+            examples={"application/json": {
+                "period": "week",
+                "total_revenue": "15000.00",
+                "total_cost": "9000.00",
+                "net_profit": "6000.00",
+                "sales_count": 12,
+                "total_quantity": 150,
+                "products": [
+                    {"product_id": 1, "product_title": "Товар 1", "total_quantity": 80},
+                ],
+                "most_profitable": {
+                    "product_id": 1, "product_title": "Товар 1",
+                    "revenue": "10000.00", "cost": "5000.00", "net_profit": "5000.00",
+                },
+                "least_profitable": {
+                    "product_id": 3, "product_title": "Товар 3",
+                    "revenue": "500.00", "cost": "400.00", "net_profit": "100.00",
+                },
+                "top": [
+                    {"product_id": 1, "product_title": "Товар 1", "total_quantity": 80},
+                ],
+            }},
+        )},
+    )
+    @cached_analytics("dashboard", _cache_params)
+    def get(self, request):
+        limit = _get_limit(request)
+        rows = _product_totals(request)
+
+        revenue = sum((r["revenue"] for r in rows), 0)
+        cost = sum((r["cost"] for r in rows), 0)
+        products = [_quantity_row(r) for r in rows]
+        most = max(rows, key=lambda r: r["net_profit"], default=None)
+        least = min(rows, key=lambda r: r["net_profit"], default=None)
+
+        return Response({
+            "period": request.query_params.get("period") or "custom",
+            "total_revenue": revenue,
+            "total_cost": cost,
+            "net_profit": revenue - cost,
+            "sales_count": _sales_count(request),
+            "total_quantity": sum(r["total_quantity"] for r in rows),
+            "products": products,
+            "most_profitable": most and _profit_row(most),
+            "least_profitable": least and _profit_row(least),
+            "top": products[:limit],
+        })
+
+
+# ─── Временные ряды ───
+
+
+INTERVAL_TRUNCS = {
+    "hour": TruncHour,
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+# Период по умолчанию (в днях, включая сегодня), если не указаны даты и period
+INTERVAL_DEFAULT_DAYS = {
+    "hour": 1,
+    "day": 30,
+    "week": 7 * 12,
+    "month": 365,
+}
+
+MAX_BUCKETS = 2000
+
+
+def _bucket_start(day, interval):
+    """Начало интервала, содержащего день day (для day/week/month)."""
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket, interval):
+    if interval == "hour":
+        return bucket + timedelta(hours=1)
+    if interval == "day":
+        return bucket + timedelta(days=1)
+    if interval == "week":
+        return bucket + timedelta(weeks=1)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1)
+    return bucket.replace(month=bucket.month + 1)
+
+
+def _bucket_keys(date_from, date_to, interval):
+    """Все интервалы диапазона по порядку (для заполнения пустых)."""
+    tz = timezone.get_current_timezone()
+    if interval == "hour":
+        bucket = timezone.make_aware(datetime.combine(date_from, time.min), tz)
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+    else:
+        bucket = _bucket_start(date_from, interval)
+        end = date_to + timedelta(days=1)
+    keys = []
+    while bucket < end:
+        keys.append(bucket)
+        if len(keys) > MAX_BUCKETS:
+            raise ValidationError({
+                "interval": f"Слишком много интервалов (больше {MAX_BUCKETS}). Сузьте период.",
+            })
+        bucket = _next_bucket(bucket, interval)
+    return keys
+
+
+def _series_rows(request, date_from, date_to, interval):
+    """
+    Один сгруппированный запрос: суммы по интервалам.
+    day/week/month считаются по дневным агрегатам, hour — по строкам продаж
+    (и по архиву, если период до него доходит).
+    """
+    trunc = INTERVAL_TRUNCS[interval]
+    if interval == "hour":
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(date_from, time.min), tz)
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+        qs = ProductSale.objects.filter(
+            company_id=request.user.company_id,
+            sale__sale_date__gte=start,
+            sale__sale_date__lt=end,
+        ).values(bucket=trunc("sale__sale_date", tzinfo=tz))
+        revenue, cost = "line_revenue", "line_cost"
+        if reaches_archive(request.user.company_id, start, end):
+            archived = ArchivedProductSale.objects.filter(
+                sale__company_id=request.user.company_id,
+                sale__sale_date__gte=start,
+                sale__sale_date__lt=end,
+            ).values(bucket=trunc("sale__sale_date", tzinfo=tz))
+            return _sum_buckets(_annotate_totals(qs, revenue, cost), _annotate_totals(archived, revenue, cost))
+    else:
+        qs = ProductSaleDailyRollup.objects.filter(
+            company_id=request.user.company_id,
+            day__gte=date_from,
+            day__lte=date_to,
+        ).values(bucket=trunc("day"))
+        revenue, cost = "revenue", "cost"
+    return _annotate_totals(qs, revenue, cost)
+
+
+def _annotate_totals(qs, revenue, cost):
+    return qs.annotate(
+        total_quantity=Sum("quantity"),
+        total_revenue=Sum(revenue),
+        total_cost=Sum(cost),
+    ).order_by("bucket")
+
+
+def _sum_buckets(*row_sets):
+    """Складывает строки нескольких группировок с одинаковыми bucket."""
+    merged = {}
+    for rows in row_sets:
+        for row in rows:
+            total = merged.setdefault(row["bucket"], {"bucket": row["bucket"]})
+            for key in ("total_quantity", "total_revenue", "total_cost"):
+                total[key] = total.get(key, 0) + (row[key] or 0)
+    return [merged[bucket] for bucket in sorted(merged)]
+
+
+class TimeSeriesAnalyticsView(APIView):
+    """
+    Выручка, себестоимость, прибыль и количество по интервалам (час / день / неделя / месяц)
+    в часовом поясе TIME_ZONE. Пустые интервалы заполняются нулями.
+    """
+    permission_classes = (IsCompanyMember,)
+
+    @swagger_auto_schema(
+        manual_parameters=[INTERVAL_PARAM, DATE_FROM_PARAM, DATE_TO_PARAM, PERIOD_PARAM],
+        responses={200: openapi.Response(
+            description="Временной ряд",
+            examples={"application/json": {
+                "interval": "day",
+                "date_from": "2025-01-01",
+                "date_to": "2025-01-02",
+                "series": [
+                    {"bucket": "2025-01-01", "revenue": "1500.00", "cost": "900.00",
+                     "net_profit": "600.00", "quantity": 15},
+                    {"bucket": "2025-01-02", "revenue": "0", "cost": "0",
+                     "net_profit": "0", "quantity": 0},
+                ],
+            }},
+        )},
+    )
+    @cached_analytics("timeseries", _cache_params)
+    def get(self, request):
+        interval = request.query_params.get("interval", "day")
+        if interval not in INTERVAL_TRUNCS:
+            raise ValidationError({"interval": "Допустимые значения: hour, day, week, month."})
+
+        date_from, date_to = _get_date_range(request)
+        today = timezone.localdate()
+        date_to = date_to or today
+        date_from = date_from or date_to - timedelta(days=INTERVAL_DEFAULT_DAYS[interval] - 1)
+        if date_from > date_to:
+            raise ValidationError({"date_from": "Начало периода позже его конца."})
+
+        keys = _bucket_keys(date_from, date_to, interval)
+        rows = {}
+        for row in _series_rows(request, date_from, date_to, interval):
+            bucket = row["bucket"]
+            if interval != "hour" and isinstance(bucket, datetime):
+                bucket = bucket.date()
+            rows[bucket] = row
+
+        series = []
+        for key in keys:
+            row = rows.get(key, {})
+            revenue = row.get("total_revenue") or 0
+            cost = row.get("total_cost") or 0
+            series.append({
+                "bucket": key.isoformat(),
+                "revenue": revenue,
+                "cost": cost,
+                "net_profit": revenue - cost,
+                "quantity": row.get("total_quantity") or 0,
+            })
+
+        return Response({
+            "interval": interval,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "series": series,
+        })
+
+
+class AnalyticsCacheStatsView(APIView):
+    """Счётчики попаданий/промахов кэша аналитики (в текущем процессе)."""
+    permission_classes = (IsCompanyMember,)
+
+    @swagger_auto_schema(
+        responses={200: openapi.Response(
+            description="Статистика кэша",
+            examples={"application/json": {"hits": 120, "misses": 30, "hit_ratio": 0.8}},
+        )},
+    )
+    def get(self, request):
+        return Response(get_stats())
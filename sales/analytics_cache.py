@@ -0,0 +1,123 @@
+"""
+Кэш результатов аналитики.
+
+Ключ: компания + версия данных компании (AnalyticsVersion) + эндпоинт + нормализованные
+параметры (диапазон уже приведён к дням, поэтому пресеты period дают одинаковые ключи в течение дня).
+Версия увеличивается в транзакции каждой записи продаж / товаров, поэтому инвалидация
+не требует обхода ключей и работает с любым бэкендом кэша (locmem, файловый).
+"""
+import functools
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework.response import Response
+
+from companies.models import Company
+from core import metrics
+from . import singleflight
+from .models import AnalyticsVersion
+
+CACHE_ALIAS = "analytics"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    metrics.inc("analytics_cache_requests_total", (("result", name),))
+
+
+def get_stats():
+    """Счётчики попаданий/промахов и single-flight текущего процесса."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+        "singleflight": singleflight.group.stats(),
+    }
+
+
+def get_version(company_id):
+    return (
+        AnalyticsVersion.objects.filter(company_id=company_id)
+        .values_list("version", flat=True)
+        .first()
+    ) or 0
+
+
+def bump_version(company_id):
+    """Инвалидирует кэш аналитики компании. Вызывать в транзакции записи."""
+    updated = AnalyticsVersion.objects.filter(company_id=company_id).update(
+        version=F("version") + 1,
+    )
+    if not updated and Company.objects.filter(pk=company_id).exists():
+        AnalyticsVersion.objects.bulk_create(
+            [AnalyticsVersion(company_id=company_id, version=1)],
+            ignore_conflicts=True,
+        )
+
+
+def make_key(company_id, version, endpoint, params):
+    raw = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if v is not None)
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"analytics:{company_id}:{version}:{endpoint}:{digest}"
+
+
+def cached_analytics(endpoint, key_params):
+    """
+    Декоратор get-метода аналитического APIView.
+    key_params(request) возвращает словарь нормализованных параметров запроса.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            company_id = request.user.company_id
+            key = make_key(
+                company_id, get_version(company_id), endpoint, key_params(request),
+            )
+            cache = caches[CACHE_ALIAS]
+            data = cache.get(key)
+            if data is not None:
+                _count("hits")
+                response = Response(data)
+                response["X-Analytics-Cache"] = "hit"
+                return response
+
+            _count("misses")
+            if not settings.ANALYTICS_SINGLEFLIGHT:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+                response["X-Analytics-Cache"] = "miss"
+                return response
+
+            def compute():
+                """(данные, статус, заголовки представления, из кэша ли)."""
+                with singleflight.process_lock(key):
+                    # Пока ждали блокировку, результат мог посчитать другой воркер
+                    cached = cache.get(key)
+                    if cached is not None:
+                        return cached, 200, {}, True
+                    response = method(self, request, *args, **kwargs)
+                    if response.status_code == 200:
+                        cache.set(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+                    # Content-Type выставит рендерер ответа
+                    headers = {
+                        name: value for name, value in response.items() if name.lower() != "content-type"
+                    }
+                    return response.data, response.status_code, headers, False
+
+            (data, status, headers, from_cache), shared = singleflight.group.do(key, compute)
+            response = Response(data, status=status, headers=headers)
+            response["X-Analytics-Cache"] = "shared" if shared or from_cache else "miss"
+            return response
+        return wrapper
+    return decorator
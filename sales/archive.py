@@ -0,0 +1,120 @@
+"""
+Архив продаж: продажи старше SALES_ARCHIVE_DAYS переносятся из sales_sale / sales_product_sale
+в компактные таблицы sales_archived_sale / sales_archived_product_sale (без индексов горячих путей).
+
+Архивация не меняет остатки и дневные агрегаты: аналитика по дням продолжает читать rollup-таблицы,
+rebuild() учитывает архив. Список продаж, выгрузка и почасовая аналитика читают архив, только если
+запрошенный период до него доходит (reaches_archive); детали продажи ищутся в архиве, если её нет
+в sales_sale.
+"""
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedProductSale, ArchivedSale, ProductSale, Sale
+
+BATCH_SIZE = 1000
+ORDERING = ("-sale_date", "-id")
+
+
+def archive_cutoff(days=None):
+    """Граница архива: продажи с sale_date раньше неё подлежат переносу."""
+    days = settings.SALES_ARCHIVE_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+@transaction.atomic
+def _archive_batch(sales_qs, batch_size):
+    sales = list(sales_qs.select_for_update().order_by("id")[:batch_size])
+    if not sales:
+        return 0
+    ids = [sale.id for sale in sales]
+    ArchivedSale.objects.bulk_create([
+        ArchivedSale(
+            id=sale.id, buyer_name=sale.buyer_name, company_id=sale.company_id,
+            sale_date=sale.sale_date, created_at=sale.created_at, updated_at=sale.updated_at,
+        )
+        for sale in sales
+    ])
+    lines = ProductSale.objects.filter(sale_id__in=ids).values(
+        "sale_id", "product_id", "quantity", "unit_sale_price", "unit_purchase_price",
+        "line_revenue", "line_cost", product_title=F("product__title"),
+    )
+    ArchivedProductSale.objects.bulk_create([ArchivedProductSale(**line) for line in lines])
+    # QuerySet.delete(), а не Sale.delete(): товары не возвращаются на склад, агрегаты не меняются
+    Sale.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_sales(before=None, company_id=None, batch_size=BATCH_SIZE):
+    """
+    Переносит продажи с sale_date < before (по умолчанию archive_cutoff()) в архив
+    пакетами по batch_size, каждый пакет — отдельная транзакция. Возвращает число продаж.
+    """
+    sales_qs = Sale.objects.filter(sale_date__lt=before or archive_cutoff())
+    if company_id is not None:
+        sales_qs = sales_qs.filter(company_id=company_id)
+    total = 0
+    while True:
+        moved = _archive_batch(sales_qs, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def reaches_archive(company_id, date_from=None, date_to=None):
+    """Есть ли в архиве компании продажи в периоде [date_from, date_to] (границы — datetime/строки)."""
+    qs = ArchivedSale.objects.filter(company_id=company_id)
+    if date_from:
+        qs = qs.filter(sale_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(sale_date__lte=date_to)
+    return qs.exists()
+
+
+class SaleTiers:
+    """
+    Оперативные и архивные продажи одной последовательностью в порядке (-sale_date, -id).
+    Поддерживает то, что нужно пагинации: count(), срезы, order_by() и filter() (применяются
+    к обеим частям). Срез [a:b] читает ключи первых b записей каждой части, сливает их
+    и загружает только объекты страницы.
+    """
+    model = Sale
+    ordered = True
+
+    def __init__(self, hot, archived):
+        self.hot = hot.order_by(*ORDERING)
+        self.archived = archived.order_by(*ORDERING)
+
+    def order_by(self, *fields):
+        if tuple(fields) != ORDERING:
+            raise ValueError(f"SaleTiers поддерживает только сортировку {ORDERING}.")
+        return self
+
+    def filter(self, *args, **kwargs):
+        return SaleTiers(self.hot.filter(*args, **kwargs), self.archived.filter(*args, **kwargs))
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.stop is None or key.step is not None:
+            raise TypeError("SaleTiers поддерживает только срезы с верхней границей.")
+        start, stop = key.start or 0, key.stop
+        keys = heapq.merge(
+            ((sale_date, pk, False) for sale_date, pk in self.hot.values_list("sale_date", "id")[:stop]),
+            ((sale_date, pk, True) for sale_date, pk in self.archived.values_list("sale_date", "id")[:stop]),
+            reverse=True,
+        )
+        page = list(islice(keys, start, stop))
+        hot = self.hot.in_bulk([pk for _, pk, archived in page if not archived])
+        archived = self.archived.in_bulk([pk for _, pk, archived in page if archived])
+        return [(archived if is_archived else hot)[pk] for _, pk, is_archived in page]
@@ -0,0 +1,89 @@
+"""
+Отмена (удаление) продаж с возвратом товаров на склад.
+
+Работает пакетно для любого набора продаж: строки продаж читаются одним запросом на пачку,
+возврат остатков — один INSERT ... SELECT движений в журнал на пачку (StockMovement, без блокировки товаров),
+агрегаты — один проход apply_sales на компанию за всю отмену (по upsert на таблицу агрегатов). Используется в Sale.delete, API массовой
+отмены и в админке, поэтому удаление через QuerySet больше не обходит возврат остатков.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from core.db import atomic_with_retry
+from products.models import StockMovement
+from .models import ProductSale, Sale
+from .rollups import apply_sales
+
+CANCEL_CHUNK_SIZE = 1000
+
+
+def _record_reversals(sale_ids):
+    """
+    Движения возврата (applied=False, дата — sale_date продажи) по строкам продаж sale_ids
+    одним INSERT ... SELECT: bulk_create на SQLite делится на пакеты по 999 параметров,
+    и число запросов росло бы с числом строк.
+    """
+    qn = connection.ops.quote_name
+    movement, line, sale = StockMovement._meta, ProductSale._meta, Sale._meta
+    constants = {
+        "kind": StockMovement.Kind.SALE_REVERSAL,
+        "applied": False,
+        "comment": "",
+        "created_at": timezone.now(),
+    }
+    columns = ["product", "delta", "sale_id", "effective_at", *constants]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(movement.db_table)} "
+            f"({', '.join(qn(movement.get_field(name).column) for name in columns)}) "
+            f"SELECT l.{qn(line.get_field('product').column)}, l.{qn(line.get_field('quantity').column)}, "
+            f"l.{qn(line.get_field('sale').column)}, s.{qn(sale.get_field('sale_date').column)}, "
+            f"{', '.join(['%s'] * len(constants))} "
+            f"FROM {qn(line.db_table)} l JOIN {qn(sale.db_table)} s "
+            f"ON s.{qn(sale.pk.column)} = l.{qn(line.get_field('sale').column)} "
+            f"WHERE l.{qn(line.get_field('sale').column)} IN ({', '.join(['%s'] * len(sale_ids))}) "
+            f"ORDER BY l.{qn(line.get_field('sale').column)}, l.{qn(line.get_field('product').column)}",
+            [
+                *(movement.get_field(name).get_db_prep_save(value, connection) for name, value in constants.items()),
+                *sale_ids,
+            ],
+        )
+
+
+@atomic_with_retry
+def cancel_sales(sales):
+    """
+    Удаляет продажи queryset'а sales, возвращая товары на склад и вычитая продажи из агрегатов.
+    Возвращает результат в формате QuerySet.delete(): (всего удалено, {модель: количество}).
+    """
+    # Блокируем продажи: параллельная отмена тех же продаж дождётся нас и их уже не найдёт
+    rows = list(
+        sales.order_by("id").select_for_update().values_list("id", "company_id", "sale_date")
+    )
+    total, per_model = 0, Counter()
+    by_company = defaultdict(list)
+    for start in range(0, len(rows), CANCEL_CHUNK_SIZE):
+        chunk = rows[start:start + CANCEL_CHUNK_SIZE]
+        ids = [sale_id for sale_id, _, _ in chunk]
+
+        lines = defaultdict(list)
+        for line in ProductSale.objects.filter(sale_id__in=ids).only(
+            "sale_id", "product_id", "quantity", "line_revenue", "line_cost",
+        ):
+            lines[line.sale_id].append(line)
+
+        for sale_id, company_id, sale_date in chunk:
+            by_company[company_id].append((sale_date, lines[sale_id]))
+
+        # Строка продажи уникальна по (продажа, товар) — одно движение на строку
+        _record_reversals(ids)
+        deleted, counts = Sale.objects.filter(id__in=ids).delete()
+        total += deleted
+        per_model.update(counts)
+
+    # Агрегаты — одним проходом на компанию после всех пачек, а не на каждую пачку
+    for company_id, company_sales in sorted(by_company.items()):
+        apply_sales(company_id, company_sales, sign=-1)
+    return total, dict(per_model)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sales.archive import BATCH_SIZE, archive_cutoff, archive_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит продажи старше --days дней (SALES_ARCHIVE_DAYS) в архивные таблицы. "
+        "Остатки и дневные агрегаты не меняются; список продаж и выгрузка читают архив, "
+        "если запрошенный период до него доходит."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SALES_ARCHIVE_DAYS,
+                            help=f"Возраст продаж в днях (по умолчанию {settings.SALES_ARCHIVE_DAYS})")
+        parser.add_argument("--company", type=int, default=None, help="Только продажи компании")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Продаж за одну транзакцию")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["days"])
+        moved = archive_sales(cutoff, options["company"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Перенесено в архив продаж: {moved} (старше {cutoff:%Y-%m-%d %H:%M})."
+        ))
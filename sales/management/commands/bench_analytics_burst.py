@@ -0,0 +1,115 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from sales.analytics import (
+    DashboardAnalyticsView,
+    ProfitByProductAnalyticsView,
+    TopProductsAnalyticsView,
+)
+from sales.analytics_cache import CACHE_ALIAS
+from sales.seed import delete_seeded_company, seed_company
+from users.models import User
+
+ENDPOINTS = {
+    "dashboard": DashboardAnalyticsView,
+    "profit-by-product": ProfitByProductAnalyticsView,
+    "top-products": TopProductsAnalyticsView,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк: N одинаковых параллельных запросов аналитики с single-flight и без него. "
+        "Показывает число SQL-запросов и вычислений на «холодном» кэше. "
+        "По умолчанию создаёт отдельную синтетическую компанию (sales.seed) и удаляет её после замера: "
+        "потоки читают через свои соединения, поэтому данные коммитятся, а не откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, help="Читать данные существующей компании (только чтение)")
+        parser.add_argument("--seed", type=int, default=5000, metavar="SALES",
+                            help="Продаж в синтетической компании (по умолчанию 5000)")
+        parser.add_argument("--requests", type=int, default=32, help="Размер всплеска (N)")
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="dashboard")
+        parser.add_argument("--query", default="period=month", help="Query string запроса")
+
+    def handle(self, *args, **options):
+        seeded = None
+        if options["company"]:
+            user = User.objects.filter(company_id=options["company"]).first()
+            if user is None:
+                raise CommandError(f"В компании #{options['company']} нет пользователей.")
+        else:
+            sales = options["seed"]
+            with transaction.atomic():
+                user = seeded = seed_company(sales=sales, products=max(sales // 20, 10), days=30)
+        try:
+            self._compare(user, options)
+        finally:
+            if seeded is not None:
+                delete_seeded_company(seeded)
+
+    def _compare(self, user, options):
+        view = ENDPOINTS[options["endpoint"]].as_view()
+        url = f"/api/v1/sales/analytics/{options['endpoint']}/?{options['query']}"
+        n = options["requests"]
+
+        for enabled in (False, True):
+            with override_settings(ANALYTICS_SINGLEFLIGHT=enabled):
+                result = self._burst(view, url, user, n)
+            label = "single-flight" if enabled else "без single-flight"
+            self.stdout.write(
+                f"{label:>18}: {n} запросов, {result['computations']} вычислений, "
+                f"{result['queries']} SQL-запросов, {result['elapsed_ms']:.1f} мс, "
+                f"ошибок: {result['errors']}"
+            )
+
+    def _burst(self, view, url, user, n):
+        caches[CACHE_ALIAS].clear()
+        factory = APIRequestFactory()
+        barrier = threading.Barrier(n)
+        lock = threading.Lock()
+        totals = {"queries": 0, "errors": 0}
+        misses = {"count": 0}
+
+        def count_queries(execute, sql, params, many, context):
+            with lock:
+                totals["queries"] += 1
+            return execute(sql, params, many, context)
+
+        def worker():
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+            try:
+                with connection.execute_wrapper(count_queries):
+                    barrier.wait()
+                    response = view(request)
+                if response.get("X-Analytics-Cache") == "miss":
+                    with lock:
+                        misses["count"] += 1
+            except Exception:
+                with lock:
+                    totals["errors"] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(n)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        return {
+            "computations": misses["count"],
+            "queries": totals["queries"],
+            "errors": totals["errors"],
+            "elapsed_ms": elapsed,
+        }
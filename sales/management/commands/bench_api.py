@@ -0,0 +1,188 @@
+import json
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from sales.analytics_cache import CACHE_ALIAS
+from sales.scenarios import build_context, build_request, make_clients, missing_routes, route_key, select_routes
+from sales.seed import seed_company
+
+
+def _percentile(values, q):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def _growth(sizes, values):
+    """Показатель степени роста value ~ size^k между первым и последним масштабом."""
+    if len(sizes) < 2 or values[0] <= 0 or values[-1] <= 0 or sizes[0] == sizes[-1]:
+        return None
+    return round(math.log(values[-1] / values[0]) / math.log(sizes[-1] / sizes[0]), 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сквозной бенчмарк API: для каждого масштаба создаёт синтетические данные (компании, склады, "
+        "поставщики, товары, поставки, продажи и их строки), проходит тестовым клиентом по всем маршрутам "
+        "core/api_urls.py и записывает p50/p95, число SQL-запросов и пик памяти в JSON. "
+        "Данные создаются в транзакции и откатываются; запросы на изменение откатываются по одному."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sales", type=int, action="append", metavar="N",
+                            help="Продаж в основной компании; по масштабу на значение (по умолчанию 1000, 5000, 20000)")
+        parser.add_argument("--products", type=int, help="Товаров (по умолчанию продажи / 10, не меньше 10)")
+        parser.add_argument("--supplies", type=int, help="Поставок (по умолчанию продажи / 10)")
+        parser.add_argument("--lines-per-sale", type=int, default=2, help="Строк в продаже (по умолчанию 2)")
+        parser.add_argument("--storages", type=int, default=3, help="Складов (по умолчанию 3)")
+        parser.add_argument("--suppliers", type=int, default=5, help="Поставщиков (по умолчанию 5)")
+        parser.add_argument("--employees", type=int, default=10, help="Сотрудников, не меньше 1 (по умолчанию 10)")
+        parser.add_argument("--companies", type=int, default=20,
+                            help="Других компаний в каталоге, с небольшими данными (по умолчанию 20)")
+        parser.add_argument("--repeat", type=int, default=10, help="Запросов на маршрут (по умолчанию 10)")
+        parser.add_argument("--route", action="append", help="Только указанные имена URL")
+        parser.add_argument("--warm-cache", action="store_true",
+                            help="Не очищать кэш аналитики перед запросами (по умолчанию — холодный кэш)")
+        parser.add_argument("--label", default="", help="Метка прогона в JSON (например, ветка)")
+        parser.add_argument("--output", help="Файл JSON (по умолчанию — stdout)")
+
+    def handle(self, *args, **options):
+        missing = missing_routes()
+        if missing:
+            raise CommandError(f"Нет сценария для маршрутов (sales.scenarios.ROUTES): {', '.join(missing)}")
+        routes = select_routes(options["route"])
+        if not routes:
+            raise CommandError("Не выбрано ни одного маршрута.")
+
+        scales = []
+        # Метрики /metrics бенчмарком не засоряем; тестовый клиент ходит на testserver
+        with override_settings(METRICS_ENABLED=False, ALLOWED_HOSTS=["testserver"]):
+            for sales in sorted(set(options["sales"] or [1000, 5000, 20000])):
+                with transaction.atomic():
+                    scales.append(self._run_scale(sales, routes, options))
+                    transaction.set_rollback(True)
+
+        result = {
+            "label": options["label"],
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "cache": "warm" if options["warm_cache"] else "cold",
+            "created_at": timezone.now().isoformat(),
+            "scales": scales,
+            "curves": self._curves(scales),
+        }
+        self._summary(result)
+        payload = json.dumps(result, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload + "\n")
+            self.stderr.write(f"Результаты записаны в {options['output']}")
+        else:
+            self.stdout.write(payload)
+
+    def _run_scale(self, sales, routes, options):
+        self.stderr.write(f"Масштаб: {sales} продаж — создание данных...")
+        products = options["products"] or max(sales // 10, 10)
+        supplies = options["supplies"] or max(sales // 10, 1)
+        started = time.perf_counter()
+        for i in range(options["companies"]):
+            seed_company(sales=10, products=5, seed=i + 1)
+        owner = seed_company(
+            sales=sales, products=products, supplies=supplies, lines_per_sale=options["lines_per_sale"],
+            storages=options["storages"], suppliers=options["suppliers"], employees=max(options["employees"], 1),
+        )
+        seed_seconds = time.perf_counter() - started
+        ctx = build_context(owner)
+        clients = make_clients(ctx)
+
+        measured = {}
+        for route in routes:
+            key = route_key(route)
+            role, method, url, data = build_request(route, ctx)
+            measured[key] = self._measure(clients[role], method, url, data, options)
+            self.stderr.write(f"  {key:<40} {measured[key]['p50_ms']:>9.1f} мс {measured[key]['queries']:>5} SQL")
+
+        return {
+            "sales": sales,
+            "sale_lines": sales * options["lines_per_sale"],
+            "products": products,
+            "supplies": supplies,
+            "storages": options["storages"],
+            "suppliers": options["suppliers"],
+            "employees": max(options["employees"], 1),
+            "companies": options["companies"] + 1,
+            "seed_seconds": round(seed_seconds, 2),
+            "routes": measured,
+        }
+
+    def _request(self, client, method, url, data, options):
+        """Один запрос в savepoint с откатом: (мс, SQL-запросов, статус)."""
+        if not options["warm_cache"]:
+            caches[CACHE_ALIAS].clear()
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data, format="json")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        return elapsed, len(queries), response.status_code
+
+    def _measure(self, client, method, url, data, options):
+        timings = []
+        for _ in range(max(options["repeat"], 1)):
+            elapsed, queries, status = self._request(client, method, url, data, options)
+            timings.append(elapsed)
+        # Память — отдельным запросом: tracemalloc замедляет выполнение
+        tracemalloc.start()
+        try:
+            self._request(client, method, url, data, options)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            "status": status,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+            "queries": queries,
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def _curves(self, scales):
+        """Для каждого маршрута: значения по масштабам и показатель роста от числа продаж."""
+        sizes = [scale["sales"] for scale in scales]
+        curves = {}
+        for key in scales[0]["routes"] if scales else ():
+            points = [scale["routes"][key] for scale in scales]
+            p50 = [point["p50_ms"] for point in points]
+            queries = [point["queries"] for point in points]
+            peak = [point["peak_kib"] for point in points]
+            curves[key] = {
+                "sales": sizes,
+                "p50_ms": p50,
+                "p95_ms": [point["p95_ms"] for point in points],
+                "queries": queries,
+                "peak_kib": peak,
+                "p50_growth": _growth(sizes, p50),
+                "peak_growth": _growth(sizes, peak),
+                "queries_grow": queries[-1] > queries[0],
+            }
+        return curves
+
+    def _summary(self, result):
+        """Таблица в stderr: p50 по масштабам и показатель роста (≈1 — линейно от истории)."""
+        sizes = [scale["sales"] for scale in result["scales"]]
+        self.stderr.write(f"\n{'маршрут':<40} " + " ".join(f"{size:>9}" for size in sizes) + f" {'рост':>6} SQL")
+        for key, curve in sorted(result["curves"].items(), key=lambda item: -(item[1]["p50_growth"] or 0)):
+            growth = "" if curve["p50_growth"] is None else f"{curve['p50_growth']:.2f}"
+            sql = "→".join(str(q) for q in curve["queries"])
+            self.stderr.write(f"{key:<40} " + " ".join(f"{ms:>9.1f}" for ms in curve["p50_ms"]) + f" {growth:>6} {sql}")
@@ -0,0 +1,105 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from products.views import ProductListCreateView
+from sales.seed import seed_company
+from sales.views import SaleListCreateView
+from users.models import User
+
+ENDPOINTS = {
+    "sales": SaleListCreateView,
+    "products": ProductListCreateView,
+}
+
+
+def _normalized(data):
+    """
+    Для сравнения ответов: без ссылок next/previous (в них разный ?fast) и без зависимости
+    от порядка строк внутри продажи (в SaleSerializer он не задан).
+    """
+    for row in data["results"]:
+        if "product_sales" in row:
+            row["product_sales"].sort(key=lambda line: line["product_id"])
+    return data.get("count"), data["results"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк списков продаж и товаров: быстрый путь через values() (core.fast_serialization) "
+        "против сериализаторов DRF. Проверяет, что ответы совпадают, и печатает время и число запросов. "
+        "Без --company создаёт синтетическую компанию в транзакции и откатывает её."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, help="Мерить на данных существующей компании")
+        parser.add_argument("--seed", type=int, default=5000, metavar="SALES",
+                            help="Продаж в синтетической компании (по умолчанию 5000)")
+        parser.add_argument("--page-size", type=int, action="append",
+                            help="Размер страницы (можно несколько раз; по умолчанию 20, 200, 1000)")
+        parser.add_argument("--repeat", type=int, default=5, help="Повторов на замер (берётся медиана)")
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), action="append",
+                            help="Только указанные списки (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        page_sizes = options["page_size"] or [20, 200, 1000]
+        endpoints = options["endpoint"] or sorted(ENDPOINTS)
+        mismatches = []
+
+        with transaction.atomic():
+            if options["company"]:
+                user = User.objects.filter(company_id=options["company"], is_company_owner=True).first()
+                if user is None:
+                    raise CommandError(f"У компании #{options['company']} нет владельца.")
+            else:
+                sales = options["seed"]
+                user = seed_company(sales=sales, products=max(sales // 5, 10))
+
+            self.stdout.write(f"{'список':<10} {'строк':>6} {'DRF, мс':>9} {'values, мс':>11} "
+                              f"{'ускорение':>10} {'SQL DRF/values':>15}")
+            for name in endpoints:
+                view = ENDPOINTS[name].as_view()
+                for page_size in page_sizes:
+                    drf = self._measure(view, user, f"page_size={page_size}&fast=0", options["repeat"])
+                    fast = self._measure(view, user, f"page_size={page_size}", options["repeat"])
+                    if _normalized(drf["data"]) != _normalized(fast["data"]):
+                        mismatches.append(f"{name}, page_size={page_size}")
+                    self.stdout.write(
+                        f"{name:<10} {len(fast['data']['results']):>6} {drf['ms']:>9.1f} {fast['ms']:>11.1f} "
+                        f"{drf['ms'] / fast['ms']:>9.1f}x {drf['queries']:>7}/{fast['queries']}"
+                    )
+            transaction.set_rollback(True)
+
+        if mismatches:
+            raise CommandError(f"Ответы быстрого пути отличаются от сериализаторов: {'; '.join(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("Ответы совпадают."))
+
+    def _measure(self, view, user, query, repeat):
+        """Медиана времени полного ответа (запросы + сериализация + JSON) и число SQL-запросов."""
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(repeat):
+            counter = {"queries": 0}
+
+            def count_queries(execute, sql, params, many, context):
+                counter["queries"] += 1
+                return execute(sql, params, many, context)
+
+            request = factory.get(f"/?{query}")
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            with connection.execute_wrapper(count_queries):
+                response = view(request)
+                response.render()
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"?{query}: HTTP {response.status_code}")
+        return {
+            "ms": statistics.median(timings),
+            "queries": counter["queries"],
+            "data": json.loads(response.content),
+        }
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products.models import Product, Supply, SupplyProduct
+from products.tenancy import mismatched, sync_company
+from sales.models import ProductSale
+
+# (модель, FK на «родителя», от которого копируется company_id) — родители раньше потомков
+DENORMALIZED = (
+    (Product, "storage"),
+    (Supply, "supplier"),
+    (SupplyProduct, "supply"),
+    (ProductSale, "sale"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет денормализованный company_id (Product, Supply, SupplyProduct, ProductSale) "
+        "на совпадение с company_id склада / поставщика / поставки / продажи."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Исправить расхождения")
+
+    def handle(self, *args, **options):
+        total = 0
+        with transaction.atomic():
+            for model, parent in DENORMALIZED:
+                count = mismatched(model, parent).count()
+                if count and options["fix"]:
+                    sync_company(model, parent)
+                total += count
+                self.stdout.write(f"{model._meta.label}: расхождений {count}")
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет."))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено строк: {total}."))
+        else:
+            raise CommandError(f"Найдено расхождений: {total} (запустите с --fix).")
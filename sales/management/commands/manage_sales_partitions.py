@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sales import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Помесячное секционирование sales_sale на PostgreSQL: перевод таблицы (--convert, необратимо: "
+        "внешний ключ sales_product_sale.sale_id снимается, вернуть обычную таблицу можно только из резервной копии), "
+        "создание будущих секций, отключение старых (--detach-older-than), проверка pruning. "
+        "На других СУБД ничего не делает."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true",
+                            help="Перевести sales_sale на секционирование (однократно и необратимо)")
+        parser.add_argument("--ahead", type=int, default=3, help="Создать секции на N месяцев вперёд")
+        parser.add_argument("--detach-older-than", type=int, default=None, metavar="MONTHS",
+                            help="Отключить секции старше N месяцев (только пустые, уже перенесённые в архив)")
+        parser.add_argument("--verify", action="store_true",
+                            help="Проверить, что запрос за месяц читает только его секцию")
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            self.stdout.write("Секционирование поддерживается только на PostgreSQL — пропущено.")
+            return
+
+        if options["convert"]:
+            dropped = partitioning.convert(options["ahead"])
+            if dropped is None:
+                self.stdout.write("sales_sale уже секционирована.")
+            else:
+                self.stdout.write(self.style.SUCCESS("sales_sale переведена на секционирование."))
+                for name in dropped:
+                    self.stdout.write(self.style.WARNING(
+                        f"Внешний ключ {name} снят: при PK (id, sale_date) его держать не на чем.",
+                    ))
+        elif not partitioning.is_partitioned():
+            raise CommandError("sales_sale не секционирована. Запустите с --convert.")
+
+        for name in partitioning.ensure_partitions(options["ahead"]):
+            self.stdout.write(f"Создана секция {name}")
+        if options["detach_older_than"] is not None:
+            try:
+                detached = partitioning.detach_older_than(options["detach_older_than"])
+            except partitioning.PartitionNotEmpty as exc:
+                raise CommandError(f"{exc} (archive_sales).")
+            for name in detached:
+                self.stdout.write(f"Отключена секция {name}")
+
+        for name, month in partitioning.list_partitions():
+            self.stdout.write(f"  {name}" + (f" ({month:%Y-%m})" if month else " (default)"))
+
+        if options["verify"]:
+            scanned, plan = partitioning.verify_pruning()
+            self.stdout.write(plan)
+            expected = partitioning.partition_name(partitioning.month_start(partitioning.timezone.localdate()))
+            if scanned != [expected]:
+                raise CommandError(f"Pruning не сработал: читаются секции {scanned}, ожидалась {expected}.")
+            self.stdout.write(self.style.SUCCESS(f"Pruning работает: читается только {expected}."))
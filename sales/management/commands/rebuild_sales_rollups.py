@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sales import rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает дневные агрегаты продаж (backfill / восстановление)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company", type=int, default=None,
+            help="ID компании (по умолчанию — все компании)",
+        )
+
+    def handle(self, *args, **options):
+        company_id = options["company"]
+        with transaction.atomic():
+            count = rollups.rebuild(company_id)
+        scope = f"компании #{company_id}" if company_id is not None else "всех компаний"
+        self.stdout.write(self.style.SUCCESS(
+            f"Агрегаты продаж для {scope} пересчитаны: {count} строк по товарам."
+        ))
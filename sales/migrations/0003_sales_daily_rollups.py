@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Sale = apps.get_model("sales", "Sale")
+    ProductSale = apps.get_model("sales", "ProductSale")
+    SaleDailyRollup = apps.get_model("sales", "SaleDailyRollup")
+    ProductSaleDailyRollup = apps.get_model("sales", "ProductSaleDailyRollup")
+    tz = timezone.get_current_timezone()
+    money = DecimalField(max_digits=14, decimal_places=2)
+
+    SaleDailyRollup.objects.bulk_create(
+        [
+            SaleDailyRollup(company_id=row["company_id"], day=row["day"], sales_count=row["sales_count"])
+            for row in Sale.objects.order_by()
+            .values("company_id", day=TruncDate("sale_date", tzinfo=tz))
+            .annotate(sales_count=Count("id"))
+        ],
+        batch_size=1000,
+    )
+    ProductSaleDailyRollup.objects.bulk_create(
+        [
+            ProductSaleDailyRollup(
+                company_id=row["company_id"],
+                product_id=row["product_id"],
+                day=row["day"],
+                quantity=row["total_quantity"],
+                revenue=row["total_revenue"],
+                cost=row["total_cost"],
+            )
+            for row in ProductSale.objects.order_by()
+            .values(
+                "product_id",
+                company_id=F("sale__company_id"),
+                day=TruncDate("sale__sale_date", tzinfo=tz),
+            )
+            .annotate(
+                total_quantity=Sum("quantity"),
+                total_revenue=Sum(F("quantity") * F("product__sale_price"), output_field=money),
+                total_cost=Sum(F("quantity") * F("product__purchase_price"), output_field=money),
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_alter_company_options_joinrequest'),
+        ('products', '0002_alter_product_options_alter_supply_options_and_more'),
+        ('sales', '0002_remove_productsale_price_at_sale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSaleDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Себестоимость')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sale_daily_rollups', to='companies.company', verbose_name='Компания')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='products.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Продажи товара за день',
+                'verbose_name_plural': 'Продажи товаров по дням',
+                'db_table': 'sales_product_sale_daily_rollup',
+                'constraints': [models.UniqueConstraint(fields=('company', 'day', 'product'), name='unique_product_sale_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Количество продаж')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_rollups', to='companies.company', verbose_name='Компания')),
+            ],
+            options={
+                'verbose_name': 'Продажи за день',
+                'verbose_name_plural': 'Продажи по дням',
+                'db_table': 'sales_sale_daily_rollup',
+                'constraints': [models.UniqueConstraint(fields=('company', 'day'), name='unique_sale_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def snapshot_prices(apps, schema_editor):
+    """Заполняет цены существующих строк текущими ценами товаров."""
+    ProductSale = apps.get_model("sales", "ProductSale")
+    Product = apps.get_model("products", "Product")
+    product = Product.objects.filter(pk=OuterRef("product_id"))
+    ProductSale.objects.update(
+        unit_sale_price=Subquery(product.values("sale_price")[:1]),
+        unit_purchase_price=Subquery(product.values("purchase_price")[:1]),
+    )
+    ProductSale.objects.update(
+        line_revenue=F("quantity") * F("unit_sale_price"),
+        line_cost=F("quantity") * F("unit_purchase_price"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_options_alter_supply_options_and_more'),
+        ('sales', '0003_sales_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsale',
+            name='unit_sale_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Цена продажи за единицу'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='productsale',
+            name='unit_purchase_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Цена закупки за единицу'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='productsale',
+            name='line_revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка по строке'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='productsale',
+            name='line_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Себестоимость по строке'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productsale',
+            index=models.Index(fields=['sale'], include=('quantity', 'line_revenue', 'line_cost'), name='product_sale_totals_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_alter_company_options_joinrequest'),
+        ('sales', '0004_productsale_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsVersion',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analytics_version', serialize=False, to='companies.company', verbose_name='Компания')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия данных аналитики',
+                'verbose_name_plural': 'Версии данных аналитики',
+                'db_table': 'sales_analytics_version',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_alter_company_options_joinrequest'),
+        ('sales', '0005_analytics_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['company', '-sale_date', '-id'], name='sale_company_date_id_idx'),
+        ),
+    ]
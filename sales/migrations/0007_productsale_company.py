@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_company(apps, schema_editor):
+    Sale = apps.get_model("sales", "Sale")
+    ProductSale = apps.get_model("sales", "ProductSale")
+    ProductSale.objects.update(company_id=Subquery(
+        Sale.objects.filter(pk=OuterRef("sale_id")).values("company_id")[:1]
+    ))
+
+
+def company_field(null):
+    return models.ForeignKey(
+        db_index=False,
+        editable=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name="+",
+        to="companies.company",
+        verbose_name="Компания",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0002_alter_company_options_joinrequest"),
+        ("sales", "0006_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(model_name="productsale", name="company", field=company_field(null=True)),
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_join_request_indexes'),
+        ('sales', '0007_productsale_company'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('buyer_name', models.CharField(max_length=255, verbose_name='Имя покупателя')),
+                ('sale_date', models.DateTimeField(verbose_name='Дата продажи')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='companies.company', verbose_name='Компания')),
+            ],
+            options={
+                'verbose_name': 'Архивная продажа',
+                'verbose_name_plural': 'Архив продаж',
+                'db_table': 'sales_archived_sale',
+                'ordering': ('-sale_date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedProductSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(verbose_name='ID товара')),
+                ('product_title', models.CharField(max_length=255, verbose_name='Название товара')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('unit_sale_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена продажи за единицу')),
+                ('unit_purchase_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена закупки за единицу')),
+                ('line_revenue', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Выручка по строке')),
+                ('line_cost', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Себестоимость по строке')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales', to='sales.archivedsale', verbose_name='Продажа')),
+            ],
+            options={
+                'verbose_name': 'Товар в архивной продаже',
+                'verbose_name_plural': 'Товары в архивных продажах',
+                'db_table': 'sales_archived_product_sale',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['company', '-sale_date', '-id'], name='archived_sale_company_date_idx'),
+        ),
+    ]
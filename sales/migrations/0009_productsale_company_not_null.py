@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def company_field(null):
+    return models.ForeignKey(
+        db_index=False,
+        editable=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name="+",
+        to="companies.company",
+        verbose_name="Компания",
+    )
+
+
+class Migration(migrations.Migration):
+    """NOT NULL и индекс по company после заполнения в 0007 — в отдельной транзакции (см. products 0008)."""
+
+    dependencies = [
+        ("sales", "0008_sale_archive"),
+    ]
+
+    operations = [
+        migrations.AlterField(model_name="productsale", name="company", field=company_field(null=False)),
+        migrations.AddIndex(
+            model_name="productsale",
+            index=models.Index(fields=["company", "product"], name="product_sale_company_idx"),
+        ),
+    ]
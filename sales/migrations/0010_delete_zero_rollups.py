@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def delete_zero_rows(apps, schema_editor):
+    """Строки агрегатов, обнулённые удалением и отменой продаж до этой миграции."""
+    SaleDailyRollup = apps.get_model("sales", "SaleDailyRollup")
+    ProductSaleDailyRollup = apps.get_model("sales", "ProductSaleDailyRollup")
+    SaleDailyRollup.objects.filter(sales_count__lte=0).delete()
+    ProductSaleDailyRollup.objects.filter(quantity__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0009_productsale_company_not_null"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_zero_rows, migrations.RunPython.noop),
+    ]
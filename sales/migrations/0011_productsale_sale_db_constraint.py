@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    ProductSale.sale — без ограничения в базе только в состоянии миграций: ограничение остаётся
+    до перевода sales_sale на секционирование, которое его снимает (sales.partitioning.convert).
+    """
+
+    dependencies = [
+        ("sales", "0010_delete_zero_rollups"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="productsale",
+                    name="sale",
+                    field=models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="product_sales",
+                        to="sales.sale",
+                        verbose_name="Продажа",
+                    ),
+                ),
+            ],
+        ),
+    ]
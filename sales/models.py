@@ -21,23 +21,29 @@ class Sale(models.Model):
         verbose_name_plural = "Продажи"
         db_table = "sales_sale"
         ordering = ("-sale_date",)
+        indexes = [
+            # keyset-пагинация списка продаж компании (core.pagination.SaleKeysetPagination)
+            models.Index(fields=["company", "-sale_date", "-id"], name="sale_company_date_id_idx"),
+        ]
 
     def __str__(self):
         return f"Продажа #{self.pk} — {self.buyer_name}"
 
     def delete(self, *args, **kwargs):
-        """При удалении продажи возвращаем товары на склад."""
-        for item in self.product_sales.select_related("product"):
-            item.product.quantity += item.quantity
-            item.product.save(update_fields=["quantity"])
-        return super().delete(*args, **kwargs)
+        """При удалении продажи возвращаем товары на склад и вычитаем её из дневных агрегатов."""
+        from .cancellation import cancel_sales
+
+        return cancel_sales(Sale.objects.filter(pk=self.pk))
 
 
 class ProductSale(models.Model):
     """Промежуточная таблица: товар в продаже с количеством."""
+    # Ограничение в базе есть до перевода sales_sale на секционирование (sales.partitioning.convert
+    # его снимает), поэтому в состоянии миграций — без него; каскад выполняет ORM
     sale = models.ForeignKey(
         Sale,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name="product_sales",
         verbose_name="Продажа",
     )
@@ -47,7 +53,20 @@ class ProductSale(models.Model):
         related_name="product_sales",
         verbose_name="Товар",
     )
+    # Копия sale.company_id (см. products.tenancy)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        db_index=False,
+        verbose_name="Компания",
+    )
     quantity = models.PositiveIntegerField("Количество")
+    unit_sale_price = models.DecimalField("Цена продажи за единицу", max_digits=12, decimal_places=2)
+    unit_purchase_price = models.DecimalField("Цена закупки за единицу", max_digits=12, decimal_places=2)
+    line_revenue = models.DecimalField("Выручка по строке", max_digits=14, decimal_places=2)
+    line_cost = models.DecimalField("Себестоимость по строке", max_digits=14, decimal_places=2)
 
     class Meta:
         verbose_name = "Товар в продаже"
@@ -59,6 +78,177 @@ class ProductSale(models.Model):
                 name="unique_sale_product",
             ),
         ]
+        indexes = [
+            # Покрывающий индекс: суммы по продаже считаются без обращения к таблице и к products_product
+            models.Index(
+                fields=["sale"],
+                include=["quantity", "line_revenue", "line_cost"],
+                name="product_sale_totals_idx",
+            ),
+            models.Index(fields=["company", "product"], name="product_sale_company_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.title} x{self.quantity}"
+
+    def snapshot_prices(self):
+        """Фиксирует цены товара на момент продажи и суммы по строке."""
+        self.unit_sale_price = self.product.sale_price
+        self.unit_purchase_price = self.product.purchase_price
+        self.line_revenue = self.quantity * self.unit_sale_price
+        self.line_cost = self.quantity * self.unit_purchase_price
+
+    def save(self, *args, **kwargs):
+        if self.company_id is None:
+            self.company_id = self.sale.company_id
+        if self.unit_sale_price is None or self.unit_purchase_price is None:
+            self.snapshot_prices()
+        return super().save(*args, **kwargs)
+
+
+# ─── Архив продаж ───
+
+
+class ArchivedSale(models.Model):
+    """
+    Продажа, перенесённая в архив командой archive_sales (см. sales.archive).
+    id совпадает с id исходной продажи; архив только для чтения.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    buyer_name = models.CharField("Имя покупателя", max_length=255)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+        verbose_name="Компания",
+    )
+    sale_date = models.DateTimeField("Дата продажи")
+    created_at = models.DateTimeField("Дата создания")
+    updated_at = models.DateTimeField("Дата обновления")
+
+    class Meta:
+        verbose_name = "Архивная продажа"
+        verbose_name_plural = "Архив продаж"
+        db_table = "sales_archived_sale"
+        ordering = ("-sale_date",)
+        indexes = [
+            models.Index(fields=["company", "-sale_date", "-id"], name="archived_sale_company_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"Архивная продажа #{self.pk} — {self.buyer_name}"
+
+
+class ArchivedProductSale(models.Model):
+    """
+    Строка архивной продажи. Товар хранится как id и название на момент архивации
+    (без внешнего ключа: удаление товара не трогает архив).
+    """
+    sale = models.ForeignKey(
+        ArchivedSale,
+        on_delete=models.CASCADE,
+        related_name="product_sales",
+        verbose_name="Продажа",
+    )
+    product_id = models.BigIntegerField("ID товара")
+    product_title = models.CharField("Название товара", max_length=255)
+    quantity = models.PositiveIntegerField("Количество")
+    unit_sale_price = models.DecimalField("Цена продажи за единицу", max_digits=12, decimal_places=2)
+    unit_purchase_price = models.DecimalField("Цена закупки за единицу", max_digits=12, decimal_places=2)
+    line_revenue = models.DecimalField("Выручка по строке", max_digits=14, decimal_places=2)
+    line_cost = models.DecimalField("Себестоимость по строке", max_digits=14, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Товар в архивной продаже"
+        verbose_name_plural = "Товары в архивных продажах"
+        db_table = "sales_archived_product_sale"
+
+    def __str__(self):
+        return f"{self.product_title} x{self.quantity}"
+
+
+# ─── Агрегаты для аналитики ───
+
+
+class SaleDailyRollup(models.Model):
+    """Количество продаж компании за день (по локальной дате sale_date)."""
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="sale_daily_rollups",
+        verbose_name="Компания",
+    )
+    day = models.DateField("День")
+    sales_count = models.IntegerField("Количество продаж", default=0)
+
+    class Meta:
+        verbose_name = "Продажи за день"
+        verbose_name_plural = "Продажи по дням"
+        db_table = "sales_sale_daily_rollup"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company", "day"],
+                name="unique_sale_daily_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} / {self.day}: {self.sales_count}"
+
+
+class ProductSaleDailyRollup(models.Model):
+    """Проданное количество, выручка и себестоимость товара за день."""
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="product_sale_daily_rollups",
+        verbose_name="Компания",
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="daily_rollups",
+        verbose_name="Товар",
+    )
+    day = models.DateField("День")
+    quantity = models.IntegerField("Количество", default=0)
+    revenue = models.DecimalField("Выручка", max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField("Себестоимость", max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Продажи товара за день"
+        verbose_name_plural = "Продажи товаров по дням"
+        db_table = "sales_product_sale_daily_rollup"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company", "day", "product"],
+                name="unique_product_sale_daily_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} / {self.day}: {self.quantity}"
+
+
+class AnalyticsVersion(models.Model):
+    """
+    Версия данных аналитики компании. Увеличивается при каждой записи,
+    влияющей на аналитику, и входит в ключ кэша — старые записи кэша просто перестают читаться.
+    """
+    company = models.OneToOneField(
+        Company,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="analytics_version",
+        verbose_name="Компания",
+    )
+    version = models.BigIntegerField("Версия", default=0)
+
+    class Meta:
+        verbose_name = "Версия данных аналитики"
+        verbose_name_plural = "Версии данных аналитики"
+        db_table = "sales_analytics_version"
+
+    def __str__(self):
+        return f"{self.company_id}: v{self.version}"
@@ -0,0 +1,251 @@
+"""
+Помесячное секционирование sales_sale по sale_date (только PostgreSQL, по желанию).
+
+convert() превращает sales_sale в секционированную таблицу (PARTITION BY RANGE (sale_date)):
+секции sales_sale_pYYYYMM по локальным месяцам и sales_sale_default для остального.
+Первичный ключ становится (id, sale_date) — этого требует PostgreSQL. Внешние ключи на sales_sale
+восстанавливаются, только если их колонки — уникальный ключ новой таблицы; ключ
+sales_product_sale.sale_id → sales_sale(id) к ним не относится и снимается (в состоянии миграций
+он уже без ограничения в базе — sales.0011). Каскадное удаление строк продаж и так выполняет ORM
+(on_delete=CASCADE), а id по-прежнему выдаётся одной последовательностью.
+Перевод необратим: обратной операции нет, вернуть обычную таблицу можно только из резервной копии.
+
+ORM-код не меняется: запросы идут в родительскую таблицу, а фильтр по sale_date отсекает
+лишние секции (partition pruning). На SQLite и до convert() всё работает с обычной таблицей.
+
+Отключать можно только пустые секции — месяцы, уже перенесённые в архив (sales.archive): без
+внешнего ключа строки sales_product_sale отключённых продаж остались бы сиротами и продолжали
+читаться выгрузкой, остатками на дату и check_company_ids.
+"""
+import re
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Sale
+
+TABLE = Sale._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+class PartitionNotEmpty(Exception):
+    """Секции, которые нельзя отключить: в них есть продажи (не перенесены в архив)."""
+
+    def __init__(self, names):
+        self.names = names
+        super().__init__(f"В секциях есть продажи, сначала перенесите их в архив: {', '.join(names)}")
+
+
+def is_supported():
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(day):
+    """Граница секции — начало локального дня в виде timestamptz-литерала."""
+    return timezone.make_aware(datetime.combine(day, time.min)).isoformat()
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def list_partitions():
+    """[(имя секции, первый день месяца или None для default)] в порядке месяцев."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    result = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        result.append((name, date(int(match[1]), int(match[2]), 1) if match else None))
+    return sorted(result, key=lambda item: (item[1] is None, item[1] or date.min))
+
+
+@transaction.atomic
+def create_partition(month):
+    """
+    Создаёт секцию месяца month, если её нет. Строки этого месяца, уже попавшие
+    в default-секцию, переносятся в новую (иначе PostgreSQL не даст подключить секцию).
+    Возвращает True, если секция создана.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if any(existing == name for existing, _ in list_partitions()):
+        return False
+    start, end = _bound(month), _bound(add_months(month, 1))
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} "
+            f"WHERE sale_date >= %s AND sale_date < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    return True
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """Секции от текущего месяца на months_ahead месяцев вперёд. Возвращает имена созданных."""
+    current = month_start(today or timezone.localdate())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+@transaction.atomic
+def detach_older_than(months, today=None):
+    """
+    Отключает секции месяцев старше months полных месяцев. Все они должны быть пустыми (продажи
+    перенесены в архив), иначе ничего не отключается и бросается PartitionNotEmpty.
+    Таблицы секций остаются в базе (их можно удалить отдельно). Возвращает имена отключённых секций.
+    """
+    cutoff = add_months(month_start(today or timezone.localdate()), -months)
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        # Блокировка до проверки: пока секции не отключены, в них не запишут продажу задним числом
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        names = [name for name, month in list_partitions() if month is not None and month < cutoff]
+        not_empty = []
+        for name in names:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {qn(name)})")
+            if cursor.fetchone()[0]:
+                not_empty.append(name)
+        if not_empty:
+            raise PartitionNotEmpty(not_empty)
+        for name in names:
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+    return names
+
+
+@transaction.atomic
+def convert(months_ahead=3):
+    """
+    Переводит sales_sale на секционирование (необратимо): новая секционированная таблица с теми же
+    колонками, индексами и внешними ключами, помесячные секции на весь диапазон данных,
+    перенос строк, последовательность id продолжает существующую. Внешние ключи других таблиц
+    на sales_sale восстанавливаются, если их колонки — уникальный ключ новой таблицы.
+    Возвращает имена снятых и не восстановленных внешних ключей или None, если таблица уже секционирована.
+    """
+    if is_partitioned():
+        return None
+    qn = connection.ops.quote_name
+    legacy = f"{TABLE}_unpartitioned"
+    with connection.cursor() as cursor:
+        # Определения индексов (кроме PK) и внешних ключей исходной таблицы
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [TABLE, TABLE],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        # Внешние ключи других таблиц на sales_sale: снимаются на время перевода, а после восстанавливаются
+        # те, что ссылаются на уникальный ключ новой таблицы (на (id) при PK (id, sale_date) — нельзя)
+        cursor.execute(
+            "SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid), "
+            "ARRAY(SELECT a.attname FROM unnest(c.confkey) k "
+            "JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k ORDER BY a.attname) "
+            "FROM pg_constraint c WHERE c.confrelid = %s::regclass AND c.contype = 'f'",
+            [TABLE],
+        )
+        referencing = cursor.fetchall()
+        for table, name, _, _ in referencing:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {qn(name)}")
+
+        cursor.execute(f"SELECT min(sale_date), max(sale_date), max(id) FROM {qn(TABLE)}")
+        first, last, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(legacy)} INCLUDING DEFAULTS, "
+            f"PRIMARY KEY (id, sale_date)) PARTITION BY RANGE (sale_date)"
+        )
+        cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT")
+
+    today = month_start(timezone.localdate())
+    start = month_start(timezone.localdate(first)) if first else today
+    end = max(month_start(timezone.localdate(last)) if last else today, add_months(today, months_ahead))
+    month = start
+    while month <= end:
+        create_partition(month)
+        month = add_months(month, 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(legacy)}")
+        # Вместе со старой таблицей удаляются её индексы и identity-последовательность id
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}")
+        sequence = f"{TABLE}_id_seq"
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.id")
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, max_id is not None])
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence])
+
+        cursor.execute(
+            "SELECT ARRAY(SELECT a.attname FROM unnest(c.conkey) k "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k ORDER BY a.attname) "
+            "FROM pg_constraint c WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u')",
+            [TABLE],
+        )
+        unique_keys = {tuple(row[0]) for row in cursor.fetchall()}
+        dropped = []
+        for table, name, definition, columns in referencing:
+            if tuple(columns) in unique_keys:
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {qn(name)} {definition}")
+            else:
+                dropped.append(f"{table}.{name}")
+    return dropped
+
+
+def verify_pruning(month=None):
+    """
+    EXPLAIN запроса списка продаж за месяц: какие секции он читает.
+    Возвращает (имена прочитанных секций, план). При работающем pruning — одна секция месяца.
+    """
+    month = month_start(month or timezone.localdate())
+    qs = Sale.objects.filter(
+        sale_date__gte=_bound(month), sale_date__lt=_bound(add_months(month, 1)),
+    ).order_by("-sale_date")[:20]
+    plan = qs.explain()
+    scanned = sorted(set(re.findall(rf"\bon ({TABLE}_\w+)", plan)))
+    return scanned, plan
@@ -0,0 +1,187 @@
+"""
+Дневные агрегаты продаж (SaleDailyRollup / ProductSaleDailyRollup).
+
+Обновляются в той же транзакции, что и запись продажи, поэтому аналитика
+читает готовые суммы по дням, а не сканирует все строки ProductSale.
+"""
+from django.db import connection
+from django.db.models import Count, Exists, F, OuterRef, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from companies.models import Company
+from products.models import Product
+from .analytics_cache import bump_version
+from .models import (
+    ArchivedProductSale, ArchivedSale, Sale, ProductSale, SaleDailyRollup, ProductSaleDailyRollup,
+)
+
+
+def sale_day(sale_date):
+    """День продажи в текущей временной зоне (TIME_ZONE)."""
+    return timezone.localdate(sale_date)
+
+
+# Строк агрегата в одном INSERT ... ON CONFLICT: до 6 параметров на строку — в пределах лимита
+# PostgreSQL (65535) и SQLite 3.32+ (32766)
+UPSERT_BATCH_SIZE = 5000
+
+
+def _add_to_rollup(model, key_fields, value_fields, rows):
+    """
+    Прибавляет значения к строкам агрегата model одним INSERT ... ON CONFLICT DO UPDATE на пачку:
+    недостающие строки создаются, существующие увеличиваются атомарно в базе.
+    rows — кортежи (ключ..., прибавки...) по возрастанию ключа: строки блокируются в этом порядке,
+    поэтому параллельные продажи не взаимоблокируются.
+    """
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in (*key_fields, *value_fields)]
+    table = qn(opts.db_table)
+    columns = ", ".join(qn(field.column) for field in fields)
+    conflict = ", ".join(qn(opts.get_field(name).column) for name in key_fields)
+    updates = ", ".join(
+        f"{qn(field.column)} = {table}.{qn(field.column)} + EXCLUDED.{qn(field.column)}"
+        for field in fields[len(key_fields):]
+    )
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+                [field.get_db_prep_save(value, connection) for row in batch for field, value in zip(fields, row)],
+            )
+
+
+def apply_sales(company_id, sales, sign=1):
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) продажи из дневных агрегатов.
+    sales — пары (sale_date, items), items — строки ProductSale с заполненными
+    line_revenue / line_cost. На пакет любого размера — по одному upsert на таблицу агрегатов.
+    При вычитании строки, дошедшие до нуля, удаляются в той же транзакции — иначе читатели
+    агрегатов показывали бы товары с нулевыми продажами.
+    Вызывать внутри transaction.atomic.
+    """
+    day_counts: dict = {}
+    totals: dict = {}
+    for sale_date, items in sales:
+        day = sale_day(sale_date)
+        day_counts[day] = day_counts.get(day, 0) + 1
+        for item in items:
+            row = totals.setdefault((day, item.product_id), [0, 0, 0])
+            row[0] += item.quantity
+            row[1] += item.line_revenue
+            row[2] += item.line_cost
+    if not day_counts:
+        return
+    bump_version(company_id)
+
+    _add_to_rollup(
+        SaleDailyRollup, ("company", "day"), ("sales_count",),
+        [(company_id, day, sign * count) for day, count in sorted(day_counts.items())],
+    )
+    _add_to_rollup(
+        ProductSaleDailyRollup, ("company", "day", "product"), ("quantity", "revenue", "cost"),
+        [
+            (company_id, day, pid, sign * quantity, sign * revenue, sign * cost)
+            for (day, pid), (quantity, revenue, cost) in sorted(totals.items())
+        ],
+    )
+    if sign < 0:
+        days = list(day_counts)
+        SaleDailyRollup.objects.filter(company_id=company_id, day__in=days, sales_count__lte=0).delete()
+        ProductSaleDailyRollup.objects.filter(
+            company_id=company_id, day__in=days, product_id__in={pid for _, pid in totals}, quantity__lte=0,
+        ).delete()
+
+
+def apply_sale(company_id, sale_date, items, sign=1):
+    """Одна продажа — см. apply_sales."""
+    apply_sales(company_id, [(sale_date, items)], sign)
+
+
+def _day_totals(sales, lines, company_field, tz):
+    """
+    Суммы по дням из пары (продажи, строки продаж): {(company_id, day): count}
+    и {(company_id, day, product_id): [quantity, revenue, cost]}.
+    """
+    counts = {}
+    for row in (
+        sales.order_by()
+        .values("company_id", day=TruncDate("sale_date", tzinfo=tz))
+        .annotate(sales_count=Count("id"))
+    ):
+        counts[row["company_id"], row["day"]] = row["sales_count"]
+    totals = {}
+    for row in (
+        lines.order_by()
+        .values("product_id", cid=F(company_field), day=TruncDate("sale__sale_date", tzinfo=tz))
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum("line_revenue"),
+            total_cost=Sum("line_cost"),
+        )
+    ):
+        totals[row["cid"], row["day"], row["product_id"]] = [
+            row["total_quantity"], row["total_revenue"], row["total_cost"],
+        ]
+    return counts, totals
+
+
+def rebuild(company_id=None):
+    """
+    Пересчитывает агрегаты с нуля по ProductSale и архиву продаж (строки удалённых товаров
+    из архива не учитываются — их агрегаты удалены вместе с товаром).
+    Если company_id не указан — для всех компаний. Возвращает число строк по товарам.
+    """
+    tz = timezone.get_current_timezone()
+    sales = Sale.objects.all()
+    lines = ProductSale.objects.all()
+    archived_sales = ArchivedSale.objects.all()
+    archived_lines = ArchivedProductSale.objects.filter(
+        Exists(Product.objects.filter(pk=OuterRef("product_id"))),
+    )
+    sale_rollups = SaleDailyRollup.objects.all()
+    product_rollups = ProductSaleDailyRollup.objects.all()
+    if company_id is not None:
+        sales = sales.filter(company_id=company_id)
+        lines = lines.filter(company_id=company_id)
+        archived_sales = archived_sales.filter(company_id=company_id)
+        archived_lines = archived_lines.filter(sale__company_id=company_id)
+        sale_rollups = sale_rollups.filter(company_id=company_id)
+        product_rollups = product_rollups.filter(company_id=company_id)
+
+    sale_rollups.delete()
+    product_rollups.delete()
+
+    counts, totals = _day_totals(sales, lines, "company_id", tz)
+    archived_counts, archived_totals = _day_totals(archived_sales, archived_lines, "sale__company_id", tz)
+    for key, count in archived_counts.items():
+        counts[key] = counts.get(key, 0) + count
+    for key, values in archived_totals.items():
+        row = totals.setdefault(key, [0, 0, 0])
+        for i, value in enumerate(values):
+            row[i] += value
+
+    SaleDailyRollup.objects.bulk_create(
+        [
+            SaleDailyRollup(company_id=cid, day=day, sales_count=count)
+            for (cid, day), count in counts.items()
+        ],
+        batch_size=1000,
+    )
+    rows = [
+        ProductSaleDailyRollup(
+            company_id=cid, product_id=pid, day=day,
+            quantity=quantity, revenue=revenue, cost=cost,
+        )
+        for (cid, day, pid), (quantity, revenue, cost) in totals.items()
+    ]
+    ProductSaleDailyRollup.objects.bulk_create(rows, batch_size=1000)
+
+    company_ids = [company_id] if company_id is not None else Company.objects.values_list("id", flat=True)
+    for cid in company_ids:
+        bump_version(cid)
+    return len(rows)
@@ -0,0 +1,187 @@
+"""
+Сценарии запросов ко всем маршрутам API для бенчмарка (bench_api) и теста бюджета SQL-запросов
+(sales/tests/test_query_budgets.py).
+
+ROUTES описывает для каждого имени URL из core/api_urls.py метод, пользователя, аргументы пути,
+query string и тело запроса. Аргументы и тело строятся по контексту build_context(): ID объектов
+компании, созданной sales.seed, и вспомогательные пользователи. ctx["batch"] — сколько элементов
+кладут в тело запросы, принимающие список (строки продажи и поставки, массовые создание и отмена).
+"""
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from companies.models import JoinRequest
+from core import api_urls
+from products.models import Product, Supply
+from storages.models import Storage
+from suppliers.models import Supplier
+from users.authentication import add_company_claims
+from users.models import User
+from .models import Sale
+
+PASSWORD = "bench-Pa55word"
+
+
+def _history_start():
+    return (timezone.localdate() - timedelta(days=364)).isoformat()
+
+
+def _history(**params):
+    return lambda ctx: urlencode({"date_from": _history_start(), **params})
+
+
+# (имя URL, метод, роль, kwargs пути, query string, тело запроса).
+# kwargs и тело — функции от ctx, query — строка или функция от ctx.
+# Роли: owner — владелец компании, outsider — пользователь без компании, staff — администратор, anon.
+ROUTES = [
+    ("auth-register", "post", "anon", None, "", lambda ctx: {
+        "username": "bench-new", "email": "bench-new@example.com",
+        "password": PASSWORD, "password_confirm": PASSWORD,
+    }),
+    ("token-obtain-pair", "post", "anon", None, "", lambda ctx: {
+        "username": ctx["owner"].username, "password": PASSWORD,
+    }),
+    ("token-refresh", "post", "anon", None, "", lambda ctx: {"refresh": ctx["refresh"]}),
+    ("employee-list", "get", "owner", None, "", None),
+    ("employee-add", "post", "owner", None, "", lambda ctx: {"email": ctx["outsider"].email}),
+    ("employee-remove", "delete", "owner", lambda ctx: {"pk": ctx["employee"]}, "", None),
+    ("company-list-create", "get", "owner", None, "", None),
+    ("company-list-create", "post", "outsider", None, "", lambda ctx: {"inn": "000000000001", "title": "Новая"}),
+    ("company-detail", "get", "owner", lambda ctx: {"pk": ctx["company"]}, "", None),
+    ("company-detail", "patch", "owner", lambda ctx: {"pk": ctx["company"]}, "", lambda ctx: {"title": "Переименована"}),
+    ("company-join", "post", "outsider", lambda ctx: {"pk": ctx["company"]}, "", None),
+    ("join-request-list", "get", "owner", None, "", None),
+    ("join-request-approve", "post", "owner", lambda ctx: {"pk": ctx["join_request"]}, "", None),
+    ("join-request-reject", "post", "owner", lambda ctx: {"pk": ctx["join_request"]}, "", None),
+    ("storage-list-create", "get", "owner", None, "", None),
+    ("storage-list-create", "post", "owner", None, "", lambda ctx: {"address": "Новый склад"}),
+    ("storage-detail", "get", "owner", lambda ctx: {"pk": ctx["storage"]}, "", None),
+    ("storage-detail", "patch", "owner", lambda ctx: {"pk": ctx["storage"]}, "", lambda ctx: {"address": "Другой"}),
+    ("supplier-list-create", "get", "owner", None, "", None),
+    ("supplier-list-create", "post", "owner", None, "", lambda ctx: {"title": "Новый", "inn": "000000000002"}),
+    ("supplier-detail", "get", "owner", lambda ctx: {"pk": ctx["supplier"]}, "", None),
+    ("supplier-detail", "patch", "owner", lambda ctx: {"pk": ctx["supplier"]}, "", lambda ctx: {"title": "Другой"}),
+    ("product-list-create", "get", "owner", None, "", None),
+    ("product-list-create", "post", "owner", None, "", lambda ctx: {
+        "title": "Новый товар", "purchase_price": "10.00", "sale_price": "20.00", "storage": ctx["storage"],
+    }),
+    ("product-detail", "get", "owner", lambda ctx: {"pk": ctx["product"]}, "", None),
+    ("product-detail", "patch", "owner", lambda ctx: {"pk": ctx["product"]}, "", lambda ctx: {"title": "Другой"}),
+    ("product-stock-as-of", "get", "owner", None, lambda ctx: urlencode({"at": timezone.now().isoformat()}), None),
+    ("supply-list-create", "get", "owner", None, "", None),
+    ("supply-list-create", "post", "owner", None, "", lambda ctx: {
+        "supplier_id": ctx["supplier"],
+        "products": [{"id": product, "quantity": 5} for product in ctx["products"][:ctx["batch"]]],
+    }),
+    ("supply-detail", "get", "owner", lambda ctx: {"pk": ctx["supply"]}, "", None),
+    ("supply-export", "get", "owner", None, "", None),
+    ("sale-list-create", "get", "owner", None, "", None),
+    ("sale-list-create", "post", "owner", None, "", lambda ctx: {
+        "buyer_name": "Покупатель",
+        "product_sales": [{"product": product, "quantity": 1} for product in ctx["products"][:ctx["batch"]]],
+    }),
+    ("sale-detail", "get", "owner", lambda ctx: {"pk": ctx["sale"]}, "", None),
+    ("sale-detail", "patch", "owner", lambda ctx: {"pk": ctx["sale"]}, "", lambda ctx: {"buyer_name": "Другой"}),
+    ("sale-detail", "delete", "owner", lambda ctx: {"pk": ctx["sale"]}, "", None),
+    ("sale-export", "get", "owner", None, "", None),
+    ("sale-bulk-create", "post", "owner", None, "", lambda ctx: {"sales": [
+        {"buyer_name": f"Покупатель {i}", "product_sales": [{"product": ctx["product"], "quantity": 1}]}
+        for i in range(ctx["batch"])
+    ]}),
+    ("sale-bulk-cancel", "post", "owner", None, "", lambda ctx: {"ids": ctx["sales"][:ctx["batch"]]}),
+    ("analytics-profit", "get", "owner", None, _history(), None),
+    ("analytics-products-sold", "get", "owner", None, _history(), None),
+    ("analytics-profit-by-product", "get", "owner", None, _history(), None),
+    ("analytics-top-products", "get", "owner", None, _history(), None),
+    ("analytics-dashboard", "get", "owner", None, _history(), None),
+    ("analytics-timeseries", "get", "owner", None, _history(interval="day"), None),
+    ("analytics-cache-stats", "get", "owner", None, "", None),
+    ("system-stats", "get", "staff", None, "", None),
+]
+
+
+def route_key(route):
+    """«имя-url МЕТОД» — ключ маршрута в отчётах."""
+    return f"{route[0]} {route[1].upper()}"
+
+
+def _route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def missing_routes():
+    """Имена URL из core/api_urls.py, для которых в ROUTES нет сценария."""
+    return sorted(set(_route_names(api_urls.urlpatterns)) - {route[0] for route in ROUTES})
+
+
+def select_routes(names=None):
+    return [route for route in ROUTES if not names or route[0] in names]
+
+
+def build_context(owner, batch=10):
+    """
+    ID объектов компании владельца owner (созданной sales.seed) и вспомогательные пользователи.
+    Вызывать в транзакции, которая потом откатывается: меняет пароль владельца и создаёт пользователей.
+    """
+    cid = owner.company_id
+    owner.set_password(PASSWORD)
+    owner.save(update_fields=["password"])
+    outsider = User.objects.create_user(username="bench-outsider", email="bench-outsider@example.com")
+    applicant = User.objects.create_user(username="bench-applicant", email="bench-applicant@example.com")
+    staff = User.objects.create_user(username="bench-staff", email="bench-staff@example.com", is_staff=True)
+    join_request = JoinRequest.objects.create(user=applicant, company_id=cid)
+    sales = list(
+        Sale.objects.filter(company_id=cid).order_by("-sale_date", "-id").values_list("id", flat=True)[:batch]
+    )
+    products = list(Product.objects.filter(company_id=cid).order_by("id").values_list("id", flat=True)[:batch])
+    return {
+        "batch": batch,
+        "owner": owner,
+        "outsider": outsider,
+        "staff": staff,
+        "refresh": str(RefreshToken.for_user(owner)),
+        "company": cid,
+        "employee": User.objects.filter(company_id=cid, is_company_owner=False).values_list("id", flat=True)[0],
+        "join_request": join_request.id,
+        "storage": Storage.objects.filter(company_id=cid).values_list("id", flat=True)[0],
+        "supplier": Supplier.objects.filter(company_id=cid).values_list("id", flat=True)[0],
+        "product": products[0],
+        "products": products,
+        "supply": Supply.objects.filter(company_id=cid).values_list("id", flat=True)[0],
+        "sale": sales[0],
+        "sales": sales,
+    }
+
+
+def access_token(user):
+    """Access-токен с claims компании — как после входа."""
+    return str(add_company_claims(RefreshToken.for_user(user).access_token, user))
+
+
+def make_clients(ctx):
+    """Тестовые клиенты по ролям, с заголовком Authorization."""
+    clients = {role: APIClient() for role in ("owner", "outsider", "staff", "anon")}
+    for role in ("owner", "outsider", "staff"):
+        clients[role].credentials(HTTP_AUTHORIZATION=f"Bearer {access_token(ctx[role])}")
+    return clients
+
+
+def build_request(route, ctx, extra_query=None):
+    """(роль, метод, URL, тело) для сценария route."""
+    name, method, role, kwargs, query, body = route
+    url = reverse(name, kwargs=kwargs(ctx) if kwargs else None)
+    query = query(ctx) if callable(query) else query
+    if extra_query and method == "get":
+        query = "&".join(part for part in (query, urlencode(extra_query)) if part)
+    if query:
+        url = f"{url}?{query}"
+    return role, method, url, body(ctx) if body else None
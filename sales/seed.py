@@ -0,0 +1,150 @@
+"""
+Синтетические данные для тестов планов и бюджета запросов и для бенчмарков (management-команды).
+
+seed_company() создаёт отдельную компанию с владельцем, сотрудниками, складами, поставщиками, товарами,
+поставками, продажами, движениями остатков и заявками на вступление — массовыми INSERT,
+без API и сигналов. Агрегаты аналитики пересчитываются rebuild().
+delete_seeded_company() удаляет такую компанию — для бенчмарков, которым нужны закоммиченные данные
+(параллельные потоки со своими соединениями) и откат транзакции не подходит.
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from companies.models import Company, JoinRequest
+from products.models import Product, StockMovement, Supply, SupplyProduct
+from storages.models import Storage
+from suppliers.models import Supplier
+from users.models import User
+from .models import ProductSale, Sale
+from .rollups import rebuild
+
+BATCH_SIZE = 2000
+
+
+def seed_company(sales=1000, products=100, supplies=None, days=365, lines_per_sale=2, seed=0,
+                 storages=1, suppliers=1, employees=0, lines_per_supply=3):
+    """
+    Создаёт компанию с данными и возвращает её владельца (user.company — созданная компания).
+    Даты продаж и поставок равномерно распределены по последним days дням; товары — по складам,
+    поставки — по поставщикам.
+    """
+    rnd = random.Random(seed)
+    tag = uuid.uuid4().hex[:10]
+    now = timezone.now()
+    supplies = supplies if supplies is not None else max(sales // 10, 1)
+
+    company = Company.objects.create(inn=tag[:12], title=f"seed-{tag}")
+    owner = User.objects.create_user(
+        username=f"seed-{tag}", email=f"seed-{tag}@example.com", password=None,
+        is_company_owner=True, company=company,
+    )
+    User.objects.bulk_create(
+        [
+            User(username=f"seed-{tag}-e{i}", email=f"seed-{tag}-e{i}@example.com", company=company)
+            for i in range(employees)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    storage_objs = Storage.objects.bulk_create(
+        [Storage(company=company, address=f"seed-{tag}-{i}") for i in range(max(storages, 1))],
+    )
+    supplier_objs = Supplier.objects.bulk_create(
+        [Supplier(company=company, title=f"seed-{tag}-{i}", inn=tag[:12]) for i in range(max(suppliers, 1))],
+    )
+
+    product_objs = Product.objects.bulk_create(
+        [
+            Product(
+                title=f"Товар {i:05d}", storage=storage_objs[i % len(storage_objs)], company=company,
+                purchase_price=rnd.randint(1, 500), sale_price=rnd.randint(501, 1000),
+                quantity=sales * lines_per_sale,
+            )
+            for i in range(products)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    def random_date():
+        return now - timedelta(seconds=rnd.randint(0, days * 86400))
+
+    supply_objs = Supply.objects.bulk_create(
+        [
+            Supply(supplier=supplier_objs[i % len(supplier_objs)], company=company, created_by=owner)
+            for i in range(supplies)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    # delivery_date — auto_now_add, разносим по периоду отдельным проходом
+    for supply in supply_objs:
+        supply.delivery_date = random_date()
+    Supply.objects.bulk_update(supply_objs, ["delivery_date"], batch_size=BATCH_SIZE)
+    SupplyProduct.objects.bulk_create(
+        [
+            SupplyProduct(supply=supply, product=product, company=company, quantity=rnd.randint(1, 50))
+            for supply in supply_objs
+            for product in rnd.sample(product_objs, min(lines_per_supply, len(product_objs)))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    sale_objs = Sale.objects.bulk_create(
+        [Sale(buyer_name=f"Покупатель {i}", company=company, sale_date=random_date()) for i in range(sales)],
+        batch_size=BATCH_SIZE,
+    )
+    lines = []
+    for sale in sale_objs:
+        for product in rnd.sample(product_objs, min(lines_per_sale, len(product_objs))):
+            line = ProductSale(sale=sale, product=product, company=company, quantity=rnd.randint(1, 5))
+            line.snapshot_prices()
+            lines.append(line)
+    ProductSale.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=line.product_id, kind=StockMovement.Kind.SALE, delta=-line.quantity,
+                applied=True, sale_id=line.sale_id, effective_at=line.sale.sale_date,
+            )
+            for line in lines
+        ]
+        + [
+            StockMovement(product=product, kind=StockMovement.Kind.ADJUSTMENT, delta=1)
+            for product in product_objs
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    applicants = User.objects.bulk_create(
+        [
+            User(username=f"seed-{tag}-{i}", email=f"seed-{tag}-{i}@example.com")
+            for i in range(max(products // 10, 1))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    JoinRequest.objects.bulk_create(
+        [
+            JoinRequest(user=user, company=company, status=rnd.choice(JoinRequest.Status.values))
+            for user in applicants
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    rebuild(company.id)
+    return owner
+
+
+@transaction.atomic
+def delete_seeded_company(owner):
+    """
+    Удаляет компанию владельца owner, созданную seed_company(), со всеми данными (каскадом)
+    и её пользователями, в том числе заявителями без компании (имена начинаются с названия компании).
+    """
+    company = Company.objects.get(id=owner.company_id)
+    if not company.title.startswith("seed-"):
+        raise ValueError(f"Компания #{company.id} создана не seed_company().")
+    User.objects.filter(Q(company_id=company.id) | Q(username__startswith=company.title)).delete()
+    company.delete()
@@ -1,8 +1,14 @@
-from django.db import transaction
+from django.db.models import Case, F, When
 from django.utils import timezone
 from rest_framework import serializers
-from products.models import Product
-from .models import Sale, ProductSale
+from core.db import atomic_with_retry
+from core.export import filter_day_range
+from products.models import Product, StockMovement
+from products.stock import InsufficientStock, decrement_stock, lock_rows, move_sale
+from .analytics_cache import bump_version
+from .cancellation import cancel_sales
+from .models import ArchivedSale, ArchivedProductSale, Sale, ProductSale
+from .rollups import apply_sale, apply_sales, sale_day
 
 
 # ─── Чтение ───
@@ -32,6 +38,31 @@ class SaleSerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        # Список за период, доходящий до архива, содержит и архивные продажи (sales.archive.SaleTiers)
+        if isinstance(instance, ArchivedSale):
+            return ArchivedSaleSerializer(instance, context=self.context).data
+        return super().to_representation(instance)
+
+
+class ArchivedProductSaleReadSerializer(serializers.ModelSerializer):
+    """Товар в архивной продаже (чтение) — те же поля, что у ProductSaleReadSerializer."""
+
+    class Meta:
+        model = ArchivedProductSale
+        fields = ("product_id", "product_title", "quantity")
+
+
+class ArchivedSaleSerializer(serializers.ModelSerializer):
+    """Архивная продажа (чтение) — в том же виде, что и SaleSerializer."""
+    product_sales = ArchivedProductSaleReadSerializer(many=True, read_only=True)
+    company_title = serializers.CharField(source="company.title", read_only=True)
+
+    class Meta:
+        model = ArchivedSale
+        fields = SaleSerializer.Meta.fields
+        read_only_fields = fields
+
 
 # ─── Создание ───
 
@@ -69,52 +100,245 @@ class SaleCreateSerializer(serializers.Serializer):
             merged[item["product"]] = merged.get(item["product"], 0) + item["quantity"]
 
         product_ids = list(merged.keys())
-        products = Product.objects.filter(id__in=product_ids).select_related("storage")
+        products = Product.objects.with_stock().filter(id__in=product_ids)
         found_ids = {p.id for p in products}
         missing = set(product_ids) - found_ids
         if missing:
             raise serializers.ValidationError(f"Товары не найдены: {missing}")
         for p in products:
-            if p.storage.company_id != user.company_id:
+            if p.company_id != user.company_id:
                 raise serializers.ValidationError(
                     f"Товар «{p.title}» не принадлежит вашей компании."
                 )
-            if p.quantity < merged[p.id]:
+            if p.available_quantity < merged[p.id]:
                 raise serializers.ValidationError(
                     f"Недостаточно товара «{p.title}» на складе "
-                    f"(доступно: {p.quantity}, запрошено: {merged[p.id]})."
+                    f"(доступно: {p.available_quantity}, запрошено: {merged[p.id]})."
                 )
 
+        # Проверка остатка выше — предварительная; окончательная выполняется условным UPDATE в create()
+        self._products = {p.id: p for p in products}
         return [{"product": pid, "quantity": qty} for pid, qty in merged.items()]
 
-    @transaction.atomic
+    @atomic_with_retry
     def create(self, validated_data):
         user = self.context["request"].user
+        products_map = self._products
         sale = Sale.objects.create(
             buyer_name=validated_data["buyer_name"],
             company_id=user.company_id,
             sale_date=validated_data.get("sale_date", timezone.now()),
         )
-        product_ids = [item["product"] for item in validated_data["product_sales"]]
-        products_map = {
-            p.id: p
-            for p in Product.objects.filter(id__in=product_ids).select_for_update()
-        }
+        try:
+            decrement_stock(
+                {item["product"]: item["quantity"] for item in validated_data["product_sales"]},
+                sale_id=sale.id,
+                effective_at=sale.sale_date,
+            )
+        except InsufficientStock as exc:
+            # Откат транзакции уберёт и созданную продажу
+            raise serializers.ValidationError({"product_sales": [
+                f"Недостаточно товара «{products_map[pid].title}» на складе."
+                for pid in exc.product_ids
+            ]})
 
         sale_items = []
         for item in validated_data["product_sales"]:
             product = products_map[item["product"]]
-            product.quantity -= item["quantity"]
-            product.save(update_fields=["quantity"])
-            sale_items.append(ProductSale(
+            line = ProductSale(
                 sale=sale,
                 product=product,
+                company_id=sale.company_id,
                 quantity=item["quantity"],
-            ))
+            )
+            line.snapshot_prices()
+            sale_items.append(line)
         ProductSale.objects.bulk_create(sale_items)
+        apply_sale(sale.company_id, sale.sale_date, sale_items)
         return sale
 
 
+# ─── Пакетная загрузка (кассы) ───
+
+
+MAX_BULK_SALES = 1000
+
+
+class BulkSaleItemSerializer(serializers.Serializer):
+    """Одна продажа в пакете. Проверяется только структура — товары проверяются для всего пакета сразу."""
+    buyer_name = serializers.CharField(max_length=255)
+    sale_date = serializers.DateTimeField(required=False)
+    product_sales = ProductSaleItemSerializer(many=True)
+
+    def validate_sale_date(self, value):
+        if value and value > timezone.now():
+            raise serializers.ValidationError(
+                "Дата продажи не может быть позже текущей даты."
+            )
+        return value
+
+    def validate_product_sales(self, value):
+        if not value:
+            raise serializers.ValidationError("Список товаров не может быть пустым.")
+        merged: dict[int, int] = {}
+        for item in value:
+            merged[item["product"]] = merged.get(item["product"], 0) + item["quantity"]
+        return merged
+
+
+class BulkSaleCreateSerializer(serializers.Serializer):
+    """
+    Пакетное создание продаж: sales [{buyer_name, sale_date, product_sales}].
+    Ошибка в одной продаже не отменяет остальные — результат возвращается по каждой.
+
+    Для всего пакета: блокировка товаров, один запрос остатков, один UPDATE остатков,
+    bulk_create продаж, строк продаж и движений.
+    """
+    sales = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_BULK_SALES,
+    )
+
+    @atomic_with_retry
+    def create(self, validated_data):
+        user = self.context["request"].user
+        now = timezone.now()
+        results = [None] * len(validated_data["sales"])
+
+        # 1. Структурная проверка каждой продажи (без запросов к БД)
+        parsed = []
+        for index, raw in enumerate(validated_data["sales"]):
+            item = BulkSaleItemSerializer(data=raw)
+            if item.is_valid():
+                parsed.append((index, item.validated_data))
+            else:
+                results[index] = {"index": index, "status": "error", "errors": item.errors}
+
+        # 2. Сначала блокируем товары пакета (в порядке id), затем читаем остатки: подзапрос
+        # несвёрнутых движений в том же SELECT ... FOR UPDATE вычислился бы до блокировки
+        product_ids = {pid for _, data in parsed for pid in data["product_sales"]}
+        locked = lock_rows(product_ids, company_id=user.company_id)
+        products = {p.id: p for p in Product.objects.with_stock().filter(id__in=locked).order_by("id")}
+
+        # 3. Распределяем остатки (с учётом несвёрнутых движений) в порядке продаж в пакете
+        remaining = {pid: p.available_quantity for pid, p in products.items()}
+        accepted = []
+        for index, data in parsed:
+            merged = data["product_sales"]
+            missing = sorted(set(merged) - set(products))
+            if missing:
+                results[index] = {
+                    "index": index, "status": "error",
+                    "errors": {"product_sales": [f"Товары не найдены в вашей компании: {missing}"]},
+                }
+                continue
+            short = [
+                f"Недостаточно товара «{products[pid].title}» на складе "
+                f"(доступно: {remaining[pid]}, запрошено: {qty})."
+                for pid, qty in merged.items() if remaining[pid] < qty
+            ]
+            if short:
+                results[index] = {"index": index, "status": "error", "errors": {"product_sales": short}}
+                continue
+            for pid, qty in merged.items():
+                remaining[pid] -= qty
+            accepted.append((index, data))
+
+        if not accepted:
+            return results
+
+        # 4. Один UPDATE остатков для всех затронутых товаров
+        decrements: dict[int, int] = {}
+        for _, data in accepted:
+            for pid, qty in data["product_sales"].items():
+                decrements[pid] = decrements.get(pid, 0) + qty
+        Product.objects.filter(id__in=decrements).update(
+            quantity=Case(
+                *[When(id=pid, then=F("quantity") - qty) for pid, qty in decrements.items()],
+                default=F("quantity"),
+            ),
+        )
+
+        # 5. bulk_create продаж, строк продаж и движений остатка
+        sales = Sale.objects.bulk_create([
+            Sale(
+                buyer_name=data["buyer_name"],
+                company_id=user.company_id,
+                sale_date=data.get("sale_date") or now,
+            )
+            for _, data in accepted
+        ])
+        lines_by_sale = []
+        all_lines = []
+        movements = []
+        for sale, (_, data) in zip(sales, accepted):
+            lines = []
+            for pid, qty in data["product_sales"].items():
+                line = ProductSale(
+                    sale=sale, product=products[pid], company_id=user.company_id, quantity=qty,
+                )
+                line.snapshot_prices()
+                lines.append(line)
+                movements.append(StockMovement(
+                    product_id=pid, kind=StockMovement.Kind.SALE, delta=-qty,
+                    applied=True, sale_id=sale.id, effective_at=sale.sale_date,
+                ))
+            lines_by_sale.append((sale.sale_date, lines))
+            all_lines.extend(lines)
+        ProductSale.objects.bulk_create(all_lines)
+        StockMovement.objects.bulk_create(movements)
+        apply_sales(user.company_id, lines_by_sale)
+
+        for sale, (index, _) in zip(sales, accepted):
+            results[index] = {"index": index, "status": "created", "id": sale.id}
+        return results
+
+
+# ─── Массовая отмена ───
+
+
+MAX_CANCEL_IDS = 10000
+
+
+class SaleBulkCancelSerializer(serializers.Serializer):
+    """
+    Массовая отмена продаж компании: по списку ids или по периоду date_from/date_to
+    (даты включительно). Товары возвращаются на склад.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        allow_empty=False, max_length=MAX_CANCEL_IDS,
+    )
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "ids" in attrs:
+            if "date_from" in attrs or "date_to" in attrs:
+                raise serializers.ValidationError("Укажите либо ids, либо период, но не оба сразу.")
+        elif "date_from" not in attrs and "date_to" not in attrs:
+            raise serializers.ValidationError("Укажите ids или период (date_from / date_to).")
+        if attrs.get("date_from") and attrs.get("date_to") and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError({"date_to": "Конец периода раньше начала."})
+        return attrs
+
+    def create(self, validated_data):
+        user = self.context["request"].user
+        sales = Sale.objects.filter(company_id=user.company_id)
+        not_found = []
+        if "ids" in validated_data:
+            ids = set(validated_data["ids"])
+            sales = sales.filter(id__in=ids)
+            not_found = sorted(ids - set(sales.values_list("id", flat=True)))
+        else:
+            sales = filter_day_range(
+                sales, "sale_date", validated_data.get("date_from"), validated_data.get("date_to"),
+            )
+        _, counts = cancel_sales(sales)
+        return {"cancelled": counts.get(Sale._meta.label, 0), "not_found": not_found}
+
+
 # ─── Обновление ───
 
 
@@ -131,3 +355,23 @@ class SaleUpdateSerializer(serializers.ModelSerializer):
                 "Дата продажи не может быть позже текущей даты."
             )
         return value
+
+    @atomic_with_retry
+    def update(self, instance, validated_data):
+        """При смене даты продажи переносим её движения в журнале и между дневными агрегатами."""
+        old_date = instance.sale_date
+        instance = super().update(instance, validated_data)
+        if old_date == instance.sale_date:
+            return instance
+        items = list(instance.product_sales.all())
+        quantities: dict[int, int] = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        move_sale(instance.id, quantities, old_date, instance.sale_date)
+        if sale_day(old_date) != sale_day(instance.sale_date):
+            apply_sale(instance.company_id, old_date, items, sign=-1)
+            apply_sale(instance.company_id, instance.sale_date, items)
+        else:
+            # Дневные агрегаты не меняются, но почасовой ряд (и его кэш) — меняется
+            bump_version(instance.company_id)
+        return instance
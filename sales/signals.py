@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from .analytics_cache import bump_version
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    """Название товара входит в ответы аналитики; изменение остатка — нет."""
+    if update_fields is not None and set(update_fields) <= {"quantity"}:
+        return
+    bump_version(instance.company_id)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """
+    Строки продаж товара удаляются каскадно. Версию поднимаем после коммита:
+    при каскадном удалении компании её строки версии к этому моменту уже нет.
+    """
+    company_id = instance.company_id
+    transaction.on_commit(lambda: bump_version(company_id))
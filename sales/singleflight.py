@@ -0,0 +1,95 @@
+"""
+Single-flight для тяжёлых запросов аналитики.
+
+Одинаковые параллельные запросы внутри процесса ждут одного вычисления и получают его результат.
+Если задан ANALYTICS_SINGLEFLIGHT_DIR, вычисление дополнительно сериализуется между воркерами
+файловой блокировкой (fcntl): воркер, получивший блокировку вторым, находит готовый результат в кэше.
+Файлов блокировок не больше LOCK_SLOTS: ключ выбирает файл по хэшу, разные ключи изредка делят
+один файл и тогда просто ждут друг друга.
+"""
+import contextlib
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+
+from core import metrics
+
+try:
+    import fcntl
+except ImportError:  # не POSIX — только блокировка внутри процесса
+    fcntl = None
+
+LOCK_SLOTS = 256
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединяет параллельные вызовы do() с одинаковым ключом в одно выполнение fn."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Возвращает (result, shared): shared=True, если результат получен от чужого вызова."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+        metrics.inc("analytics_singleflight_calls_total", (("result", "executed" if leader else "shared"),))
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared}
+
+
+group = SingleFlight()
+
+
+@contextlib.contextmanager
+def process_lock(key):
+    """Межпроцессная блокировка по ключу (если настроен ANALYTICS_SINGLEFLIGHT_DIR и доступен fcntl)."""
+    lock_dir = getattr(settings, "ANALYTICS_SINGLEFLIGHT_DIR", None)
+    if not lock_dir or fcntl is None:
+        yield
+        return
+
+    os.makedirs(lock_dir, exist_ok=True)
+    slot = int(hashlib.md5(key.encode()).hexdigest(), 16) % LOCK_SLOTS
+    with open(os.path.join(lock_dir, f"slot-{slot:03d}.lock"), "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
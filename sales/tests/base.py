@@ -0,0 +1,104 @@
+"""Общие данные для тестов продаж: компания с товарами на складе и клиент API её владельца."""
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db.models import F, Sum
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from products.models import Product
+from storages.models import Storage
+from suppliers.models import Supplier
+from users.models import User
+from sales.models import ProductSale, Sale
+
+
+class SalesAPITestCase(APITestCase):
+    """Компания, владелец, склад, поставщик и три товара с остатком STOCK (через поставку)."""
+
+    STOCK = 100
+
+    def setUp(self):
+        # Версии аналитики откатываются вместе с транзакцией теста — старые записи кэша не должны найтись
+        caches["analytics"].clear()
+        self.company = Company.objects.create(inn="7700000000", title="Тест")
+        self.owner = User.objects.create_user(
+            username="owner", email="owner@example.com", password="p",
+            company=self.company, is_company_owner=True,
+        )
+        storage = Storage.objects.create(address="Склад", company=self.company)
+        self.supplier = Supplier.objects.create(title="Поставщик", inn="1", company=self.company)
+        self.products = [
+            Product.objects.create(
+                title=f"Товар {i}", purchase_price=purchase, sale_price=sale, storage=storage,
+            )
+            for i, (purchase, sale) in enumerate([(5, 10), (1, 3), (20, 50)], start=1)
+        ]
+        self.client.force_authenticate(self.owner)
+        self.post("/api/v1/products/supplies/", {
+            "supplier_id": self.supplier.id,
+            "products": [{"id": p.id, "quantity": self.STOCK} for p in self.products],
+        })
+
+    def post(self, url, data, expect=201):
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, expect, response.content)
+        return response
+
+    def create_sale(self, *lines, sale_date=None):
+        """lines — пары (товар, количество). Возвращает id продажи."""
+        data = {
+            "buyer_name": "Покупатель",
+            "product_sales": [{"product": p.id, "quantity": qty} for p, qty in lines],
+        }
+        if sale_date:
+            data["sale_date"] = sale_date
+        return self.post("/api/v1/sales/", data).json()["id"]
+
+    def raw_totals(self):
+        """Суммы по товарам прямо из строк ProductSale — эталон для аналитики по агрегатам."""
+        return list(
+            ProductSale.objects.filter(company_id=self.company.id)
+            .values("product_id", product_title=F("product__title"))
+            .annotate(total_quantity=Sum("quantity"), revenue=Sum("line_revenue"), cost=Sum("line_cost"))
+            .order_by("-total_quantity", "product_id")
+        )
+
+    def analytics(self, endpoint):
+        response = self.client.get(f"/api/v1/sales/analytics/{endpoint}/")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def assertAnalyticsMatchRawRows(self):
+        """Все отчёты по агрегатам совпадают с подсчётом по строкам продаж."""
+        rows = self.raw_totals()
+        quantities = [
+            {"product_id": r["product_id"], "product_title": r["product_title"], "total_quantity": r["total_quantity"]}
+            for r in rows
+        ]
+        revenue = sum((r["revenue"] for r in rows), Decimal(0))
+        cost = sum((r["cost"] for r in rows), Decimal(0))
+        sales_count = Sale.objects.filter(company_id=self.company.id).count()
+        by_profit = sorted(rows, key=lambda r: r["revenue"] - r["cost"])
+
+        sold = self.analytics("products-sold")
+        self.assertEqual(sold["total_quantity"], sum(r["total_quantity"] for r in rows))
+        self.assertEqual(sold["products"], quantities)
+        self.assertEqual(self.analytics("top-products")["top"], quantities)
+
+        profit = self.analytics("profit")
+        self.assertEqual(Decimal(str(profit["total_revenue"])), revenue)
+        self.assertEqual(Decimal(str(profit["total_cost"])), cost)
+        self.assertEqual(profit["sales_count"], sales_count)
+
+        by_product = self.analytics("profit-by-product")
+        self.assertEqual(
+            [r and r["product_id"] for r in (by_product["most_profitable"], by_product["least_profitable"])],
+            [by_profit[-1]["product_id"], by_profit[0]["product_id"]] if rows else [None, None],
+        )
+
+        dashboard = self.analytics("dashboard")
+        self.assertEqual(dashboard["products"], quantities)
+        self.assertEqual(dashboard["total_quantity"], sold["total_quantity"])
+        self.assertEqual(Decimal(str(dashboard["net_profit"])), revenue - cost)
+        self.assertEqual(dashboard["sales_count"], sales_count)
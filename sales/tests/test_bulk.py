@@ -0,0 +1,38 @@
+from companies.models import Company
+from products.models import Product
+from storages.models import Storage
+
+from .base import SalesAPITestCase
+
+
+class BulkSaleCreateTests(SalesAPITestCase):
+    """Пакет продаж делит остаток (с учётом несвёрнутых поставок) в порядке продаж."""
+
+    def test_stock_shared_in_batch_order(self):
+        p1, p2, _ = self.products
+        response = self.post("/api/v1/sales/bulk/", {"sales": [
+            {"buyer_name": "A", "product_sales": [{"product": p1.id, "quantity": self.STOCK - 10}]},
+            {"buyer_name": "B", "product_sales": [{"product": p1.id, "quantity": 11}]},
+            {"buyer_name": "C", "product_sales": [{"product": p1.id, "quantity": 10}, {"product": p2.id, "quantity": 1}]},
+        ]}, expect=200)
+
+        self.assertEqual(
+            [row["status"] for row in response.json()["results"]],
+            ["created", "error", "created"],
+        )
+        stock = dict(Product.objects.with_stock().values_list("id", "available_quantity"))
+        self.assertEqual(stock[p1.id], 0)
+        self.assertEqual(stock[p2.id], self.STOCK - 1)
+
+    def test_foreign_product_rejected(self):
+        other_company = Company.objects.create(inn="7800000000", title="Другая")
+        storage = Storage.objects.create(address="Чужой склад", company=other_company)
+        foreign = Product.objects.create(title="Чужой", purchase_price=1, sale_price=2, storage=storage, quantity=5)
+
+        response = self.post("/api/v1/sales/bulk/", {"sales": [
+            {"buyer_name": "A", "product_sales": [{"product": foreign.id, "quantity": 1}]},
+        ]}, expect=200)
+
+        self.assertEqual(response.json()["results"][0]["status"], "error")
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.quantity, 5)
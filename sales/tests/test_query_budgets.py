@@ -0,0 +1,156 @@
+"""
+Бюджет SQL-запросов: каждый маршрут core/api_urls.py (сценарии sales.scenarios) на данных из SMALL и LARGE
+строк (продаж, строк продажи, товаров, поставок, складов, сотрудников, компаний в каталоге; массовые
+запросы — на столько же элементов).
+"""
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from companies.models import Company
+from sales.analytics_cache import CACHE_ALIAS
+from sales.scenarios import build_context, build_request, make_clients, missing_routes, route_key, select_routes
+from sales.seed import seed_company
+from users.models import User
+
+SMALL, LARGE = 1, 100
+
+# Списки с параметром page_size отдают все строки, а не первые 20
+PAGE_SIZE_QUERY = {"page_size": 1000}
+
+# Части бюджетов записи. Чтение не загружает пользователя (claims JWT, users.authentication), запись — загружает.
+USER = 1
+# transaction.atomic представления: в тесте он вложен и выполняется как SAVEPOINT / RELEASE
+TX = 2
+# Условное списание остатка: блокировка строк по id, UPDATE в своей точке сохранения
+DECREMENT = 1 + TX + 1
+# Дневные агрегаты: версия аналитики и по upsert на таблицу; при вычитании — удаление обнулённых строк
+ROLLUP = 1 + 2
+ROLLUP_REVERSAL = ROLLUP + 2
+# Отмена продаж: блокировка продаж, строки продаж, движения возврата (INSERT ... SELECT),
+# сборщик удаления Django и DELETE строк продаж и продаж
+CANCEL = 1 + 1 + 1 + 1 + 2
+
+# Максимум SQL-запросов на «имя-url МЕТОД» при любом числе строк. Считается каждый выполненный оператор,
+# включая SAVEPOINT / RELEASE и каждый пакет bulk_create: на SQLite Django делит bulk_create
+# по 999 параметров, поэтому пакетная запись не должна зависеть от bulk_create на строку.
+BUDGETS = {
+    "auth-register POST": 2,
+    "token-obtain-pair POST": 1,
+    "token-refresh POST": 2,
+    # Смена компании пользователя — ещё и отзыв claims его токенов (upsert + очистка старых)
+    "employee-list GET": 2,
+    "employee-add POST": USER + 2 + 1 + 2,
+    "employee-remove DELETE": USER + 2 + 1 + 2,
+    "company-list-create GET": 3,
+    "company-list-create POST": USER + 1 + 1 + 1 + 2,
+    "company-detail GET": 2,
+    "company-detail PATCH": USER + 1 + 1 + 1,
+    "company-join POST": 4,
+    "join-request-list GET": 2,
+    "join-request-approve POST": USER + 1 + 1 + 2 + 1 + 1,
+    "join-request-reject POST": 5,
+    # Списки: COUNT, страница и по запросу на вложенные связи
+    "storage-list-create GET": 2,
+    "storage-list-create POST": 3,
+    "storage-detail GET": 1,
+    "storage-detail PATCH": 4,
+    "supplier-list-create GET": 2,
+    "supplier-list-create POST": 3,
+    "supplier-detail GET": 1,
+    "supplier-detail PATCH": 4,
+    "product-list-create GET": 2,
+    "product-list-create POST": 4,
+    "product-detail GET": 1,
+    "product-detail PATCH": 4,
+    # Товары, снимок, движения после снимка, строки ответа
+    "product-stock-as-of GET": 4,
+    "supply-list-create GET": 4,
+    # Проверка поставщика и товаров, поставка, движения, строки поставки, ответ (строки и товары)
+    "supply-list-create POST": USER + 2 + TX + 1 + 1 + 1 + 1 + 2,
+    "supply-detail GET": 3,
+    "supply-export GET": 1,
+    "sale-list-create GET": 3,
+    # Проверка товаров, продажа, списание, движения, строки продажи, агрегаты, ответ (компания, строки, товары)
+    "sale-list-create POST": USER + 1 + TX + 1 + DECREMENT + 1 + 1 + ROLLUP + 3,
+    "sale-detail GET": 3,
+    # Продажа со строками и товарами, UPDATE (дата в сценарии не меняется)
+    "sale-detail PATCH": USER + 3 + TX + 1,
+    "sale-detail DELETE": USER + 3 + TX + CANCEL + ROLLUP_REVERSAL,
+    "sale-export GET": 2,
+    # Блокировка товаров, остатки, один UPDATE, INSERT продаж, строк и движений, агрегаты
+    "sale-bulk-create POST": USER + TX + 1 + 1 + 1 + 3 + ROLLUP,
+    "sale-bulk-cancel POST": USER + 1 + TX + CANCEL + ROLLUP_REVERSAL,
+    # Агрегаты по товарам и количество продаж одним-двумя запросами
+    "analytics-profit GET": 3,
+    "analytics-products-sold GET": 3,
+    "analytics-profit-by-product GET": 2,
+    "analytics-top-products GET": 2,
+    "analytics-dashboard GET": 3,
+    "analytics-timeseries GET": 2,
+    "analytics-cache-stats GET": 0,
+    "system-stats GET": 0,
+}
+
+
+@override_settings(METRICS_ENABLED=False, JWT_CLAIMS_REVOCATION_TTL=float("inf"))
+class QueryBudgetTests(TestCase):
+    """Число запросов маршрута не больше бюджета и не растёт с числом строк (N+1)."""
+
+    def test_every_route_has_scenario_and_budget(self):
+        self.assertEqual(missing_routes(), [])
+        self.assertEqual(sorted(route_key(route) for route in select_routes()), sorted(BUDGETS))
+
+    def test_routes_within_budget(self):
+        routes = select_routes()
+        runs = {rows: self._run(rows, routes) for rows in (SMALL, LARGE)}
+        for route in routes:
+            key = route_key(route)
+            (few_status, few), (many_status, many) = runs[SMALL][key], runs[LARGE][key]
+            with self.subTest(route=key):
+                # Бюджет — для успешного запроса, а не для пути ошибки валидации / прав
+                self.assertTrue(200 <= few_status < 300 and 200 <= many_status < 300, (few_status, many_status))
+                self.assertLessEqual(len(many), BUDGETS.get(key, 0), "\n".join(many))
+                self.assertLessEqual(len(many), len(few), f"растёт с числом строк ({SMALL} → {LARGE})")
+
+    def _run(self, rows, routes):
+        """{ключ маршрута: (статус, [SQL])} на данных из rows строк; данные откатываются."""
+        results = {}
+        with transaction.atomic():
+            owner = self._seed(rows)
+            ctx = build_context(owner, batch=rows)
+            clients = make_clients(ctx)
+            for route in routes:
+                role, method, url, data = build_request(route, ctx, PAGE_SIZE_QUERY)
+                # Первый запрос прогревает кэши процесса (ContentType, отзывы JWT), считаем второй
+                self._request(clients[role], method, url, data)
+                results[route_key(route)] = self._request(clients[role], method, url, data)
+            transaction.set_rollback(True)
+        return results
+
+    def _seed(self, rows):
+        """Компания, у которой каждого вида строк — rows, и rows компаний в каталоге."""
+        owner = seed_company(
+            sales=rows, products=rows, supplies=rows, storages=rows, suppliers=rows, employees=rows,
+            lines_per_sale=rows, lines_per_supply=rows, days=30,
+        )
+        companies = Company.objects.bulk_create(
+            [Company(inn=f"9{i:011d}", title=f"Каталог {i}") for i in range(rows - 1)],
+        )
+        User.objects.bulk_create([
+            User(username=f"budget-{company.inn}", email=f"budget-{company.inn}@example.com",
+                 company=company, is_company_owner=True)
+            for company in companies
+        ])
+        return owner
+
+    def _request(self, client, method, url, data):
+        caches[CACHE_ALIAS].clear()
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, data, format="json")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            transaction.set_rollback(True)
+        return response.status_code, [query["sql"] for query in queries.captured_queries]
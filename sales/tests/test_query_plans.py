@@ -0,0 +1,168 @@
+"""
+Регрессия индексов: EXPLAIN запросов, которые строят представления на горячих путях, на синтетической компании.
+На PostgreSQL (с запретом seq scan там, где есть альтернатива) в плане не должно быть Seq Scan,
+на SQLite — SCAN без индекса, и каждый запрос должен идти по своему индексу (проверяется по имени).
+"""
+import re
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from companies.views import CompanyListCreateView, JoinRequestListView
+from core.pagination import SaleKeysetPagination
+from products.models import StockMovement, SupplyProduct
+from products.views import ProductListCreateView, SupplyListCreateView, _filter_supplies
+from sales.analytics import _base_qs
+from sales.models import ProductSale, Sale
+from sales.seed import seed_company
+from sales.views import SaleListCreateView
+from storages.models import Storage
+from storages.views import StorageListCreateView
+from suppliers.views import SupplierListCreateView
+from users.models import User
+from users.views import EmployeeListView
+
+# Полный проход по таблице в плане: PostgreSQL — "Seq Scan on t", SQLite — "SCAN t" без индекса
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING)(?:\s|$)"),
+}
+# Поиск по первичному ключу в плане SQLite
+PRIMARY_KEY = "INTEGER PRIMARY KEY"
+
+
+def _fk_index(model, field):
+    """Имя индекса, который Django создаёт для внешнего ключа field модели model."""
+    return connection.SchemaEditorClass(connection)._create_index_name(
+        model._meta.db_table, [model._meta.get_field(field).column], suffix="",
+    )
+
+
+def _view_queryset(view_class, user, query=""):
+    """Queryset, который строит get_queryset() представления для GET-запроса с query string."""
+    request = APIRequestFactory().get(f"/?{query}")
+    force_authenticate(request, user=user)
+    view = view_class()
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    return view.get_queryset()
+
+
+def _checks(user):
+    """(название, queryset, (таблица, индекс на SQLite)) — запросы представлений на горячих путях."""
+    cid = user.company_id
+    last_sale = Sale.objects.filter(company_id=cid).order_by("-sale_date", "-id").first()
+    keyset = SaleKeysetPagination()
+    sale_after = keyset._after([last_sale.sale_date, last_sale.id])
+    product_id = ProductSale.objects.filter(company_id=cid).values_list("product_id", flat=True).first()
+
+    sales = _view_queryset(SaleListCreateView, user)
+    supplies = _view_queryset(SupplyListCreateView, user)
+    filter_request = APIRequestFactory().get(f"/?product={product_id}&date_from=2020-01-01")
+    filter_request.query_params = filter_request.GET
+    analytics_request = APIRequestFactory().get("/?period=month")
+    analytics_request.query_params = analytics_request.GET
+    analytics_request.user = user
+
+    checks = [
+        ("Продажи: страница", sales[:20], ("sales_sale", "sale_company_date_id_idx")),
+        (
+            "Продажи: keyset", sales.order_by(*keyset.keyset).filter(sale_after)[:20],
+            ("sales_sale", "sale_company_date_id_idx"),
+        ),
+        (
+            "Продажи: период", _view_queryset(SaleListCreateView, user, "date_from=2020-01-01")[:20],
+            ("sales_sale", "sale_company_date_id_idx"),
+        ),
+        ("Продажа: детали", sales.filter(pk=last_sale.pk), ("sales_sale", PRIMARY_KEY)),
+        (
+            "Строки продаж: выгрузка",
+            ProductSale.objects.filter(company_id=cid).order_by("sale__sale_date", "sale_id", "id"),
+            ("sales_product_sale", "product_sale_company_idx"),
+        ),
+        (
+            "Товары: страница", _view_queryset(ProductListCreateView, user)[:20],
+            ("products_product", "product_company_title_id_idx"),
+        ),
+        ("Поставки: страница", supplies[:20], ("products_supply", "supply_company_date_idx")),
+        (
+            "Поставки: фильтр по товару", _filter_supplies(supplies, filter_request)[:20],
+            ("products_supply", "supply_company_date_idx"),
+        ),
+        (
+            "Строки поставок: выгрузка",
+            SupplyProduct.objects.filter(company_id=cid).order_by("supply__delivery_date", "supply_id", "id"),
+            ("products_supply_product", "supply_product_company_idx"),
+        ),
+        (
+            "Заявки: ожидающие", _view_queryset(JoinRequestListView, user, "status=pending")[:20],
+            ("companies_join_request", "join_request_pending_idx"),
+        ),
+        (
+            "Заявки: все", _view_queryset(JoinRequestListView, user)[:20],
+            ("companies_join_request", "join_request_company_idx"),
+        ),
+        (
+            "Компании: каталог", _view_queryset(CompanyListCreateView, user)[:20],
+            ("companies_company", "company_created_idx"),
+        ),
+        (
+            "Сотрудники", _view_queryset(EmployeeListView, user)[:20],
+            ("users_user", _fk_index(User, "company")),
+        ),
+        (
+            "Склады", _view_queryset(StorageListCreateView, user)[:20],
+            ("storages_storage", _fk_index(Storage, "company")),
+        ),
+        (
+            "Поставщики", _view_queryset(SupplierListCreateView, user)[:20],
+            ("suppliers_supplier", "supplier_company_title_idx"),
+        ),
+        (
+            # Уникальное ограничение (компания, день, товар); на SQLite — его автоиндекс
+            "Аналитика: агрегаты за период", _base_qs(analytics_request),
+            ("sales_product_sale_daily_rollup", "sqlite_autoindex_sales_product_sale_daily_rollup_1"),
+        ),
+        (
+            "Журнал остатков: несвёрнутые",
+            StockMovement.objects.filter(product_id=product_id, applied=False),
+            ("products_stock_movement", "stock_movement_pending_idx"),
+        ),
+    ]
+    # На SQLite LIKE по UPPER(title) индекс не использует — проверяем только на PostgreSQL
+    if connection.vendor == "postgresql":
+        checks.append(
+            ("Компании: поиск", _view_queryset(CompanyListCreateView, user, "search=seed")[:20], None),
+        )
+    return checks
+
+
+class QueryPlanTests(TestCase):
+    """Запросы представлений не скатываются в полный проход по таблице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = seed_company(sales=2000, products=100, employees=3, storages=3, suppliers=3)
+
+    def setUp(self):
+        if connection.vendor not in SEQ_SCAN_PATTERNS:
+            self.skipTest(f"СУБД {connection.vendor} не поддерживается (только PostgreSQL и SQLite).")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                # На небольших таблицах seq scan дешевле индекса — запрещаем его там, где есть альтернатива
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_hot_queries_use_indexes(self):
+        pattern = SEQ_SCAN_PATTERNS[connection.vendor]
+        for name, qs, expected in _checks(self.owner):
+            with self.subTest(name):
+                plan = qs.explain()
+                self.assertEqual(pattern.findall(plan), [], plan)
+                if connection.vendor == "sqlite" and expected:
+                    table, index = expected
+                    using = "USING " + index if index == PRIMARY_KEY else rf"USING (?:COVERING )?INDEX {index}\b"
+                    # SCAN по индексу — обход в порядке индекса (каталог компаний без фильтра)
+                    self.assertRegex(plan, rf"(?:SEARCH|SCAN) {table} {using}", plan)
@@ -0,0 +1,70 @@
+from products.models import Product, StockMovement
+from sales.models import ProductSaleDailyRollup, SaleDailyRollup
+
+from .base import SalesAPITestCase
+
+
+class RollupReversalTests(SalesAPITestCase):
+    """Вычитание продаж из дневных агрегатов не оставляет нулевых строк."""
+
+    def assertNoZeroRows(self):
+        self.assertFalse(ProductSaleDailyRollup.objects.filter(quantity__lte=0).exists())
+        self.assertFalse(SaleDailyRollup.objects.filter(sales_count__lte=0).exists())
+
+    def test_delete_sale_matches_raw_rows(self):
+        p1, p2, p3 = self.products
+        self.create_sale((p1, 3), (p2, 2))
+        only_p3 = self.create_sale((p3, 1))
+        self.create_sale((p1, 1))
+        self.assertAnalyticsMatchRawRows()
+
+        response = self.client.delete(f"/api/v1/sales/{only_p3}/")
+        self.assertEqual(response.status_code, 204)
+
+        self.assertAnalyticsMatchRawRows()
+        self.assertNoZeroRows()
+        sold = self.analytics("products-sold")
+        self.assertNotIn(p3.id, [row["product_id"] for row in sold["products"]])
+
+    def test_delete_last_sale_of_day_removes_day(self):
+        p1 = self.products[0]
+        self.create_sale((p1, 2), sale_date="2025-03-10T12:00:00Z")
+        today = self.create_sale((p1, 1))
+        self.client.delete(f"/api/v1/sales/{today}/")
+
+        self.assertAnalyticsMatchRawRows()
+        self.assertNoZeroRows()
+
+    def test_cancel_sales_matches_raw_rows(self):
+        p1, p2, p3 = self.products
+        keep = self.create_sale((p1, 3), (p2, 2))
+        cancelled = [self.create_sale((p3, 1)), self.create_sale((p2, 4), (p3, 2))]
+        self.assertAnalyticsMatchRawRows()
+
+        response = self.post("/api/v1/sales/cancel/", {"ids": [*cancelled, 999999]}, expect=200)
+        self.assertEqual(response.json(), {"cancelled": 2, "not_found": [999999]})
+
+        self.assertAnalyticsMatchRawRows()
+        self.assertNoZeroRows()
+        dashboard = self.analytics("dashboard")
+        self.assertEqual([row["product_id"] for row in dashboard["products"]], [p1.id, p2.id])
+        self.assertEqual(dashboard["sales_count"], 1)
+        self.assertEqual(self.client.get(f"/api/v1/sales/{keep}/").status_code, 200)
+        stock = dict(Product.objects.with_stock().values_list("id", "available_quantity"))
+        self.assertEqual(stock, {p1.id: self.STOCK - 3, p2.id: self.STOCK - 2, p3.id: self.STOCK})
+        reversals = StockMovement.objects.filter(kind=StockMovement.Kind.SALE_REVERSAL, applied=False)
+        self.assertEqual(
+            sorted(reversals.values_list("sale_id", "product_id", "delta")),
+            sorted([(cancelled[0], p3.id, 1), (cancelled[1], p2.id, 4), (cancelled[1], p3.id, 2)]),
+        )
+
+    def test_cancel_period_matches_raw_rows(self):
+        p1, p2, _ = self.products
+        self.create_sale((p1, 2), sale_date="2025-03-10T12:00:00Z")
+        self.create_sale((p2, 1), sale_date="2025-03-11T12:00:00Z")
+        self.create_sale((p1, 1))
+
+        self.post("/api/v1/sales/cancel/", {"date_from": "2025-03-01", "date_to": "2025-03-31"}, expect=200)
+
+        self.assertAnalyticsMatchRawRows()
+        self.assertNoZeroRows()
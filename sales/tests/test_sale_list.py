@@ -0,0 +1,39 @@
+from django.utils.dateparse import parse_datetime
+
+from sales.archive import archive_sales
+
+from .base import SalesAPITestCase
+
+
+class SaleListDateFilterTests(SalesAPITestCase):
+    """Фильтр списка продаж по датам: локальные дни включительно, как в выгрузке и аналитике."""
+
+    def list_ids(self, query):
+        response = self.client.get(f"/api/v1/sales/?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [sale["id"] for sale in response.json()["results"]]
+
+    def test_invalid_date_is_400(self):
+        for query in ("date_from=bad", "date_to=2025-13-01", "date_from=2025-01-01&date_to=31.01.2025"):
+            with self.subTest(query):
+                response = self.client.get(f"/api/v1/sales/?{query}")
+                self.assertEqual(response.status_code, 400, response.content)
+
+    def test_date_to_includes_whole_day(self):
+        p1 = self.products[0]
+        # 23:30 по Москве (TIME_ZONE) — ещё 10 марта
+        late = self.create_sale((p1, 1), sale_date="2025-03-10T20:30:00Z")
+        next_day = self.create_sale((p1, 1), sale_date="2025-03-10T21:30:00Z")
+
+        self.assertEqual(self.list_ids("date_from=2025-03-10&date_to=2025-03-10"), [late])
+        self.assertEqual(self.list_ids("date_from=2025-03-11"), [next_day])
+
+    def test_archived_sales_included_when_period_reaches_archive(self):
+        p1 = self.products[0]
+        archived = self.create_sale((p1, 1), sale_date="2025-01-15T12:00:00Z")
+        recent = self.create_sale((p1, 1), sale_date="2025-03-10T12:00:00Z")
+        archive_sales(before=parse_datetime("2025-02-01T00:00:00Z"), company_id=self.company.id)
+
+        self.assertEqual(self.list_ids("date_from=2025-01-01"), [recent, archived])
+        self.assertEqual(self.list_ids("date_from=2025-01-01&date_to=2025-01-31"), [archived])
+        self.assertEqual(self.list_ids("date_from=2025-02-01"), [recent])
@@ -0,0 +1,25 @@
+from .base import SalesAPITestCase
+
+
+class SaleDateUpdateTests(SalesAPITestCase):
+    """Перенос продажи по дате сбрасывает кэш аналитики, даже в пределах одного дня."""
+
+    def hourly_quantities(self):
+        response = self.client.get(
+            "/api/v1/sales/analytics/timeseries/?interval=hour&date_from=2025-03-10&date_to=2025-03-10",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row["bucket"]: row["quantity"] for row in response.json()["series"] if row["quantity"]}
+
+    def test_move_within_day_refreshes_hourly_series(self):
+        sale_id = self.create_sale((self.products[0], 2), sale_date="2025-03-10T10:00:00Z")
+        before = self.hourly_quantities()
+        self.assertEqual(list(before.values()), [2])
+
+        response = self.client.patch(f"/api/v1/sales/{sale_id}/", {"sale_date": "2025-03-10T12:00:00Z"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        after = self.hourly_quantities()
+        self.assertEqual(list(after.values()), [2])
+        self.assertNotEqual(after, before)
+        self.assertAnalyticsMatchRawRows()
@@ -1,18 +1,33 @@
 from django.urls import path
-from .views import SaleListCreateView, SaleDetailView
+from .views import (
+    SaleListCreateView,
+    SaleDetailView,
+    SaleExportView,
+    SaleBulkCreateView,
+    SaleBulkCancelView,
+)
 from .analytics import (
     ProfitAnalyticsView,
     ProductsSoldAnalyticsView,
     ProfitByProductAnalyticsView,
     TopProductsAnalyticsView,
+    DashboardAnalyticsView,
+    TimeSeriesAnalyticsView,
+    AnalyticsCacheStatsView,
 )
 
 urlpatterns = [
     path("", SaleListCreateView.as_view(), name="sale-list-create"),
     path("<int:pk>/", SaleDetailView.as_view(), name="sale-detail"),
+    path("export/", SaleExportView.as_view(), name="sale-export"),
+    path("bulk/", SaleBulkCreateView.as_view(), name="sale-bulk-create"),
+    path("cancel/", SaleBulkCancelView.as_view(), name="sale-bulk-cancel"),
     # Аналитика
     path("analytics/profit/", ProfitAnalyticsView.as_view(), name="analytics-profit"),
     path("analytics/products-sold/", ProductsSoldAnalyticsView.as_view(), name="analytics-products-sold"),
     path("analytics/profit-by-product/", ProfitByProductAnalyticsView.as_view(), name="analytics-profit-by-product"),
     path("analytics/top-products/", TopProductsAnalyticsView.as_view(), name="analytics-top-products"),
+    path("analytics/dashboard/", DashboardAnalyticsView.as_view(), name="analytics-dashboard"),
+    path("analytics/timeseries/", TimeSeriesAnalyticsView.as_view(), name="analytics-timeseries"),
+    path("analytics/cache-stats/", AnalyticsCacheStatsView.as_view(), name="analytics-cache-stats"),
 ]
@@ -1,20 +1,53 @@
+import heapq
+
+from django.db.models import prefetch_related_objects
+from django.http import Http404
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .models import Sale
-from .serializers import SaleSerializer, SaleCreateSerializer, SaleUpdateSerializer
+from core.export import (
+    EXPORT_CHUNK_SIZE, EXPORT_RENDERERS, filter_by_days, filter_day_range, get_export_format, parse_day, stream_export,
+)
+from core.fast_serialization import FAST_PARAMETER, FastListMixin, datetime_repr
+from core.pagination import CURSOR_PARAMETER, SaleKeysetPagination
+from .archive import SaleTiers
+from .models import ArchivedProductSale, ArchivedSale, Sale, ProductSale
+from .serializers import (
+    ArchivedSaleSerializer,
+    SaleSerializer,
+    SaleCreateSerializer,
+    SaleUpdateSerializer,
+    BulkSaleCreateSerializer,
+    SaleBulkCancelSerializer,
+)
 from .permissions import IsCompanyMember
 
 
-class SaleListCreateView(generics.ListCreateAPIView):
+class SaleListCreateView(FastListMixin, generics.ListCreateAPIView):
     """
     GET: список продаж компании. Поддерживает фильтрацию по периоду:
          ?date_from=2025-01-01&date_to=2025-12-31
+         ?cursor= — keyset-пагинация по (sale_date, id) вместо ?page=.
+         Если date_from доходит до архива (sales.archive), в список входят и архивные продажи.
+         Ответ строится из values() без сериализатора (core.fast_serialization); ?fast=0 — через SaleSerializer.
     POST: создать продажу (buyer_name + product_sales [{product, quantity}]).
     """
     permission_classes = (IsCompanyMember,)
+    pagination_class = SaleKeysetPagination
+    # Поля SaleSerializer в том же порядке
+    fast_fields = (
+        ("id", "id", None),
+        ("buyer_name", "buyer_name", None),
+        ("company", "company", None),
+        ("company_title", "company__title", None),
+        ("product_sales", None, None),
+        ("sale_date", "sale_date", datetime_repr),
+        ("created_at", "created_at", datetime_repr),
+        ("updated_at", "updated_at", datetime_repr),
+    )
 
     def get_queryset(self):
         user = self.request.user
@@ -24,14 +57,31 @@ class SaleListCreateView(generics.ListCreateAPIView):
             company_id=user.company_id,
         ).select_related("company").prefetch_related("product_sales__product")
 
-        date_from = self.request.query_params.get("date_from")
-        date_to = self.request.query_params.get("date_to")
-        if date_from:
-            qs = qs.filter(sale_date__gte=date_from)
-        if date_to:
-            qs = qs.filter(sale_date__lte=date_to)
+        # Даты — как в выгрузке и аналитике: локальные дни включительно, неверный формат — 400
+        params = self.request.query_params
+        date_from = parse_day(params["date_from"], "date_from") if params.get("date_from") else None
+        date_to = parse_day(params["date_to"], "date_to") if params.get("date_to") else None
+        qs = filter_day_range(qs, "sale_date", date_from, date_to)
+        if not date_from:
+            return qs
+        archived = filter_day_range(
+            ArchivedSale.objects.filter(company_id=user.company_id), "sale_date", date_from, date_to,
+        )
+        if archived.exists():
+            return SaleTiers(qs, archived.select_related("company").prefetch_related("product_sales"))
         return qs
 
+    def fast_extend(self, rows):
+        """Строки продаж страницы одним запросом, разложенные по продажам за один проход."""
+        by_sale = {}
+        for row in rows:
+            row["product_sales"] = by_sale[row["id"]] = []
+        lines = ProductSale.objects.filter(sale_id__in=by_sale).order_by("sale_id", "id").values_list(
+            "sale_id", "product_id", "product__title", "quantity",
+        )
+        for sale_id, product_id, product_title, quantity in lines:
+            by_sale[sale_id].append({"product_id": product_id, "product_title": product_title, "quantity": quantity})
+
     def get_serializer_class(self):
         if self.request.method == "POST":
             return SaleCreateSerializer
@@ -49,6 +99,8 @@ class SaleListCreateView(generics.ListCreateAPIView):
                 description="Конец периода (YYYY-MM-DD)",
                 type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
             ),
+            CURSOR_PARAMETER,
+            FAST_PARAMETER,
         ],
         responses={200: SaleSerializer(many=True)},
     )
@@ -90,6 +142,7 @@ class SaleListCreateView(generics.ListCreateAPIView):
         serializer = SaleCreateSerializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
         sale = serializer.save()
+        prefetch_related_objects([sale], "company", "product_sales__product")
         return Response(
             SaleSerializer(sale).data,
             status=status.HTTP_201_CREATED,
@@ -117,6 +170,17 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
             return SaleUpdateSerializer
         return SaleSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """Продажа, перенесённая в архив, отдаётся из архива (изменить или отменить её нельзя)."""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = generics.get_object_or_404(
+                ArchivedSale.objects.select_related("company").prefetch_related("product_sales"),
+                pk=self.kwargs["pk"], company_id=request.user.company_id,
+            )
+            return Response(ArchivedSaleSerializer(archived).data)
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -152,3 +216,184 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
+
+
+class SaleBulkCreateView(generics.GenericAPIView):
+    """
+    POST: пакетная загрузка продаж с касс (до 1000 за запрос).
+    Каждая продажа создаётся или отклоняется независимо; в ответе — результат по каждой.
+    """
+    permission_classes = (IsCompanyMember,)
+    serializer_class = BulkSaleCreateSerializer
+    queryset = Sale.objects.none()
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["sales"],
+            properties={
+                "sales": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        required=["buyer_name", "product_sales"],
+                        properties={
+                            "buyer_name": openapi.Schema(type=openapi.TYPE_STRING),
+                            "sale_date": openapi.Schema(
+                                type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME,
+                            ),
+                            "product_sales": openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                items=openapi.Schema(
+                                    type=openapi.TYPE_OBJECT,
+                                    required=["product", "quantity"],
+                                    properties={
+                                        "product": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                        "quantity": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    },
+                                ),
+                            ),
+                        },
+                    ),
+                ),
+            },
+        ),
+        responses={200: openapi.Response(
+            description="Результат по каждой продаже",
+            examples={"application/json": {
+                "created": 1,
+                "failed": 1,
+                "results": [
+                    {"index": 0, "status": "created", "id": 101},
+                    {"index": 1, "status": "error", "errors": {"product_sales": ["Недостаточно товара ..."]}},
+                ],
+            }},
+        ), 400: "Ошибка валидации пакета"},
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        created = sum(1 for r in results if r["status"] == "created")
+        return Response({
+            "created": created,
+            "failed": len(results) - created,
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+class SaleBulkCancelView(generics.GenericAPIView):
+    """
+    POST: массовая отмена продаж компании по списку ids или за период (даты включительно).
+    Товары возвращаются на склад, продажи вычитаются из агрегатов аналитики.
+    """
+    permission_classes = (IsCompanyMember,)
+    serializer_class = SaleBulkCancelSerializer
+    queryset = Sale.objects.none()
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description="ID продаж (до 10000)",
+                ),
+                "date_from": openapi.Schema(
+                    type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                    description="Начало периода (YYYY-MM-DD)",
+                ),
+                "date_to": openapi.Schema(
+                    type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                    description="Конец периода (YYYY-MM-DD)",
+                ),
+            },
+        ),
+        responses={200: openapi.Response(
+            description="Число отменённых продаж и ID, не найденные в компании",
+            examples={"application/json": {"cancelled": 2, "not_found": [404]}},
+        ), 400: "Ошибка валидации"},
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+
+EXPORT_COLUMNS = (
+    ("sale_id", "sale_id"),
+    ("sale_date", "sale__sale_date"),
+    ("buyer_name", "sale__buyer_name"),
+    ("product_id", "product_id"),
+    ("product_title", "product__title"),
+    ("quantity", "quantity"),
+    ("unit_sale_price", "unit_sale_price"),
+    ("unit_purchase_price", "unit_purchase_price"),
+    ("line_revenue", "line_revenue"),
+    ("line_cost", "line_cost"),
+)
+
+
+# Те же колонки из архива (название товара хранится в строке)
+ARCHIVE_EXPORT_FIELDS = tuple(
+    "product_title" if field == "product__title" else field for _, field in EXPORT_COLUMNS
+)
+
+
+def _export_key(row):
+    """(sale_date, sale_id) — порядок слияния оперативных и архивных строк выгрузки."""
+    return row[1], row[0]
+
+
+class SaleExportView(APIView):
+    """
+    GET: потоковая выгрузка строк продаж компании (одна строка — товар в продаже).
+    ?format=csv|ndjson&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (даты включительно).
+    Строки архивных продаж за период сливаются с оперативными в порядке даты.
+    """
+    permission_classes = (IsCompanyMember,)
+    renderer_classes = EXPORT_RENDERERS
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "format", openapi.IN_QUERY,
+                description="Формат выгрузки: csv (по умолчанию) или ndjson",
+                type=openapi.TYPE_STRING, enum=["csv", "ndjson"],
+            ),
+            openapi.Parameter(
+                "date_from", openapi.IN_QUERY,
+                description="Начало периода (YYYY-MM-DD)",
+                type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+            ),
+            openapi.Parameter(
+                "date_to", openapi.IN_QUERY,
+                description="Конец периода (YYYY-MM-DD)",
+                type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+            ),
+        ],
+        responses={200: "Файл выгрузки (CSV / NDJSON)", 400: "Ошибка валидации"},
+    )
+    def get(self, request, *args, **kwargs):
+        fmt = get_export_format(request)
+        qs = filter_by_days(
+            ProductSale.objects.filter(company_id=request.user.company_id),
+            "sale__sale_date",
+            request,
+        ).order_by("sale__sale_date", "sale_id", "id")
+        columns = [name for name, _ in EXPORT_COLUMNS]
+        fields = [field for _, field in EXPORT_COLUMNS]
+        rows = qs.values_list(*fields)
+
+        archived = filter_by_days(
+            ArchivedProductSale.objects.filter(sale__company_id=request.user.company_id),
+            "sale__sale_date",
+            request,
+        ).order_by("sale__sale_date", "sale_id", "id").values_list(*ARCHIVE_EXPORT_FIELDS)
+        if archived.exists():
+            rows = heapq.merge(
+                archived.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+                rows.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+                key=_export_key,
+            )
+        return stream_export(rows, columns, fmt, "sales")
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+from core.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("suppliers", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="supplier",
+            index=models.Index(fields=["company", "title"], name="supplier_company_title_idx"),
+        ),
+    ]
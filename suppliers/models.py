@@ -20,6 +20,9 @@ class Supplier(models.Model):
         verbose_name_plural = "Поставщики"
         db_table = "suppliers_supplier"
         ordering = ("title",)
+        indexes = [
+            models.Index(fields=["company", "title"], name="supplier_company_title_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} (ИНН {self.inn})"
@@ -0,0 +1,111 @@
+"""
+JWT-аутентификация без запроса пользователя на чтение.
+
+Access-токен при входе и обновлении получает claims company_id, is_company_owner и is_staff — всё,
+что читают права доступа и представления. На GET/HEAD/OPTIONS CompanyClaimsJWTAuthentication отдаёт
+TokenUser по этим claims без обращения к users_user; запись по-прежнему загружает User.
+
+Изменение членства (вступление, добавление/удаление сотрудника, создание/удаление компании,
+деактивация, смена is_staff) записывает момент в ClaimsRevocation: токены, выпущенные раньше, перестают
+быть источником claims, и пользователь загружается из базы. Таблица кэшируется в процессе
+и перечитывается раз в JWT_CLAIMS_REVOCATION_TTL секунд (в этом же процессе отзыв виден сразу).
+"""
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsRevocation
+
+COMPANY_CLAIMS = ("company_id", "is_company_owner", "is_staff")
+
+
+def add_company_claims(token, user):
+    """Записывает в access-токен claims членства пользователя в компании (и is_staff для IsAdminUser)."""
+    token["company_id"] = user.company_id
+    token["is_company_owner"] = user.is_company_owner
+    token["is_staff"] = user.is_staff
+    return token
+
+
+class _RevocationCache:
+    """
+    Отзывы за последние ACCESS_TOKEN_LIFETIME: {str(user_id): revoked_at}, общий для потоков процесса.
+    Ключи — строки: simplejwt кладёт user_id в токен строкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._revoked = {}
+
+    def get(self, user_id):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > settings.JWT_CLAIMS_REVOCATION_TTL:
+            horizon = timezone.now() - api_settings.ACCESS_TOKEN_LIFETIME
+            revoked = {
+                str(user_id): revoked_at
+                for user_id, revoked_at in ClaimsRevocation.objects.filter(
+                    revoked_at__gt=horizon,
+                ).values_list("user_id", "revoked_at")
+            }
+            with self._lock:
+                self._revoked, self._loaded_at = revoked, now
+        return self._revoked.get(str(user_id))
+
+    def note(self, user_ids, revoked_at):
+        with self._lock:
+            self._revoked = {**self._revoked, **dict.fromkeys(map(str, user_ids), revoked_at)}
+
+
+revocations = _RevocationCache()
+
+
+def revoke_claims(user_ids):
+    """Отзывает claims всех ранее выданных access-токенов пользователей user_ids."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    now = timezone.now()
+    ClaimsRevocation.objects.bulk_create(
+        [ClaimsRevocation(user_id=user_id, revoked_at=now) for user_id in user_ids],
+        update_conflicts=True,
+        unique_fields=["user_id"],
+        update_fields=["revoked_at"],
+    )
+    # Отзывы старше срока жизни access-токена ничего не отсекают
+    ClaimsRevocation.objects.filter(revoked_at__lt=now - api_settings.ACCESS_TOKEN_LIFETIME).delete()
+    revocations.note(user_ids, now)
+
+
+def claims_trusted(token):
+    """Можно ли взять company_id / is_company_owner из токена, не загружая пользователя."""
+    if any(claim not in token for claim in COMPANY_CLAIMS) or "iat" not in token:
+        return False
+    revoked_at = revocations.get(token[api_settings.USER_ID_CLAIM])
+    if revoked_at is None:
+        return True
+    # iat — целые секунды: токен из той же секунды, что и отзыв, считаем старым
+    return datetime.fromtimestamp(token["iat"], tz=dt_timezone.utc) > revoked_at
+
+
+class CompanyClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая на чтение не загружает User, если claims токена актуальны."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS and claims_trusted(validated_token):
+            return TokenUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClaimsRevocation",
+            fields=[
+                ("user_id", models.BigIntegerField(primary_key=True, serialize=False, verbose_name="ID пользователя")),
+                ("revoked_at", models.DateTimeField(db_index=True, verbose_name="Отозвано")),
+            ],
+            options={
+                "verbose_name": "Отзыв claims токенов",
+                "verbose_name_plural": "Отзывы claims токенов",
+                "db_table": "users_claims_revocation",
+            },
+        ),
+    ]
@@ -33,3 +33,21 @@ class User(AbstractUser):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
         db_table = "users_user"
+
+
+class ClaimsRevocation(models.Model):
+    """
+    Момент изменения членства пользователя в компании. Access-токены, выпущенные раньше,
+    не используются как источник company_id / is_company_owner (см. users.authentication).
+    Без внешнего ключа: запись должна пережить удаление пользователя.
+    """
+    user_id = models.BigIntegerField("ID пользователя", primary_key=True)
+    revoked_at = models.DateTimeField("Отозвано", db_index=True)
+
+    class Meta:
+        verbose_name = "Отзыв claims токенов"
+        verbose_name_plural = "Отзывы claims токенов"
+        db_table = "users_claims_revocation"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.revoked_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import revoke_claims
+from .models import User
+
+CLAIM_FIELDS = {"company", "is_company_owner", "is_staff", "is_active"}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """Членство в компании или активность изменились — claims в выданных токенах устарели."""
+    if not created and (update_fields is None or CLAIM_FIELDS & set(update_fields)):
+        revoke_claims([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_claims([instance.pk])
@@ -1,11 +1,14 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from .authentication import add_company_claims
 from .models import User
 from .serializers import (
     UserRegistrationSerializer,
@@ -16,13 +19,26 @@ from .serializers import (
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """Добавляем user в ответ JWT."""
+    """Добавляем user в ответ JWT, а в access-токен — claims компании (users.authentication)."""
     def validate(self, attrs):
         data = super().validate(attrs)
+        data["access"] = str(add_company_claims(AccessToken(data["access"]), self.user))
         data["user"] = UserSerializer(self.user).data
         return data
 
 
+class CompanyClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Новый access-токен получает актуальные claims компании, а не копию старых."""
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"])
+        user = User.objects.only("id", "company_id", "is_company_owner", "is_staff").get(
+            id=access[api_settings.USER_ID_CLAIM],
+        )
+        data["access"] = str(add_company_claims(access, user))
+        return data
+
+
 class JWTLoginView(TokenObtainPairView):
     """
     Вход по username и password. Возвращает access и refresh токены + данные пользователя.
@@ -56,6 +72,11 @@ class JWTLoginView(TokenObtainPairView):
         return super().post(request, *args, **kwargs)
 
 
+class CompanyClaimsTokenRefreshView(TokenRefreshView):
+    """Обновление access-токена по refresh-токену; claims компании перечитываются из базы."""
+    serializer_class = CompanyClaimsTokenRefreshSerializer
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """
     Регистрация нового пользователя. Доступно без авторизации.